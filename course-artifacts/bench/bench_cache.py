@@ -0,0 +1,75 @@
+# course-artifacts/bench/bench_cache.py
+"""
+Benchmark: full builds (all exports + zip) of one spec into fresh output directories.
+
+- no cache: every export rendered
+- cold cache: rendered and stored in the artifact cache
+- warm cache: every export hardlinked from the cache (only manifest and zip are written)
+
+Usage:
+  python course-artifacts/bench/bench_cache.py [spec.json] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+import builder  # noqa: E402
+from artifact_cache import ArtifactCache  # noqa: E402
+
+ALL_EXPORTS = ["html", "lecture_docx", "quiz_docx", "pdf", "zip"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark builds with the artifact cache")
+    parser.add_argument("spec", nargs="?", default=os.path.join(HERE, "..", "data", "demo_course_data.json"))
+    parser.add_argument("--repeat", type=int, default=5, help="Builds per case (best reported)")
+    args = parser.parse_args()
+
+    data, spec_hash, spec_version = builder.load_spec(args.spec)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ArtifactCache(os.path.join(tmp, "cache"))
+        # the first build fills the cache; warm up imports and fonts outside the timings
+        builder.build_outputs(
+            data,
+            os.path.join(tmp, "warmup"),
+            spec_hash=spec_hash,
+            spec_version=spec_version,
+            only=ALL_EXPORTS,
+            cache=cache,
+            log=None,
+        )
+
+        def run(label: str, make_cache):
+            best, res = float("inf"), None
+            for i in range(args.repeat):
+                outdir = os.path.join(tmp, f"{label}-{i}")
+                c = make_cache(i)
+                t0 = time.perf_counter()
+                res = builder.build_outputs(
+                    data,
+                    outdir,
+                    spec_hash=spec_hash,
+                    spec_version=spec_version,
+                    only=ALL_EXPORTS,
+                    cache=c,
+                    log=None,
+                )
+                best = min(best, time.perf_counter() - t0)
+            with open(res["manifest"], "r", encoding="utf-8") as f:
+                stats = json.load(f).get("cache")
+            print(f"  {label:<12} {best * 1000:8.1f} ms  cache {stats}")
+
+        print(f"{os.path.basename(args.spec)}: best of {args.repeat} full builds")
+        run("no cache", lambda i: None)
+        run("cold cache", lambda i: ArtifactCache(os.path.join(tmp, f"cold-cache-{i}")))
+        run("warm cache", lambda i: cache)
+
+
+if __name__ == "__main__":
+    main()
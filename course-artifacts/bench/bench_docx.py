@@ -0,0 +1,98 @@
+# course-artifacts/bench/bench_docx.py
+"""
+Benchmark: DOCX per-document setup and full render time.
+
+- setup: Document() + add_header_watermark (previous) vs. render_docx.new_document
+  (in-memory clone of the cached, pre-styled template)
+- render: render_lecture_docx / render_quiz_docx on the demo spec, ms per document
+- backends: a quiz bank of --questions questions per kind rendered with the python-docx and
+  the streaming backend, each in a fresh process (time and peak RSS)
+
+Usage:
+  python course-artifacts/bench/bench_docx.py [--spec PATH] [--n 50] [--questions 5000]
+"""
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+from docx import Document  # noqa: E402
+
+import render_docx  # noqa: E402
+from visual_spec import get_meta_watermark, normalize_visual_spec  # noqa: E402
+
+
+def legacy_setup(watermark: str):
+    doc = Document()
+    render_docx.add_header_watermark(doc, watermark)
+    return doc
+
+
+def big_quiz(data, questions: int):
+    data = copy.deepcopy(data)
+    qb = data["quiz_bank"]
+    for kind in ("single_choice", "fill_blank", "true_false"):
+        qb[kind] = [copy.deepcopy(qb[kind][i % len(qb[kind])]) for i in range(questions)]
+    return data
+
+
+def _render_in_child(data, out: str, backend: str):
+    try:
+        import resource
+    except ImportError:  # Windows: no getrusage
+        resource = None
+    t0 = time.perf_counter()
+    render_docx.render_quiz_docx(data, out, backend=backend)
+    seconds = time.perf_counter() - t0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+    rss_mib = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return seconds, rss_mib, os.path.getsize(out)
+
+
+def _ms_per_call(fn, n: int) -> float:
+    fn()  # warm-up (imports, template build)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DOCX template setup and rendering")
+    parser.add_argument("--spec", default=os.path.join(HERE, "..", "data", "demo_course_data.json"))
+    parser.add_argument("--n", type=int, default=50, help="Documents per case")
+    parser.add_argument("--questions", type=int, default=5000, help="Questions per kind for the backend case")
+    args = parser.parse_args()
+
+    with open(args.spec, "r", encoding="utf-8") as f:
+        data = normalize_visual_spec(json.load(f))
+    watermark = get_meta_watermark(data)
+
+    t_legacy = _ms_per_call(lambda: legacy_setup(watermark), args.n)
+    t_clone = _ms_per_call(lambda: render_docx.new_document(watermark), args.n)
+    print(f"setup   Document()+watermark {t_legacy:7.2f} ms   template clone {t_clone:7.2f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out.docx")
+        for fn in (render_docx.render_lecture_docx, render_docx.render_quiz_docx):
+            print(f"render  {fn.__name__:<24} {_ms_per_call(lambda: fn(data, out), args.n):7.2f} ms/doc")
+
+        big = big_quiz(data, args.questions)
+        print(f"quiz bank with {3 * args.questions} questions:")
+        ctx = multiprocessing.get_context("spawn")
+        for backend in render_docx.DOCX_BACKENDS:
+            with ctx.Pool(1) as pool:
+                seconds, rss_mib, size = pool.apply(_render_in_child, (big, out, backend))
+            print(f"  {backend:<12} {seconds * 1000:9.1f} ms  peak RSS {rss_mib:7.1f} MiB  {size / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
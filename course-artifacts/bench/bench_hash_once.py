@@ -0,0 +1,103 @@
+# course-artifacts/bench/bench_hash_once.py
+"""
+Benchmark: write, manifest and zip phases for a set of artifacts of the given sizes.
+
+- previous: files written as-is, then write_manifest hashes each file from disk and pack
+  reads each file again to deflate it
+- current: ArtifactWriter hashes while writing and keeps the bytes; write_manifest takes the
+  entries and pack zips the in-memory bytes
+
+Payloads are pseudo-random text, so deflate does real work (it dominates the zip phase).
+Set --drop-caches (root only) to read cold files in the "previous" case.
+
+Usage:
+  python course-artifacts/bench/bench_hash_once.py [--mb 8,24,24,16] [--repeat 3] [--drop-caches]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+from pack_zip import ArtifactWriter, pack, write_manifest  # noqa: E402
+
+NAMES = ("course_interactive.html", "lecture.docx", "quiz.docx", "course_notes.pdf")
+
+
+def payloads(sizes_mb):
+    rnd = random.Random(0)
+    words = ["".join(rnd.choice("abcdefghij") for _ in range(rnd.randint(2, 9))) for _ in range(4000)]
+    chunk = " ".join(rnd.choice(words) for _ in range(200_000)).encode("ascii")
+    out = {}
+    for name, mb in zip(NAMES, sizes_mb):
+        n = int(mb * 1e6)
+        out[name] = (chunk * (n // len(chunk) + 1))[:n]
+    return out
+
+
+def drop_caches():
+    subprocess.run(["sync"], check=False)
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+    except OSError:
+        pass
+
+
+def run(outdir: str, files: dict, *, hash_once: bool, cold: bool) -> tuple:
+    """Seconds spent in (write, manifest, zip)."""
+    t0 = time.perf_counter()
+    writer = ArtifactWriter(keep=True)
+    for name, payload in files.items():
+        if hash_once:
+            writer.write(os.path.join(outdir, name), payload)
+        else:
+            with open(os.path.join(outdir, name), "wb") as f:
+                f.write(payload)
+    t_write = time.perf_counter() - t0
+    if cold and not hash_once:
+        drop_caches()
+    t0 = time.perf_counter()
+    names = list(files)
+    manifest = write_manifest(
+        outdir,
+        files=names,
+        spec_version="1.1.0",
+        builder_version="bench",
+        spec_hash="0" * 64,
+        zip_name="bundle.zip",
+        entries=writer.entries if hash_once else None,
+    )
+    t_manifest = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pack(outdir, "bundle.zip", files=names, manifest_path=manifest, contents=writer.contents if hash_once else None)
+    return t_write, t_manifest, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hashing artifacts while writing them")
+    parser.add_argument("--mb", default="8,24,24,16", help="Comma-separated artifact sizes in MB (up to 4)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best reported)")
+    parser.add_argument("--drop-caches", action="store_true", help="Drop the page cache before reading back")
+    args = parser.parse_args()
+
+    sizes = [float(x) for x in args.mb.split(",")][: len(NAMES)]
+    files = payloads(sizes)
+    total = sum(len(p) for p in files.values()) / 1e6
+    print(f"{len(files)} artifacts, {total:.0f} MB; best of {args.repeat} (ms)")
+    print(f"  {'':<28} {'write':>8} {'manifest':>9} {'zip':>8}")
+    for label, hash_once in (("previous (read back twice)", False), ("hash-once + in-memory zip", True)):
+        best = [float("inf")] * 3
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                best = [min(a, b) for a, b in zip(best, run(tmp, files, hash_once=hash_once, cold=args.drop_caches))]
+        print(f"  {label:<28} {best[0] * 1000:8.1f} {best[1] * 1000:9.1f} {best[2] * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
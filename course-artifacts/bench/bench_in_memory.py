@@ -0,0 +1,69 @@
+# course-artifacts/bench/bench_in_memory.py
+"""
+Benchmark: full build (all exports + manifest + zip) of one spec.
+
+- outdir: builder.build_outputs into a fresh output directory (what the CLI does)
+- in memory: builder.build, then the ZIP streamed from BuildResult.iter_zip (what a web
+  backend sending the bundle as its response does); no file is written
+
+Usage:
+  python course-artifacts/bench/bench_in_memory.py [spec.json] [--docx-backend stream] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+import builder  # noqa: E402
+
+ALL_EXPORTS = ["html", "lecture_docx", "quiz_docx", "pdf", "zip"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark in-memory builds against builds into an outdir")
+    parser.add_argument("spec", nargs="?", default=os.path.join(HERE, "..", "data", "demo_course_data.json"))
+    parser.add_argument("--docx-backend", choices=builder.DOCX_BACKENDS, default="python-docx")
+    parser.add_argument("--repeat", type=int, default=5, help="Builds per case (best reported)")
+    args = parser.parse_args()
+
+    with open(args.spec, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    data, spec_hash, spec_version = builder.prepare_spec(spec)
+    # warm up imports, schema and fonts outside the timings
+    builder.build(spec, only=ALL_EXPORTS, docx_backend=args.docx_backend)
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        def outdir_build(i: int) -> int:
+            res = builder.build_outputs(
+                data,
+                os.path.join(tmp, f"build-{i}"),
+                spec_hash=spec_hash,
+                spec_version=spec_version,
+                only=ALL_EXPORTS,
+                docx_backend=args.docx_backend,
+                log=None,
+            )
+            return os.path.getsize(res["zip"])
+
+        def in_memory_build(_i: int) -> int:
+            res = builder.build(spec, only=ALL_EXPORTS, docx_backend=args.docx_backend)
+            return sum(len(chunk) for chunk in res.iter_zip())
+
+        print(f"{os.path.basename(args.spec)}: best of {args.repeat} full builds")
+        for label, run in (("outdir", outdir_build), ("in memory", in_memory_build)):
+            best, size = float("inf"), 0
+            for i in range(args.repeat):
+                t0 = time.perf_counter()
+                size = run(i)
+                best = min(best, time.perf_counter() - t0)
+            print(f"  {label:<10} {best * 1000:8.1f} ms  zip {size / 1e3:8.1f} kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# course-artifacts/bench/bench_markdown.py
+"""
+Benchmark: markdown throughput (MB/s of content_md) for the shared parser and the HTML renderer.
+
+- parse: md_blocks.parse_md_blocks + parse_inline on every block (caches cleared per run)
+- html: builder.md_to_basic_html (parse included)
+- linearity: adversarial input (unclosed `*`, `**`, backticks) at N and 2N bytes; the time
+  ratio should stay close to 2
+
+Usage:
+  python course-artifacts/bench/bench_markdown.py [--mb 4] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+import md_blocks  # noqa: E402
+from builder import md_to_basic_html  # noqa: E402
+
+# One close-reading note chunk using every construct the skills emit; {i} keeps every
+# chunk distinct so the per-text caches do not turn the run into cache hits.
+CHUNK = """## 精读 {i}：二次函数的图像
+
+1. 先写出 **一般式** y=ax²+bx+c，再用 *配方法* 化成顶点式（例 {i}）。
+2) 顶点 `V(h, k)`，对称轴 x=h；注意 h=-b/(2a) 而**不是** b/(2a)（例 {i}）。
+- 开口方向由 a 的符号决定：a>0 向上，a<0 向下（{i}）
+- 变量名如 x_1、x_2 中的下划线不是斜体（{i}）
+
+| 参数 | 作用 | 示例 |
+|:-|:-:|--:|
+| a | 伸缩与翻折 | `a=-{i}` |
+| b | 与 a 共同决定对称轴 | **b={i}** |
+| c | 上下平移 | c={i} |
+
+```
+def vertex(a, b, c):
+    h = -b / (2 * a)
+    return h, a * h * h + b * h + c
+```
+讲解口径 {i}：先让学生记住 y=ax² 是基本抛物线，再解释 b、c 是平移，a 是伸缩与翻折，最后结合图像归纳顶点与对称轴。
+
+"""
+
+
+def _parse_all(md: str) -> int:
+    blocks = md_blocks.parse_md_blocks(md)
+    for b in blocks:
+        if b.text:
+            md_blocks.parse_inline(b.text)
+        for row in b.rows:
+            for cell in row:
+                md_blocks.parse_inline(cell)
+    return len(blocks)
+
+
+def _clear_caches() -> None:
+    md_blocks._parse.cache_clear()
+    md_blocks.parse_inline.cache_clear()
+
+
+def _best(fn, md: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        _clear_caches()
+        t0 = time.perf_counter()
+        fn(md)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark markdown parse/render throughput")
+    parser.add_argument("--mb", type=float, default=4.0, help="Size of the synthetic note in MB (UTF-8)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best reported)")
+    args = parser.parse_args()
+
+    chunk_bytes = len(CHUNK.encode("utf-8"))
+    chunks = max(1, int(args.mb * 1024 * 1024 / chunk_bytes))
+    md = "".join(CHUNK.replace("{i}", str(i)) for i in range(chunks))
+    size_mb = len(md.encode("utf-8")) / (1024 * 1024)
+
+    t_parse = _best(_parse_all, md, args.repeat)
+    t_html = _best(md_to_basic_html, md, args.repeat)
+    print(f"note: {size_mb:.2f} MB, {_parse_all(md)} blocks")
+    print(f"  parse (blocks + inline)  {t_parse * 1000:8.1f} ms  {size_mb / t_parse:7.1f} MB/s")
+    print(f"  md_to_basic_html         {t_html * 1000:8.1f} ms  {size_mb / t_html:7.1f} MB/s")
+
+    # One long paragraph of unbalanced delimiters: a backtracking inline parser goes quadratic here.
+    unit = "a *b **c `d _e "
+    n = max(1, int(args.mb * 1024 * 1024 / 8 / len(unit)))
+    t1 = _best(md_blocks.parse_inline, unit * n, args.repeat)
+    t2 = _best(md_blocks.parse_inline, unit * (2 * n), args.repeat)
+    print(
+        f"  unbalanced inline, {len(unit) * n} chars {t1 * 1000:8.1f} ms;"
+        f" doubled {t2 * 1000:8.1f} ms (x{t2 / t1:.2f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
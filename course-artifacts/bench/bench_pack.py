@@ -0,0 +1,101 @@
+# course-artifacts/bench/bench_pack.py
+"""
+Benchmark: ZIP bundle packing, wall-clock time and archive size.
+
+- previous: zipfile, ZIP_DEFLATED for every member, one thread
+- current: pack_zip.pack, STORED for members that do not compress (the DOCX here), block-wise
+  deflate of the rest on --workers threads (1 and the given count are both reported)
+
+The bundle mimics a large course: an HTML page (text), a DOCX (deflated zip container), a PDF
+with Flate-compressed content streams, and a plot sidecar (JSON).
+
+Usage:
+  python course-artifacts/bench/bench_pack.py [--scale 1.0] [--workers 8] [--level 6] [--repeat 3]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+from pack_zip import pack  # noqa: E402
+
+
+def _text(rnd: random.Random, n: int) -> bytes:
+    words = ["".join(rnd.choice("abcdefghijklmnop") for _ in range(rnd.randint(2, 9))) for _ in range(5000)]
+    chunk = " ".join(rnd.choice(words) for _ in range(100_000)).encode("ascii")
+    return (chunk * (n // len(chunk) + 1))[:n]
+
+
+def bundle(scale: float) -> dict:
+    rnd = random.Random(0)
+    mb = lambda x: int(x * scale * 1e6)  # noqa: E731
+    docx = io.BytesIO()
+    with zipfile.ZipFile(docx, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("word/document.xml", _text(rnd, mb(60)))
+    pdf = [b"%PDF-1.4\n"]
+    body = _text(rnd, mb(30))
+    for i in range(0, len(body), 200_000):
+        stream = zlib.compress(body[i : i + 200_000])
+        pdf.append(b"%d 0 obj <</Length %d /Filter /FlateDecode>> stream\n" % (i, len(stream)) + stream + b"\nendstream\n")
+    return {
+        "course_interactive.html": _text(rnd, mb(12)),
+        "lecture.docx": docx.getvalue(),
+        "course_notes.pdf": b"".join(pdf) + b"%%EOF\n",
+        "course_interactive_plot_0.json": _text(rnd, mb(20)),
+    }
+
+
+def legacy_pack(outdir: str, zip_name: str, files):
+    with zipfile.ZipFile(os.path.join(outdir, zip_name), "w", compression=zipfile.ZIP_DEFLATED) as z:
+        for name in files:
+            z.write(os.path.join(outdir, name), arcname=name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ZIP bundle packing")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for member sizes (1 = about 72 MB)")
+    parser.add_argument("--workers", type=int, default=8, help="Deflate threads for the parallel case")
+    parser.add_argument("--level", type=int, default=6, help="Deflate level")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best reported)")
+    args = parser.parse_args()
+
+    files = bundle(args.scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, payload in files.items():
+            with open(os.path.join(tmp, name), "wb") as f:
+                f.write(payload)
+        names = sorted(files)
+        total = sum(len(p) for p in files.values())
+        print(f"{len(files)} members, {total / 1e6:.1f} MB; {os.cpu_count()} CPUs; best of {args.repeat}")
+
+        cases = [
+            ("previous (zipfile, 1 thread)", lambda: legacy_pack(tmp, "bundle.zip", names)),
+            (
+                "pack, 1 worker",
+                lambda: pack(tmp, "bundle.zip", files=names, compresslevel=args.level, workers=1),
+            ),
+            (
+                f"pack, {args.workers} workers",
+                lambda: pack(tmp, "bundle.zip", files=names, compresslevel=args.level, workers=args.workers),
+            ),
+        ]
+        for label, run in cases:
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                run()
+                best = min(best, time.perf_counter() - t0)
+            size = os.path.getsize(os.path.join(tmp, "bundle.zip"))
+            print(f"  {label:<30} {best * 1000:8.1f} ms  zip {size / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
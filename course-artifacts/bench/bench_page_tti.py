@@ -0,0 +1,145 @@
+# course-artifacts/bench/bench_page_tti.py
+"""
+Timing harness: time-to-interactive of generated HTML pages in headless Chromium.
+
+Loads each page with the CPU throttled (default 4x, roughly a school Chromebook) and records:
+- dcl / load: DOMContentLoaded and load event end
+- tti: end of the last long task (>50 ms) before a 500 ms quiet window, at least dcl
+- tbt: total blocking time (sum of long-task time beyond 50 ms) up to tti
+
+Each page is measured twice: "lazy" as generated, and "eager" with IntersectionObserver
+removed before any page script runs, so every visual renders during load (the previous
+behaviour). Without HTML arguments a synthetic course with --visuals visuals is built.
+
+Requires the optional `playwright` package and its Chromium (`python -m playwright install
+chromium`). Mermaid diagrams only render if a mermaid.min.js is given with --mermaid.
+
+Usage:
+  python course-artifacts/bench/bench_page_tti.py [page.html ...] [--visuals 48] [--cpu-throttle 4]
+      [--repeat 3] [--mermaid PATH]
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+import builder  # noqa: E402
+from visual_spec import normalize_visual_spec  # noqa: E402
+
+QUIET_MS = 500
+TIMEOUT_MS = 60_000
+
+LONG_TASK_OBSERVER = """
+window.__longTasks = [];
+new PerformanceObserver(list => {
+  for (const e of list.getEntries()) window.__longTasks.push([e.startTime, e.startTime + e.duration]);
+}).observe({type: "longtask", buffered: true});
+"""
+EAGER = "delete window.IntersectionObserver;"
+
+MEASURE = """
+async (quietMs) => {
+  const nav = performance.getEntriesByType("navigation")[0];
+  const lastEnd = () => window.__longTasks.reduce((m, t) => Math.max(m, t[1]), 0);
+  while (performance.now() - Math.max(lastEnd(), nav.loadEventEnd) < quietMs) {
+    await new Promise(r => setTimeout(r, 50));
+  }
+  const tti = Math.max(nav.domContentLoadedEventEnd, lastEnd());
+  const tbt = window.__longTasks
+    .filter(t => t[1] <= tti)
+    .reduce((s, t) => s + Math.max(0, t[1] - t[0] - 50), 0);
+  return {dcl: nav.domContentLoadedEventEnd, load: nav.loadEventEnd, tti, tbt};
+}
+"""
+
+
+def synthetic_course(visuals: int) -> dict:
+    """Demo spec with `visuals` visuals cycling through Mermaid, plot and cards."""
+    with open(os.path.join(HERE, "..", "data", "demo_course_data.json"), "r", encoding="utf-8") as f:
+        data = normalize_visual_spec(json.load(f))
+    xs = [i / 100 for i in range(2000)]
+    items = []
+    for i in range(visuals):
+        kind = ("flow", "plot", "cards")[i % 3]
+        if kind == "flow":
+            body = {"mermaid": f"graph TD\n  A{i}[读题] --> B{i}[列式] --> C{i}[求解] --> D{i}[检验]"}
+        elif kind == "plot":
+            body = {"series": [{"name": f"y{i}", "x": xs, "y": [math.sin(x + i) for x in xs]}]}
+        else:
+            body = {"cards": [{"front": f"问题 {i}-{k}", "back": f"答案 {i}-{k}"} for k in range(6)]}
+        items.append({"id": f"v{i}", "type": kind, "title": f"可视化 {i}", "data": body})
+    data["visuals"] = items
+    return data
+
+
+def measure(browser, url: str, *, eager: bool, cpu_throttle: float) -> dict:
+    context = browser.new_context(viewport={"width": 1280, "height": 800})
+    try:
+        context.add_init_script(LONG_TASK_OBSERVER + (EAGER if eager else ""))
+        page = context.new_page()
+        if cpu_throttle > 1:
+            cdp = context.new_cdp_session(page)
+            cdp.send("Emulation.setCPUThrottlingRate", {"rate": cpu_throttle})
+        page.goto(url, wait_until="load", timeout=TIMEOUT_MS)
+        return page.evaluate(MEASURE, QUIET_MS)
+    finally:
+        context.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-interactive of generated HTML pages")
+    parser.add_argument("pages", nargs="*", help="HTML files to measure (default: a synthetic course)")
+    parser.add_argument("--visuals", type=int, default=48, help="Visuals in the synthetic course")
+    parser.add_argument("--cpu-throttle", type=float, default=4.0, help="Chromium CPU slowdown factor")
+    parser.add_argument("--repeat", type=int, default=3, help="Loads per page and mode (median reported)")
+    parser.add_argument("--mermaid", help="Path to mermaid.min.js, copied to assets/ next to each page")
+    args = parser.parse_args()
+
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        print("[SKIP] playwright is not installed (pip install playwright && python -m playwright install chromium)")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pages = [os.path.abspath(p) for p in args.pages]
+        if not pages:
+            synthetic = os.path.join(tmp, "course_interactive.html")
+            builder.write_html(synthetic_course(args.visuals), synthetic)
+            pages = [synthetic]
+        if args.mermaid:
+            for page in pages:
+                assets = os.path.join(os.path.dirname(page), "assets")
+                os.makedirs(assets, exist_ok=True)
+                shutil.copyfile(args.mermaid, os.path.join(assets, "mermaid.min.js"))
+
+        with sync_playwright() as pw:
+            browser = pw.chromium.launch(headless=True)
+            try:
+                print(f"CPU throttle {args.cpu_throttle:g}x, median of {args.repeat} loads (ms)")
+                print(f"  {'page':<28} {'mode':<6} {'dcl':>8} {'load':>8} {'tti':>8} {'tbt':>8}")
+                for page in pages:
+                    url = "file://" + page
+                    for eager in (True, False):
+                        runs = [
+                            measure(browser, url, eager=eager, cpu_throttle=args.cpu_throttle)
+                            for _ in range(args.repeat)
+                        ]
+                        med = {k: statistics.median(r[k] for r in runs) for k in ("dcl", "load", "tti", "tbt")}
+                        print(
+                            f"  {os.path.basename(page)[:28]:<28} {'eager' if eager else 'lazy':<6}"
+                            f" {med['dcl']:8.0f} {med['load']:8.0f} {med['tti']:8.0f} {med['tbt']:8.0f}"
+                        )
+            finally:
+                browser.close()
+
+
+if __name__ == "__main__":
+    main()
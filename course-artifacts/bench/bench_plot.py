@@ -0,0 +1,106 @@
+# course-artifacts/bench/bench_plot.py
+"""
+Benchmark: HTML size and build time for a plot visual with a long sample series.
+
+- previous: full data inlined twice (data-plot attribute + pretty-printed <details> block)
+- current: LTTB-downsampled to the canvas width, inlined once, full data in a sidecar file
+- lttb: plot_data.lttb_indices alone, ms per series
+
+Usage:
+  python course-artifacts/bench/bench_plot.py [--points 200000] [--series 2] [--repeat 3]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+import builder  # noqa: E402
+import plot_data  # noqa: E402
+from visual_spec import normalize_visual_spec  # noqa: E402
+
+
+def legacy_render_visual_plot(v: dict, idx: int, **_kwargs) -> str:
+    data = v.get("data", {})
+    payload = builder.escape_html(json.dumps(data, ensure_ascii=False))
+    pretty = builder.escape_html(json.dumps(data, ensure_ascii=False, indent=2))
+    return f"""
+    <div class="viz-card">
+      <canvas class="plot-canvas" id="plot_{idx}" data-plot="{payload}"></canvas>
+      <details class="viz-src"><summary>查看 Plot 数据</summary><pre>{pretty}</pre></details>
+    </div>
+    """
+
+
+def plot_spec(points: int, series: int) -> dict:
+    with open(os.path.join(HERE, "..", "data", "demo_course_data.json"), "r", encoding="utf-8") as f:
+        data = normalize_visual_spec(json.load(f))
+    rnd = random.Random(0)
+    xs = [i * 1e-3 for i in range(points)]
+    data["visuals"] = [
+        {
+            "id": "samples",
+            "type": "plot",
+            "title": "采样曲线",
+            "data": {
+                "series": [
+                    {"name": f"s{k}", "x": xs, "y": [round(math.sin(x * (k + 1)) + rnd.gauss(0, 0.05), 5) for x in xs]}
+                    for k in range(series)
+                ]
+            },
+        }
+    ]
+    return data
+
+
+def _write(data: dict, outdir: str, repeat: int):
+    out = os.path.join(outdir, "course_interactive.html")
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        builder.write_html(data, out)
+        best = min(best, time.perf_counter() - t0)
+    sidecars = sum(os.path.getsize(os.path.join(outdir, n)) for n in os.listdir(outdir) if n.endswith(".json"))
+    return best, os.path.getsize(out), sidecars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plot downsampling in the HTML export")
+    parser.add_argument("--points", type=int, default=200000, help="Samples per series")
+    parser.add_argument("--series", type=int, default=2, help="Series in the plot")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best reported)")
+    args = parser.parse_args()
+
+    data = plot_spec(args.points, args.series)
+    with tempfile.TemporaryDirectory() as legacy_dir, tempfile.TemporaryDirectory() as current_dir:
+        current = builder.render_visual_plot
+        builder.render_visual_plot = legacy_render_visual_plot
+        try:
+            t_legacy, s_legacy, _ = _write(data, legacy_dir, args.repeat)
+        finally:
+            builder.render_visual_plot = current
+        t_now, s_now, s_side = _write(data, current_dir, args.repeat)
+
+    s = data["visuals"][0]["data"]["series"][0]
+    threshold = plot_data.plot_threshold(None)
+    t0 = time.perf_counter()
+    plot_data.lttb_indices(s["x"], s["y"], threshold)
+    t_lttb = time.perf_counter() - t0
+
+    print(f"plot with {args.series} x {args.points} points")
+    print(f"  {'previous (inlined twice)':<26} HTML {s_legacy / 1e6:8.2f} MB  {t_legacy * 1000:8.1f} ms")
+    print(
+        f"  {f'LTTB to {threshold} points':<26} HTML {s_now / 1e6:8.2f} MB  {t_now * 1000:8.1f} ms"
+        f"  (+ sidecar {s_side / 1e6:.2f} MB)"
+    )
+    print(f"  {'lttb_indices':<26} {t_lttb * 1000:8.1f} ms per series")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# course-artifacts/bench/bench_plot_encoding.py
+"""
+Benchmark: plot payload encodings on a synthetic 1M-point plot (downsampling off).
+
+- size: the data-plot attribute as embedded in the HTML, raw and gzip-compressed
+- parse: time for the page to turn the attribute into drawable columns, measured with node
+  (readPlotData, taken from the generated page: JSON.parse plus Float32Array decoding)
+
+Usage:
+  python course-artifacts/bench/bench_plot_encoding.py [--points 1000000] [--repeat 5]
+"""
+import argparse
+import gzip
+import html
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+import builder  # noqa: E402
+from visual_spec import normalize_visual_spec  # noqa: E402
+
+NODE_SCRIPT = r"""
+const fs = require("fs");
+%(decoder)s
+const [payloadPath, repeat] = [process.argv[2], parseInt(process.argv[3], 10)];
+const payload = fs.readFileSync(payloadPath, "utf8");
+const canvas = {getAttribute: () => payload};
+let best = Infinity, points = 0;
+for (let r = 0; r < repeat; r++) {
+  const t0 = process.hrtime.bigint();
+  const data = readPlotData(canvas);
+  const ms = Number(process.hrtime.bigint() - t0) / 1e6;
+  best = Math.min(best, ms);
+  points = data.series.reduce((n, s) => n + s.x.length, 0);
+}
+console.log(JSON.stringify({ms: best, points}));
+"""
+
+
+def plot_visual(points: int, encoding: str) -> dict:
+    xs = [i * 1e-4 for i in range(points)]
+    ys = [math.sin(x) * math.exp(-x / 50) for x in xs]
+    return {
+        "id": "wave",
+        "type": "plot",
+        "title": "1M 点",
+        "downsample": False,
+        "encoding": encoding,
+        "data": {"series": [{"name": "u", "x": xs, "y": ys}]},
+    }
+
+
+def page_decoder(spec: dict) -> str:
+    """plotColumn + readPlotData exactly as the generated page ships them."""
+    page = builder.build_html(spec)
+    start = page.index("const LITTLE_ENDIAN")
+    return page[start : page.index("function drawPlotCanvas", start)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and Float32 plot payload encodings")
+    parser.add_argument("--points", type=int, default=1_000_000, help="Points in the plot series")
+    parser.add_argument("--repeat", type=int, default=5, help="Parses per case in node (best reported)")
+    args = parser.parse_args()
+
+    with open(os.path.join(HERE, "..", "data", "demo_course_data.json"), "r", encoding="utf-8") as f:
+        spec = normalize_visual_spec(json.load(f))
+    node = shutil.which("node")
+    decoder = page_decoder(spec)
+
+    print(f"plot payload, {args.points} points")
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "parse.js")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(NODE_SCRIPT % {"decoder": decoder})
+        for encoding in ("json", "float32"):
+            t0 = time.perf_counter()
+            card = builder.render_visual_plot(plot_visual(args.points, encoding), 0)
+            t_build = time.perf_counter() - t0
+            attr = re.search(r'data-plot="([^"]*)"', card).group(1)
+            raw = attr.encode("utf-8")
+            line = (
+                f"  {encoding:<8} HTML {len(raw) / 1e6:7.2f} MB  gzip {len(gzip.compress(raw, 6)) / 1e6:6.2f} MB"
+                f"  build {t_build * 1000:7.1f} ms"
+            )
+            if node:
+                payload_path = os.path.join(tmp, f"{encoding}.json")
+                with open(payload_path, "w", encoding="utf-8") as f:
+                    f.write(html.unescape(attr))
+                res = subprocess.run(
+                    [node, script, payload_path, str(args.repeat)],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                line += f"  parse {json.loads(res.stdout)['ms']:7.1f} ms (node)"
+            print(line)
+    if not node:
+        print("[SKIP] node not found; parse times not measured")
+
+
+if __name__ == "__main__":
+    main()
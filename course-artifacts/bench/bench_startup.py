@@ -0,0 +1,81 @@
+# course-artifacts/bench/bench_startup.py
+"""
+Startup benchmark: import cost of builder.py per --only combination.
+
+Each case runs `python -X importtime builder.py <spec> ...` in a fresh interpreter and
+reports the summed import time, the wall time of the whole run, and whether reportlab,
+python-docx and jsonschema were loaded.
+
+Usage:
+  python course-artifacts/bench/bench_startup.py [--spec PATH] [--repeat 3]
+"""
+import argparse
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUILDER = os.path.join(HERE, "..", "scripts", "builder.py")
+HEAVY = ("reportlab", "docx", "jsonschema")
+RENDERED = ("html", "lecture_docx", "quiz_docx", "pdf")
+
+
+def _cases():
+    yield "--validate-only", ["--validate-only"]
+    for n in range(1, len(RENDERED) + 1):
+        for combo in itertools.combinations(RENDERED, n):
+            yield ",".join(combo), ["--only", ",".join(combo)]
+
+
+def _run(spec: str, extra, outdir: str):
+    cmd = [sys.executable, "-X", "importtime", BUILDER, spec, "--outdir", outdir, *extra]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit(f"failed: {' '.join(cmd)}\n{proc.stdout}\n{proc.stderr}")
+
+    self_us = 0
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        # "import time:       361 |      30950 |     reportlab.pdfbase._fontdata"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[0].isdigit():
+            continue  # header line
+        self_us += int(parts[0])
+        top = parts[2].split(".")[0]
+        if top in HEAVY:
+            loaded.add(top)
+    return self_us / 1000.0, wall * 1000.0, loaded
+
+
+def main():
+    default_spec = os.path.join(HERE, "..", "data", "demo_course_data.json")
+    parser = argparse.ArgumentParser(description="Benchmark builder.py import/startup cost per --only combination")
+    parser.add_argument("--spec", default=default_spec, help="VisualSpec JSON to build")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (median reported)")
+    args = parser.parse_args()
+
+    print(f"{'case':<40} {'imports ms':>11} {'wall ms':>9}  loaded")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, extra in _cases():
+            imports, walls, loaded = [], [], set()
+            for _ in range(args.repeat):
+                imp_ms, wall_ms, mods = _run(args.spec, extra, tmp)
+                imports.append(imp_ms)
+                walls.append(wall_ms)
+                loaded |= mods
+            print(
+                f"{label:<40} {statistics.median(imports):>11.1f} {statistics.median(walls):>9.1f}"
+                f"  {','.join(sorted(loaded)) or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# course-artifacts/bench/bench_validate.py
+"""
+Micro-benchmark: VisualSpec v1.1 validations per second.
+
+- uncached: re-read the schema and build a new Draft202012Validator per call (pre-cache behavior)
+- cached: validate_visual_spec_v1_1 with the process-wide Draft202012Validator
+- cached + fail_fast: same, stopping at the first jsonschema error for invalid specs
+
+Usage:
+  python course-artifacts/bench/bench_validate.py [--spec PATH] [--n 200]
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from visual_spec import (  # noqa: E402
+    VisualSpecValidationError,
+    load_schema_v1_1,
+    normalize_visual_spec,
+    validate_visual_spec_v1_1,
+)
+
+
+def _uncached(data):
+    validate_visual_spec_v1_1(data, schema=load_schema_v1_1())
+
+
+def _cached(data):
+    validate_visual_spec_v1_1(data)
+
+
+def _cached_fail_fast(data):
+    validate_visual_spec_v1_1(data, fail_fast=True)
+
+
+def _call(fn, data) -> None:
+    try:
+        fn(data)
+    except VisualSpecValidationError:
+        pass
+
+
+def _rate(fn, data, n: int) -> float:
+    _call(fn, data)  # warm-up (imports, first compile)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        _call(fn, data)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    default_spec = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "demo_course_data.json")
+    parser = argparse.ArgumentParser(description="Benchmark VisualSpec v1.1 validation throughput")
+    parser.add_argument("--spec", default=default_spec, help="VisualSpec JSON to validate")
+    parser.add_argument("--n", type=int, default=200, help="Validations per case")
+    args = parser.parse_args()
+
+    with open(args.spec, "r", encoding="utf-8") as f:
+        valid = normalize_visual_spec(json.load(f))
+
+    # An invalid spec with many errors shows what fail-fast saves.
+    invalid = copy.deepcopy(valid)
+    for kind in ("single_choice", "fill_blank", "true_false"):
+        for q in invalid["quiz_bank"][kind]:
+            q.pop("explanation", None)
+            q["stem"] = ""
+
+    cases = [("uncached", _uncached), ("cached", _cached), ("cached + fail_fast", _cached_fail_fast)]
+    for label, data in (("valid spec", valid), ("invalid spec (60 errors)", invalid)):
+        print(f"== {label}, n={args.n}")
+        base = None
+        for name, fn in cases:
+            rate = _rate(fn, data, args.n)
+            base = base or rate
+            print(f"  {name:<20} {rate:10.1f} validations/s  ({rate / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# course-artifacts/bench/bench_wrap.py
+"""
+Benchmark: PDF line wrapping of one long CJK paragraph (no spaces).
+
+- legacy: the previous _wrap_line (stringWidth on the growing buffer per character)
+- table: render_pdf._wrap_line with cached glyph widths + prefix sums (kinsoku off / on)
+
+Usage:
+  python course-artifacts/bench/bench_wrap.py [--chars 50000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+from reportlab.lib.pagesizes import A4  # noqa: E402
+from reportlab.lib.units import mm  # noqa: E402
+
+import render_pdf  # noqa: E402
+
+
+def legacy_wrap_line(text, font_name, font_size, max_width):
+    sw = render_pdf._string_width
+    if text.strip() == "":
+        return [""]
+    if sw(text, font_name, font_size) <= max_width:
+        return [text]
+    lines = []
+    buf = ""
+    for ch in text:
+        cand = buf + ch
+        if sw(cand, font_name, font_size) <= max_width:
+            buf = cand
+        else:
+            if buf:
+                lines.append(buf)
+                buf = ch
+            else:
+                lines.append(ch)
+                buf = ""
+    if buf:
+        lines.append(buf)
+    return lines
+
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF line wrapping on a long CJK paragraph")
+    parser.add_argument("--chars", type=int, default=50000, help="Paragraph length in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best reported)")
+    args = parser.parse_args()
+
+    sentence = "二次函数的图像是一条抛物线，a 控制开口方向与“胖瘦”，b 控制对称轴位置，c 控制整体上下平移。"
+    text = (sentence * (args.chars // len(sentence) + 1))[: args.chars]
+    font_name = render_pdf._register_cjk_font()
+    max_width = A4[0] - 40 * mm
+
+    legacy = legacy_wrap_line(text, font_name, 11, max_width)
+    fast = render_pdf._wrap_line(text, font_name, 11, max_width, kinsoku=False)
+    assert legacy == fast, "table-based wrapping must match the legacy output"
+    kinsoku = render_pdf._wrap_line(text, font_name, 11, max_width)
+
+    t_legacy = _best(lambda: legacy_wrap_line(text, font_name, 11, max_width), args.repeat)
+    t_fast = _best(lambda: render_pdf._wrap_line(text, font_name, 11, max_width, kinsoku=False), args.repeat)
+    t_kinsoku = _best(lambda: render_pdf._wrap_line(text, font_name, 11, max_width), args.repeat)
+
+    print(f"font={font_name} chars={len(text)} lines={len(legacy)} (kinsoku: {len(kinsoku)})")
+    print(f"  legacy             {t_legacy * 1000:9.1f} ms")
+    print(f"  table              {t_fast * 1000:9.1f} ms  ({t_legacy / t_fast:.1f}x)")
+    print(f"  table + kinsoku    {t_kinsoku * 1000:9.1f} ms  ({t_legacy / t_kinsoku:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
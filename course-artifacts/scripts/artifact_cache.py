@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+from pack_zip import sha256_of_file
+from visual_spec import BUILDER_VERSION, json_canonical_dumps, sha256_text
+
+DEFAULT_MAX_BYTES = 1 << 30  # 1 GiB
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _place(src: str, dst: str) -> None:
+    """Hardlink `src` to `dst` (replacing it), or copy when linking is not possible."""
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    _remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ArtifactCache:
+    """
+    Content-addressed store of rendered exports, shared by builds and courses on one machine.
+
+    objects/<sha256[:2]>/<sha256>   file bytes, stored once however many exports produce them
+    keys/<key[:2]>/<key>.json       {"files": [{"name", "size", "sha256"}], "info": {...}}
+
+    A key covers the renderer, BUILDER_VERSION, the export's input hash (which includes a hash
+    of the builder's sources) and the file name.
+    Hits are placed into the output directory as hardlinks (copies across file systems), so
+    renderers must never modify an output in place: write_file and the streaming DOCX writer
+    write a temp file and replace the output. A user may still edit one in place, which changes
+    the shared object, so objects are re-hashed before they are placed.
+    Least recently used keys are evicted once the objects exceed `max_bytes`.
+    Every operation is best effort: an unreadable or racing entry is a miss, never an error.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(renderer: str, input_hash: str, name: str) -> str:
+        return sha256_text(
+            json_canonical_dumps(
+                {"renderer": renderer, "builder_version": BUILDER_VERSION, "input": input_hash, "file": name}
+            )
+        )
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.root, "keys", key[:2], f"{key}.json")
+
+    def fetch(self, key: str, outdir: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]]:
+        """
+        Place the files cached under `key` into `outdir`. Returns (renderer info, {name: {"size",
+        "sha256"}}) on a hit, None on a miss.
+        """
+        key_path = self._key_path(key)
+        try:
+            with open(key_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            files = record["files"]
+            for e in files:
+                # a hardlinked output edited in place would have changed the shared object
+                obj = self._object_path(e["sha256"])
+                if os.path.getsize(obj) != e["size"] or sha256_of_file(obj) != e["sha256"]:
+                    _remove(obj)
+                    raise ValueError(f"cached object for {e['name']} changed")
+            for e in files:
+                _place(self._object_path(e["sha256"]), os.path.join(outdir, e["name"]))
+                os.utime(self._object_path(e["sha256"]))
+            os.utime(key_path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        entries = {e["name"]: {"size": e["size"], "sha256": e["sha256"]} for e in files}
+        return record.get("info") or {}, entries
+
+    def store(self, key: str, outdir: str, info: Dict[str, Any], entries: Dict[str, Dict[str, Any]]) -> None:
+        """Add the files an export just wrote to `outdir` (with their entries) under `key`."""
+        try:
+            files: List[Dict[str, Any]] = []
+            for name, e in sorted(entries.items()):
+                obj = self._object_path(e["sha256"])
+                if not os.path.isfile(obj):
+                    os.makedirs(os.path.dirname(obj), exist_ok=True)
+                    _place(os.path.join(outdir, name), obj)
+                files.append({"name": name, "size": e["size"], "sha256": e["sha256"]})
+            key_path = self._key_path(key)
+            os.makedirs(os.path.dirname(key_path), exist_ok=True)
+            tmp = f"{key_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"files": files, "info": info}, f, ensure_ascii=False)
+            os.replace(tmp, key_path)
+        except OSError:
+            return
+        self.prune()
+
+    def prune(self) -> None:
+        """Evict least recently used keys until the objects fit in max_bytes; drop unreferenced objects."""
+        objects: Dict[str, int] = {}
+        keys: List[Tuple[float, str, List[str]]] = []
+        for dirpath, _dirs, names in os.walk(os.path.join(self.root, "objects")):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    objects[name] = os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+        total = sum(objects.values())
+        if total <= self.max_bytes:
+            return
+        for dirpath, _dirs, names in os.walk(os.path.join(self.root, "keys")):
+            for name in names:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    mtime = os.stat(path).st_mtime
+                    with open(path, "r", encoding="utf-8") as f:
+                        digests = [e["sha256"] for e in json.load(f)["files"]]
+                except (OSError, ValueError, KeyError, TypeError):
+                    _remove(path)
+                    continue
+                keys.append((mtime, path, digests))
+
+        keys.sort()
+        refs: Dict[str, int] = {}
+        for _mtime, _path, digests in keys:
+            for d in digests:
+                refs[d] = refs.get(d, 0) + 1
+        # objects no key refers to (left over from a failed store) go first
+        for digest in [d for d in objects if d not in refs]:
+            _remove(self._object_path(digest))
+            total -= objects.pop(digest)
+        for _mtime, path, digests in keys:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            for d in digests:
+                refs[d] -= 1
+                if refs[d] == 0 and d in objects:
+                    _remove(self._object_path(d))
+                    total -= objects.pop(d)
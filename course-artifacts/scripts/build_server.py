@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import parse_qs, urlparse
+
+from visual_spec import BUILDER_VERSION, VisualSpecValidationError, parse_only_list
+
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+DEFAULT_KEEP_BUILDS = 100
+_BUILD_DIR_RE = re.compile(r"^build-(\d{6,})$")
+
+
+# ----------------------------
+# Worker side (runs in pool processes)
+# ----------------------------
+def _warm_worker() -> None:
+    """Pay the import, schema validator and font registration cost once per worker process."""
+    from builder import RENDERERS, get_renderer
+    from render_pdf import _register_cjk_font
+    from visual_spec import get_validator_v1_1
+
+    for key in RENDERERS:
+        get_renderer(key)
+    get_validator_v1_1()
+    _register_cjk_font()
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _build_job(spec: Any, outdir: str, only: Optional[List[str]]) -> Dict[str, Any]:
+    """Same pipeline as builder.main() for one posted spec; returns the written manifest."""
+    from builder import build_outputs, prepare_spec
+
+    data, spec_hash, spec_version = prepare_spec(spec)
+    res = build_outputs(data, outdir, spec_hash=spec_hash, spec_version=spec_version, only=only, log=None)
+    with open(res["manifest"], "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if res["zip"]:
+        manifest["zip_path"] = res["zip"]
+    return manifest
+
+
+# ----------------------------
+# Service
+# ----------------------------
+class QueueFullError(RuntimeError):
+    pass
+
+
+class BuildService:
+    """
+    Bounded build queue in front of a pool of warm worker processes.
+    At most `workers` builds run at once and at most `queue_size` more wait; anything
+    beyond that is rejected immediately (HTTP 503) instead of piling up. A build that timed
+    out keeps its slot until its worker actually finishes it.
+    Each build gets <outdir>/build-NNNNNN/, numbered on from the folders already there; only
+    the newest `keep_builds` folders are kept (never fewer than the builds that can be in flight).
+    """
+
+    def __init__(
+        self,
+        outdir: str,
+        *,
+        workers: int = 2,
+        queue_size: int = 8,
+        timeout: float = 300.0,
+        keep_builds: int = DEFAULT_KEEP_BUILDS,
+    ):
+        self.outdir = os.path.abspath(outdir)
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.keep_builds = max(keep_builds, self.workers + self.queue_size)
+        self.started_at = time.time()
+
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock = threading.Lock()
+        self._seq = max(self._build_dirs() or [0])
+        self._metrics: Dict[str, float] = {
+            "requests": 0,
+            "completed": 0,
+            "invalid": 0,
+            "failed": 0,
+            "rejected": 0,
+            "in_flight": 0,
+            "build_seconds_total": 0.0,
+        }
+        # spawn: identical behavior on Windows/macOS/Linux and no fork of the HTTP threads
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+
+    def warm_up(self) -> None:
+        for fut in [self._pool.submit(_ping) for _ in range(self.workers)]:
+            fut.result()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _count(self, key: str, delta: float = 1) -> None:
+        with self._lock:
+            self._metrics[key] += delta
+
+    def _build_dirs(self) -> List[int]:
+        try:
+            names = os.listdir(self.outdir)
+        except OSError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_BUILD_DIR_RE.match, names) if m)
+
+    def _prune_build_dirs(self, newest: int) -> None:
+        """Remove build folders older than the `keep_builds` newest (in-flight builds are among those)."""
+        for seq in self._build_dirs():
+            if seq <= newest - self.keep_builds:
+                shutil.rmtree(os.path.join(self.outdir, f"build-{seq:06d}"), ignore_errors=True)
+
+    def _finished(self, _fut: Any) -> None:
+        # runs when the worker is done with the build (or it was cancelled before starting),
+        # which may be long after a timed-out request has returned
+        self._count("in_flight", -1)
+        self._slots.release()
+
+    def build(self, spec: Any, *, only: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        self._count("requests")
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise QueueFullError("build queue is full")
+
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        outdir = os.path.join(self.outdir, f"build-{seq:06d}")
+        self._prune_build_dirs(seq)
+
+        self._count("in_flight")
+        t0 = time.perf_counter()
+        try:
+            fut = self._pool.submit(_build_job, spec, outdir, list(only) if only else None)
+        except BaseException:
+            self._finished(None)
+            raise
+        fut.add_done_callback(self._finished)
+        try:
+            manifest = fut.result(timeout=self.timeout)
+            self._count("completed")
+            return manifest
+        except FutureTimeoutError:
+            fut.cancel()
+            self._count("failed")
+            raise
+        except VisualSpecValidationError:
+            self._count("invalid")
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+        finally:
+            self._count("build_seconds_total", time.perf_counter() - t0)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            m: Dict[str, Any] = dict(self._metrics)
+        done = m["completed"] + m["invalid"] + m["failed"]
+        m["build_seconds_total"] = round(m["build_seconds_total"], 4)
+        m["build_seconds_avg"] = round(m["build_seconds_total"] / done, 4) if done else 0.0
+        m["queued"] = max(0, m["in_flight"] - self.workers)
+        m["workers"] = self.workers
+        m["queue_size"] = self.queue_size
+        m["uptime_seconds"] = round(time.time() - self.started_at, 1)
+        m["builder_version"] = BUILDER_VERSION
+        return m
+
+
+# ----------------------------
+# HTTP
+# ----------------------------
+class BuildRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /build[?only=html,pdf]  body: VisualSpec JSON  -> 200 manifest JSON
+    GET  /healthz                                       -> 200 {"status": "ok"}
+    GET  /metrics                                       -> 200 counters JSON
+    """
+
+    server_version = "holo-builder/" + BUILDER_VERSION
+    service: BuildService  # set on the handler subclass by make_server()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path == "/healthz":
+            self._send_json(200, {"status": "ok", "builder_version": BUILDER_VERSION})
+        elif path == "/metrics":
+            self._send_json(200, self.service.metrics())
+        else:
+            self._send_json(404, {"error": f"not found: {path}"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/build":
+            self._send_json(404, {"error": f"not found: {url.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = 0
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._send_json(413 if length > 0 else 400, {"error": f"body must be 1..{MAX_BODY_BYTES} bytes"})
+            return
+        try:
+            spec = json.loads(self.rfile.read(length).decode("utf-8"))
+        except (UnicodeDecodeError, ValueError) as e:
+            self._send_json(400, {"error": f"invalid JSON: {e}"})
+            return
+        if not isinstance(spec, dict):
+            # rejected up front: a non-object body never takes a worker slot
+            self._send_json(400, {"error": "VisualSpec validation failed: <root>: expected an object"})
+            return
+
+        only = parse_only_list((parse_qs(url.query).get("only") or [None])[0])
+        try:
+            manifest = self.service.build(spec, only=only)
+        except QueueFullError as e:
+            self._send_json(503, {"error": str(e)}, headers={"Retry-After": "1"})
+        except VisualSpecValidationError as e:
+            self._send_json(400, {"error": f"VisualSpec validation failed: {e}"})
+        except FutureTimeoutError:
+            self._send_json(504, {"error": f"build exceeded {self.service.timeout:.0f}s"})
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send_json(200, manifest)
+
+
+def make_server(host: str, port: int, service: BuildService) -> ThreadingHTTPServer:
+    """HTTP server bound to host:port (port 0 picks a free one; see server.server_address)."""
+    handler = type("BoundBuildRequestHandler", (BuildRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve_main(argv: Optional[Sequence[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="builder.py serve", description="Long-running VisualSpec build server")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (0 = pick a free port)")
+    parser.add_argument("--outdir", default="output/server", help="Root folder for per-request build folders")
+    parser.add_argument("--workers", type=int, default=2, help="Warm worker processes")
+    parser.add_argument("--queue", type=int, default=8, help="Builds allowed to wait beyond the running ones")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-build timeout in seconds")
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=DEFAULT_KEEP_BUILDS,
+        help=f"Build folders kept under outdir; older ones are removed (default: {DEFAULT_KEEP_BUILDS})",
+    )
+    args = parser.parse_args(argv)
+
+    service = BuildService(
+        args.outdir, workers=args.workers, queue_size=args.queue, timeout=args.timeout, keep_builds=args.keep
+    )
+    service.warm_up()
+    server = make_server(args.host, args.port, service)
+    host, port = server.server_address[:2]
+    print(
+        f"[SUCCESS] Build server listening on http://{host}:{port} "
+        f"(workers={service.workers}, queue={service.queue_size})"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    serve_main()
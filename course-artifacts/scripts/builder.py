@@ -1,12 +1,18 @@
 # course-artifacts/scripts/builder.py
+import glob
+import importlib
 import json
 import os
-from datetime import datetime
-from typing import List
+import time
+from concurrent.futures import Executor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from visual_spec import (
     BUILDER_VERSION,
+    SUPPORTED_SPEC_VERSION_PREFIXES,
     VisualSpecValidationError,
+    compute_export_hash,
     compute_spec_hash,
     get_content_md,
     get_meta_date,
@@ -19,9 +25,11 @@ from visual_spec import (
     sanitize_filename_component,
     validate_visual_spec_v1_1,
 )
-from render_pdf import render_pdf
-from render_docx import render_lecture_docx, render_quiz_docx
-from pack_zip import pack, write_manifest
+from artifact_cache import DEFAULT_MAX_BYTES, ArtifactCache
+from interactive_expr import ExpressionError, compile_interactive
+from md_blocks import parse_inline, parse_md_blocks
+from pack_zip import ArtifactWriter, dump_manifest, iter_zip, manifest_data, pack, sha256_of_file, write_file
+from plot_data import downsample_plot, encode_plot_float32, plot_threshold
 
 
 # ----------------------------
@@ -40,85 +48,75 @@ def escape_html(s: str) -> str:
     )
 
 
-def safe_remove(path: str) -> bool:
-    """Try remove existing output file. Return True if removed or not exist; False if cannot remove."""
-    try:
-        if os.path.exists(path):
-            os.remove(path)
-        return True
-    except PermissionError:
-        return False
-    except Exception:
-        return False
-
-
-def now_stamp():
-    return datetime.now().strftime("%Y%m%d-%H%M%S")
+def md_inline_html(text: str) -> str:
+    """Inline markdown (**bold**, *italic*, `code`) -> escaped HTML."""
+    out = []
+    for span in parse_inline(text):
+        h = escape_html(span.text)
+        if span.code:
+            h = f"<code>{h}</code>"
+        if span.italic:
+            h = f"<em>{h}</em>"
+        if span.bold:
+            h = f"<strong>{h}</strong>"
+        out.append(h)
+    return "".join(out)
+
+
+def _md_table_html(rows: Sequence[Sequence[str]], align: Sequence[str]) -> str:
+    def cells(tag: str, row: Sequence[str]) -> str:
+        out = []
+        for text, a in zip(row, align):
+            style = f" style='text-align:{a}'" if a else ""
+            out.append(f"<{tag}{style}>{md_inline_html(text)}</{tag}>")
+        return "".join(out)
+
+    body = "".join(f"<tr>{cells('td', row)}</tr>" for row in rows[1:])
+    return f"<table class='md-table'><thead><tr>{cells('th', rows[0])}</tr></thead><tbody>{body}</tbody></table>"
 
 
 def md_to_basic_html(md: str) -> str:
     """
-    v1: minimal markdown -> HTML
-    - supports bullet lines '- '
-    - supports blank line paragraph breaks
-    - supports code blocks fenced by ```
+    Markdown -> HTML, from the shared block parser (md_blocks)
+    - headings '#'..'######' (rendered from <h3>, below the section title)
+    - bullet lines '- ' / '* ' / '+ ', numbered lines '1.' / '1)'
+    - pipe tables, code blocks fenced by ```, blank line paragraph breaks
+    - inline **bold**, *italic*, `code`
     Everything is escaped.
     """
-    if md is None:
-        return ""
-
-    text = md.replace("\r\n", "\n")
-    lines = text.split("\n")
-
     out = []
-    in_ul = False
-    in_code = False
-    code_buf = []
-
-    def close_ul():
-        nonlocal in_ul
-        if in_ul:
-            out.append("</ul>")
-            in_ul = False
-
-    def close_code():
-        nonlocal in_code, code_buf
-        if in_code:
-            code_html = escape_html("\n".join(code_buf))
-            out.append(f"<pre class='code'><code>{code_html}</code></pre>")
-            code_buf = []
-            in_code = False
-
-    for line in lines:
-        if line.strip().startswith("```"):
-            if in_code:
-                close_code()
-            else:
-                close_ul()
-                in_code = True
-            continue
-
-        if in_code:
-            code_buf.append(line)
-            continue
-
-        if line.strip().startswith("- "):
-            if not in_ul:
-                out.append("<ul>")
-                in_ul = True
-            item = escape_html(line.strip()[2:])
-            out.append(f"<li>{item}</li>")
+    open_list = None  # "ul" | "ol"
+    for block in parse_md_blocks(md):
+        kind = block.kind
+        if kind in ("bullet", "ordered"):
+            tag = "ul" if kind == "bullet" else "ol"
+            if open_list != tag:
+                if open_list:
+                    out.append(f"</{open_list}>")
+                start = f" start='{block.number}'" if tag == "ol" and block.number != 1 else ""
+                out.append(f"<{tag}{start}>")
+                open_list = tag
+            out.append(f"<li>{md_inline_html(block.text)}</li>")
             continue
 
-        # normal line
-        close_ul()
-        if line.strip() == "":
+        if open_list:
+            out.append(f"</{open_list}>")
+            open_list = None
+        if kind == "code":
+            code_html = escape_html("\n".join(block.lines))
+            out.append(f"<pre class='code'><code>{code_html}</code></pre>")
+        elif kind == "blank":
             out.append("<div class='p-spacer'></div>")
+        elif kind == "heading":
+            level = min(block.level + 2, 6)
+            out.append(f"<h{level} class='md-h'>{md_inline_html(block.text)}</h{level}>")
+        elif kind == "table":
+            out.append(_md_table_html(block.rows, block.align))
         else:
-            out.append(f"<p>{escape_html(line)}</p>")
+            out.append(f"<p>{md_inline_html(block.text)}</p>")
 
-    close_ul()
-    close_code()
+    if open_list:
+        out.append(f"</{open_list}>")
     return "\n".join(out)
 
 
@@ -146,13 +144,44 @@ def render_visual_mermaid(v: dict) -> str:
     """
 
 
-def render_visual_plot(v: dict, idx: int) -> str:
+def render_visual_plot(
+    v: dict,
+    idx: int,
+    *,
+    sidecar_prefix: Optional[str] = None,
+    sidecars: Optional[Dict[str, Any]] = None,
+    plots: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Plot card. Series longer than the canvas can show are reduced with LTTB (see plot_data);
+    when `sidecars` is given the full-resolution data is stored there under
+    `<sidecar_prefix>_plot_<idx>.json` and linked from the card instead of being inlined.
+    With `"encoding": "float32"` the inlined x/y columns are base64 Float32 blobs.
+    """
     title = escape_html(v.get("title", ""))
     caption = escape_html(v.get("caption", ""))
     data = v.get("data", {})
     canvas_id = f"plot_{idx}"
 
-    payload = escape_html(json.dumps(data, ensure_ascii=False))
+    shown, points, kept = downsample_plot(data, plot_threshold(v.get("downsample")))
+    reduced = shown is not data
+    if v.get("encoding") == "float32":
+        shown = encode_plot_float32(shown)
+    note = ""
+    sidecar = None
+    if reduced:
+        note = f"已按画布宽度降采样（LTTB）：{points} → {kept} 点"
+        cfg = v.get("downsample")
+        if sidecars is not None and not (isinstance(cfg, dict) and cfg.get("sidecar") is False):
+            sidecar = f"{sidecar_prefix or 'course_interactive'}_plot_{idx}.json"
+            sidecars[sidecar] = data
+            note += f"；<a href='{escape_html(sidecar)}' download>完整数据（JSON）</a>"
+        note = f"<div class='viz-note'>{note}</div>"
+    if plots is not None:
+        plots.append({"visual": v.get("id", canvas_id), "points": points, "kept": kept, "sidecar": sidecar})
+
+    # Compact JSON, inlined once; the <details> view pretty-prints it on first open.
+    payload = escape_html(json.dumps(shown, ensure_ascii=False, separators=(",", ":")))
 
     return f"""
     <div class="viz-card">
@@ -160,9 +189,10 @@ def render_visual_plot(v: dict, idx: int) -> str:
       <div class="viz-caption">{caption}</div>
       <div class="viz-body">
         <canvas class="plot-canvas" id="{canvas_id}" data-plot="{payload}"></canvas>
-        <details class="viz-src">
+        {note}
+        <details class="viz-src" data-plot-src="{canvas_id}">
           <summary>查看 Plot 数据</summary>
-          <pre>{escape_html(json.dumps(data, ensure_ascii=False, indent=2))}</pre>
+          <pre></pre>
         </details>
       </div>
     </div>
@@ -230,7 +260,17 @@ def render_visual_unknown(v: dict) -> str:
 # ----------------------------
 # build_html
 # ----------------------------
-def build_html(data: dict) -> str:
+def build_html(
+    data: dict,
+    *,
+    sidecar_prefix: Optional[str] = None,
+    sidecars: Optional[Dict[str, Any]] = None,
+    plots: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Render the interactive HTML page. `sidecars` / `plots` collect full-resolution plot data
+    and per-plot downsampling stats (see render_visual_plot); without them nothing is linked.
+    """
     meta = data.get("meta", {}) or {}
     title = meta.get("title", "课程")
     generated_at = meta.get("generated_at") or datetime.now().strftime("%Y-%m-%d")
@@ -246,7 +286,6 @@ def build_html(data: dict) -> str:
     visuals = data.get("visuals", []) or []
 
     interactive = data.get("interactive", {}) or {}
-    params = interactive.get("params", {}) or {}
     domain = interactive.get("domain", {}) or {}
     yrange = interactive.get("range", {}) or {}
     plot_config = interactive.get("plot_config", {}) or {}
@@ -264,38 +303,18 @@ def build_html(data: dict) -> str:
         except Exception:
             return default
 
-    a_spec = params.get("a", {}) or {}
-    b_spec = params.get("b", {}) or {}
-    c_spec = params.get("c", {}) or {}
-
-    a0 = _num(a_spec.get("default", 1.0), 1.0)
-    b0 = _num(b_spec.get("default", 0.0), 0.0)
-    c0 = _num(c_spec.get("default", 0.0), 0.0)
+    try:
+        curve = compile_interactive(interactive)
+    except ExpressionError as e:
+        raise VisualSpecValidationError(str(e)) from None
 
     interactive_cfg = {
         "type": interactive.get("type", ""),
+        "expression": curve.expression if curve else "",
+        "quadratic": bool(curve and curve.quadratic),
         "domain": {"x_min": _num(domain.get("x_min", -10), -10), "x_max": _num(domain.get("x_max", 10), 10)},
         "range": {"y_min": _num(yrange.get("y_min", -10), -10), "y_max": _num(yrange.get("y_max", 10), 10)},
-        "params": {
-            "a": {
-                "min": _num(a_spec.get("min", -5), -5),
-                "max": _num(a_spec.get("max", 5), 5),
-                "step": _num(a_spec.get("step", 0.01), 0.01),
-                "default": a0,
-            },
-            "b": {
-                "min": _num(b_spec.get("min", -10), -10),
-                "max": _num(b_spec.get("max", 10), 10),
-                "step": _num(b_spec.get("step", 0.01), 0.01),
-                "default": b0,
-            },
-            "c": {
-                "min": _num(c_spec.get("min", -10), -10),
-                "max": _num(c_spec.get("max", 10), 10),
-                "step": _num(c_spec.get("step", 0.01), 0.01),
-                "default": c0,
-            },
-        },
+        "params": [s.name for s in curve.sliders] if curve else [],
         "plot_config": {
             "samples": _int(plot_config.get("samples", 800), 800),
             "grid": bool(plot_config.get("grid", True)),
@@ -314,7 +333,9 @@ def build_html(data: dict) -> str:
         if vtype in ("flow", "structure", "cycle"):
             viz_blocks.append(render_visual_mermaid(v))
         elif vtype == "plot":
-            viz_blocks.append(render_visual_plot(v, idx))
+            viz_blocks.append(
+                render_visual_plot(v, idx, sidecar_prefix=sidecar_prefix, sidecars=sidecars, plots=plots)
+            )
         elif vtype == "cards":
             viz_blocks.append(render_visual_cards(v))
         else:
@@ -339,49 +360,46 @@ def build_html(data: dict) -> str:
     sections_html = "\n".join(section_html)
 
     # Interactive block (if present)
-    has_interactive = isinstance(params, dict) and all(k in params for k in ("a", "b", "c"))
-
     interactive_html = ""
-    if has_interactive:
+    if curve:
         payload = escape_html(json.dumps(interactive_cfg, ensure_ascii=False))
+        if curve.quadratic:
+            heading = "交互可视化： y = ax² + bx + c"
+            hint = "拖动滑块调整系数，观察抛物线的开口方向、顶点位置与整体平移变化。"
+        else:
+            heading = interactive.get("title") or f"交互可视化： y = {curve.expression}"
+            hint = interactive.get("hint") or "拖动滑块调整参数，观察曲线的变化。"
+        controls = "".join(
+            f"""
+              <div class="ctrl">
+                <div class="ctrl-row">
+                  <div class="ctrl-label">{escape_html(s.label)}：</div>
+                  <div class="ctrl-val" id="val_{s.index}">{s.default:.{s.decimals}f}</div>
+                </div>
+                <input type="range" class="curve-param" id="slider_{s.index}" data-index="{s.index}"
+                       data-decimals="{s.decimals}" min="{s.min}" max="{s.max}" step="{s.step}" value="{s.default}">
+              </div>
+"""
+            for s in curve.sliders
+        )
         interactive_html = f"""
         <div class="card">
-          <h2 class="card-title">交互可视化： y = ax² + bx + c</h2>
+          <h2 class="card-title">{escape_html(heading)}</h2>
           <div class="grid-2">
             <div class="chart-wrap">
-              <canvas id="parabolaCanvas" width="860" height="420" data-interactive="{payload}"></canvas>
+              <canvas id="curveCanvas" width="860" height="420" data-interactive="{payload}"></canvas>
             </div>
             <div class="controls">
-              <div class="ctrl">
-                <div class="ctrl-row">
-                  <div class="ctrl-label">二次项系数 a：</div>
-                  <div class="ctrl-val" id="valA">{a0:.2f}</div>
-                </div>
-                <input type="range" id="sliderA" min="{interactive_cfg['params']['a']['min']}" max="{interactive_cfg['params']['a']['max']}" step="{interactive_cfg['params']['a']['step']}" value="{a0}">
-              </div>
-
-              <div class="ctrl">
-                <div class="ctrl-row">
-                  <div class="ctrl-label">一次项系数 b：</div>
-                  <div class="ctrl-val" id="valB">{b0:.2f}</div>
-                </div>
-                <input type="range" id="sliderB" min="{interactive_cfg['params']['b']['min']}" max="{interactive_cfg['params']['b']['max']}" step="{interactive_cfg['params']['b']['step']}" value="{b0}">
-              </div>
-
-              <div class="ctrl">
-                <div class="ctrl-row">
-                  <div class="ctrl-label">常数项 c：</div>
-                  <div class="ctrl-val" id="valC">{c0:.2f}</div>
-                </div>
-                <input type="range" id="sliderC" min="{interactive_cfg['params']['c']['min']}" max="{interactive_cfg['params']['c']['max']}" step="{interactive_cfg['params']['c']['step']}" value="{c0}">
-              </div>
-
+              {controls}
               <div class="hint">
-                拖动滑块调整系数，观察抛物线的开口方向、顶点位置与整体平移变化。
+                {escape_html(hint)}
               </div>
             </div>
           </div>
         </div>
+        <script>
+          const interactiveCurve = {curve.js};
+        </script>
         """
 
     html = f"""
@@ -549,7 +567,13 @@ def build_html(data: dict) -> str:
     }}
     .section-body p {{ margin: 8px 0; }}
     .p-spacer {{ height: 10px; }}
-    .section-body ul {{ margin: 8px 0 8px 22px; }}
+    .section-body ul, .section-body ol {{ margin: 8px 0 8px 22px; }}
+    .section-body .md-h {{ margin: 14px 0 6px 0; }}
+    .section-body code {{ background:#f3f4f6; border-radius:4px; padding:0 4px; font-size:.92em; }}
+    .section-body pre.code code {{ background:none; padding:0; font-size:inherit; }}
+    table.md-table {{ border-collapse: collapse; margin: 10px 0; }}
+    table.md-table th, table.md-table td {{ border:1px solid var(--border); padding:6px 10px; }}
+    table.md-table th {{ background:#f9fafb; }}
 
     pre.code {{
       background: #0b1220;
@@ -579,6 +603,7 @@ def build_html(data: dict) -> str:
       border-radius: 12px;
       overflow:auto;
     }}
+    .viz-note {{ color: var(--muted); font-size:12px; margin:6px 0; }}
     .warn {{
       background: #fff7ed;
       border: 1px solid rgba(249,115,22,.25);
@@ -649,40 +674,99 @@ def build_html(data: dict) -> str:
     {sections_html}
   </div>
 
-  <!-- Mermaid (optional). If unavailable/offline, visuals still show source. -->
+  <!-- Visuals render lazily: plots and Mermaid diagrams are drawn when they near the viewport. -->
   <script>
+    // Call fn(el) once, when el comes within 300px of the viewport (at once without IntersectionObserver).
+    const whenVisible = (function(){{
+      if(!("IntersectionObserver" in window)) return (el, fn)=> fn(el);
+      const pending = new Map();
+      const io = new IntersectionObserver(entries=>{{
+        entries.forEach(e=>{{
+          if(!e.isIntersecting || !pending.has(e.target)) return;
+          const fn = pending.get(e.target);
+          pending.delete(e.target);
+          io.unobserve(e.target);
+          fn(e.target);
+        }});
+      }}, {{ rootMargin: "300px 0px" }});
+      return (el, fn)=>{{ pending.set(el, fn); io.observe(el); }};
+    }})();
+
+    // Mermaid (optional): fetched when the first diagram nears the viewport, then each diagram
+    // renders on its own. If unavailable/offline, visuals still show source.
     (function initMermaidIfPresent(){{
-      const hasMermaid = document.querySelector(".mermaid");
-      if(!hasMermaid) return;
+      const blocks = document.querySelectorAll(".mermaid");
+      if(!blocks.length) return;
+
+      let state = "idle";  // idle -> loading -> ready | failed
+      const queue = [];
+
+      function render(el){{
+        try {{
+          if(window.mermaid.run) window.mermaid.run({{ nodes: [el] }}).catch(()=>{{}});
+          else window.mermaid.init(undefined, el);
+        }} catch(e) {{}}
+      }}
 
-      function init(){{
-        if(!window.mermaid) return;
+      function ready(){{
+        if(!window.mermaid) {{ state = "failed"; return; }}
         try {{
-          window.mermaid.initialize({{ startOnLoad: true, theme: "default" }});
+          window.mermaid.initialize({{ startOnLoad: false, theme: "default" }});
         }} catch(e) {{}}
+        state = "ready";
+        queue.splice(0).forEach(render);
       }}
 
-      if(window.mermaid) {{ init(); return; }}
+      function show(el){{
+        if(state === "ready") {{ render(el); return; }}
+        if(state === "failed") return;
+        queue.push(el);
+        if(state !== "idle") return;
+        if(window.mermaid) {{ ready(); return; }}
+
+        // Load local asset if provided (no CDN dependency by default).
+        state = "loading";
+        const s = document.createElement("script");
+        s.src = "assets/mermaid.min.js";
+        s.onload = ready;
+        s.onerror = function(){{ state = "failed"; /* keep source text */ }};
+        document.head.appendChild(s);
+      }}
 
-      // Load local asset if provided (no CDN dependency by default).
-      const s = document.createElement("script");
-      s.src = "assets/mermaid.min.js";
-      s.onload = init;
-      s.onerror = function(){{ /* keep source text */ }};
-      document.head.appendChild(s);
+      blocks.forEach(el=> whenVisible(el, show));
     }})();
   </script>
 
   <script>
     // --------- Plot renderer (visuals type=plot) ----------
-    function drawPlotCanvas(canvas){{
-      const payload = canvas.getAttribute("data-plot");
-      if(!payload) return;
+    // "float32" plot encoding: {{dtype:"f32le", b64}} columns decode straight into Float32Array
+    const LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+    function plotColumn(col){{
+      if(!col || col.dtype !== "f32le") return col || [];
+      const bin = atob(col.b64);
+      const bytes = new Uint8Array(bin.length);
+      for(let i=0;i<bin.length;i++) bytes[i] = bin.charCodeAt(i);
+      if(LITTLE_ENDIAN) return new Float32Array(bytes.buffer);
+      const view = new DataView(bytes.buffer), out = new Float32Array(bytes.length >> 2);
+      for(let i=0;i<out.length;i++) out[i] = view.getFloat32(4*i, true);
+      return out;
+    }}
 
+    function readPlotData(canvas){{
+      const payload = canvas.getAttribute("data-plot");
+      if(!payload) return null;
       let data;
-      try{{ data = JSON.parse(payload); }}catch(e){{ return; }}
+      try{{ data = JSON.parse(payload); }}catch(e){{ return null; }}
+      if(!data || typeof data !== "object" || Array.isArray(data)) return null;
+      data.series = (data.series || []).map(s=>Object.assign({{}}, s, {{x: plotColumn(s.x), y: plotColumn(s.y)}}));
+      return data;
+    }}
 
-      const series = (data.series || []);
+    function drawPlotCanvas(canvas){{
+      const data = readPlotData(canvas);
+      if(!data) return;
+
+      const series = data.series;
       if(series.length === 0) return;
 
       // set real pixels based on CSS size for crisp lines
@@ -742,42 +826,38 @@ def build_html(data: dict) -> str:
       }});
     }}
 
-    document.querySelectorAll("canvas[data-plot]").forEach(drawPlotCanvas);
-
-
-    // --------- Interactive parabola module (data-driven) ----------
-    (function initParabolaIfPresent(){{
-      const canvas = document.getElementById("parabolaCanvas");
-      const sa = document.getElementById("sliderA");
-      const sb = document.getElementById("sliderB");
-      const sc = document.getElementById("sliderC");
-      if(!canvas || !sa || !sb || !sc) return;
+    document.querySelectorAll("canvas[data-plot]").forEach(c=> whenVisible(c, drawPlotCanvas));
+
+    // plot data view: pretty-printed from the canvas payload on first open
+    document.querySelectorAll("details[data-plot-src]").forEach(d=>{{
+      d.addEventListener("toggle", ()=>{{
+        const pre = d.querySelector("pre");
+        if(!d.open || pre.textContent) return;
+        const canvas = document.getElementById(d.getAttribute("data-plot-src"));
+        const data = readPlotData(canvas);
+        pre.textContent = data
+          ? JSON.stringify(data, (k, v)=> v instanceof Float32Array ? Array.from(v) : v, 2)
+          : (canvas.getAttribute("data-plot") || "");
+      }});
+    }});
 
-      let cfg = {{}};
-      try {{
-        cfg = JSON.parse(canvas.getAttribute("data-interactive") || "{{}}") || {{}};
-      }} catch(e) {{
-        cfg = {{}};
-      }}
 
+    // --------- Interactive curve module (data-driven) ----------
+    // Sampling + drawing of y = curve(x, p) for one canvas context; p holds the slider values in
+    // spec order. Runs on the main thread, or (via its source text) inside the worker below, so
+    // both paths draw exactly the same picture.
+    function makeCurvePainter(ctx, cfg, cssW, cssH, curve) {{
       const xMin = Number(cfg?.domain?.x_min ?? -10);
       const xMax = Number(cfg?.domain?.x_max ?? 10);
       const yMin = Number(cfg?.range?.y_min ?? -10);
       const yMax = Number(cfg?.range?.y_max ?? 10);
       const samples = Math.max(10, parseInt(cfg?.plot_config?.samples ?? 800, 10));
       const grid = Boolean(cfg?.plot_config?.grid ?? true);
-      const showVertex = Boolean(cfg?.features?.show_vertex ?? true);
-      const showAxis = Boolean(cfg?.features?.show_axis ?? true);
-      const showIntercepts = Boolean(cfg?.features?.show_intercepts ?? false);
-
-      const cssW = canvas.clientWidth || canvas.width || 860;
-      const cssH = canvas.clientHeight || canvas.height || 420;
-      const dpr = window.devicePixelRatio || 1;
-      canvas.width = Math.floor(cssW * dpr);
-      canvas.height = Math.floor(cssH * dpr);
-
-      const ctx = canvas.getContext("2d");
-      ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+      // vertex / axis / intercepts only make sense for the quadratic y = ax² + bx + c
+      const quadratic = Boolean(cfg?.quadratic);
+      const showVertex = quadratic && Boolean(cfg?.features?.show_vertex ?? true);
+      const showAxis = quadratic && Boolean(cfg?.features?.show_axis ?? true);
+      const showIntercepts = quadratic && Boolean(cfg?.features?.show_intercepts ?? false);
 
       function safeDiv(num, den, fallback) {{
         return den === 0 ? fallback : (num / den);
@@ -835,26 +915,33 @@ def build_html(data: dict) -> str:
         }}
       }}
 
-      function drawParabola(a,b,c) {{
+      // Sample positions never change: compute x and its canvas coordinate once.
+      const xs = new Float64Array(samples + 1);
+      const cxs = new Float64Array(samples + 1);
+      for(let i=0; i<=samples; i++) {{
+        xs[i] = xMin + (xMax - xMin) * safeDiv(i, samples, 0);
+        cxs[i] = toCanvasX(xs[i]);
+      }}
+
+      function drawCurve(p) {{
         drawGrid();
 
-        // curve
+        // curve; non-finite values (e.g. log of a negative number) leave a gap
         ctx.strokeStyle = "#2563eb";
         ctx.lineWidth = 2.5;
         ctx.beginPath();
         let first = true;
         for(let i=0; i<=samples; i++) {{
-          const t = safeDiv(i, samples, 0);
-          const x = xMin + (xMax - xMin) * t;
-          const y = a*x*x + b*x + c;
-          const cx = toCanvasX(x);
+          const y = curve(xs[i], p);
+          if(!isFinite(y)) {{ first = true; continue; }}
           const cy = toCanvasY(y);
-          if(first) {{ ctx.moveTo(cx,cy); first=false; }}
-          else ctx.lineTo(cx,cy);
+          if(first) {{ ctx.moveTo(cxs[i],cy); first=false; }}
+          else ctx.lineTo(cxs[i],cy);
         }}
         ctx.stroke();
 
-        // features
+        // quadratic features; a, b, c are the first three params
+        const a = p[0], b = p[1], c = p[2];
         if(showVertex || showAxis) {{
           let vx = 0;
           if(a !== 0) vx = -b/(2*a);
@@ -893,29 +980,793 @@ def build_html(data: dict) -> str:
         }}
       }}
 
+      return drawCurve;
+    }}
+
+    (function initCurveIfPresent(){{
+      let canvas = document.getElementById("curveCanvas");
+      const sliders = Array.from(document.querySelectorAll("input.curve-param"));
+      if(!canvas || typeof interactiveCurve !== "function") return;
+
+      let cfg = {{}};
+      try {{
+        cfg = JSON.parse(canvas.getAttribute("data-interactive") || "{{}}") || {{}};
+      }} catch(e) {{
+        cfg = {{}};
+      }}
+
+      const cssW = canvas.clientWidth || canvas.width || 860;
+      const cssH = canvas.clientHeight || canvas.height || 420;
+      const dpr = window.devicePixelRatio || 1;
+
+      // Slider metadata is precomputed by the builder (data-index / data-decimals); an input event
+      // only updates its own slot and label.
+      const p = new Float64Array(sliders.length);
+
+      // Preferred: sample and draw in a worker on an OffscreenCanvas, so dragging a slider never
+      // blocks the page. At most one frame is in flight; newer slider values replace a queued one.
+      function workerPainter() {{
+        const src = document.getElementById("curveWorkerSrc");
+        if(!src || !canvas.transferControlToOffscreen || !window.Worker || !window.Blob || !window.URL) return null;
+        let worker;
+        try {{
+          const blob = new Blob(
+            [
+              makeCurvePainter.toString(),
+              "\\nconst interactiveCurve = ", interactiveCurve.toString(), ";\\n",
+              src.textContent,
+            ],
+            {{ type: "text/javascript" }}
+          );
+          worker = new Worker(URL.createObjectURL(blob));
+          const offscreen = canvas.transferControlToOffscreen();
+          worker.postMessage({{ type: "init", canvas: offscreen, cfg, cssW, cssH, dpr }}, [offscreen]);
+        }} catch(e) {{
+          if(worker) worker.terminate();
+          return null;
+        }}
+        let busy = false, queued = false;
+        function send() {{ busy = true; worker.postMessage({{ type: "draw", p }}); }}
+        worker.onmessage = ()=>{{
+          busy = false;
+          if(queued) {{ queued = false; send(); }}
+        }};
+        // The transferred canvas cannot be drawn on here any more: swap in a fresh copy instead.
+        worker.onerror = ()=>{{
+          worker.onerror = worker.onmessage = null;
+          worker.terminate();
+          const fresh = canvas.cloneNode(false);
+          canvas.replaceWith(fresh);
+          canvas = fresh;
+          paint = mainThreadPainter();
+          update();
+        }};
+        return ()=>{{ if(busy) queued = true; else send(); }};
+      }}
+
+      // Fallback: draw on the main thread.
+      function mainThreadPainter() {{
+        canvas.width = Math.floor(cssW * dpr);
+        canvas.height = Math.floor(cssH * dpr);
+        const ctx = canvas.getContext("2d");
+        ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+        const draw = makeCurvePainter(ctx, cfg, cssW, cssH, interactiveCurve);
+        return ()=> draw(p);
+      }}
+
+      let paint = workerPainter() || mainThreadPainter();
+
+      // Slider events are coalesced to one redraw per animation frame.
+      let frame = 0;
       function update() {{
-        const a = parseFloat(sa.value);
-        const b = parseFloat(sb.value);
-        const c = parseFloat(sc.value);
-        document.getElementById("valA").textContent = a.toFixed(2);
-        document.getElementById("valB").textContent = b.toFixed(2);
-        document.getElementById("valC").textContent = c.toFixed(2);
-        drawParabola(a,b,c);
+        frame = 0;
+        paint();
+      }}
+      function schedule() {{
+        if(!frame) frame = requestAnimationFrame(update);
       }}
 
-      sa.addEventListener("input", update);
-      sb.addEventListener("input", update);
-      sc.addEventListener("input", update);
+      sliders.forEach(slider=>{{
+        const i = parseInt(slider.getAttribute("data-index"), 10);
+        const decimals = parseInt(slider.getAttribute("data-decimals"), 10) || 2;
+        const label = document.getElementById("val_" + i);
+        p[i] = parseFloat(slider.value);
+        slider.addEventListener("input", ()=>{{
+          p[i] = parseFloat(slider.value);
+          label.textContent = p[i].toFixed(decimals);
+          schedule();
+        }});
+      }});
 
       update();
     }})();
   </script>
+
+  <!-- Curve worker body; the page prepends makeCurvePainter and the compiled curve, then starts it
+       from a Blob URL. -->
+  <script type="text/js-worker" id="curveWorkerSrc">
+    let draw = null;
+    self.onmessage = (e)=>{{
+      const m = e.data;
+      if(m.type === "init") {{
+        m.canvas.width = Math.floor(m.cssW * m.dpr);
+        m.canvas.height = Math.floor(m.cssH * m.dpr);
+        const ctx = m.canvas.getContext("2d");
+        ctx.setTransform(m.dpr, 0, 0, m.dpr, 0, 0);
+        draw = makeCurvePainter(ctx, m.cfg, m.cssW, m.cssH, interactiveCurve);
+      }} else if(m.type === "draw" && draw) {{
+        draw(m.p);
+        self.postMessage("drawn");
+      }}
+    }};
+  </script>
 </body>
 </html>
 """
     return html
 
 
+# ----------------------------
+# Pipeline
+# ----------------------------
+def prepare_spec(data: Any, *, fail_fast: bool = False) -> Tuple[Dict[str, Any], str, str]:
+    """
+    Hash, normalize and validate a parsed VisualSpec.
+    Returns (data, spec_hash, spec_version). Raises VisualSpecValidationError on invalid v1.1 specs.
+    """
+    spec_hash = compute_spec_hash(data)
+    data = normalize_visual_spec(data)
+
+    spec_version = str(data.get("spec_version") or "")
+    if spec_version.startswith(SUPPORTED_SPEC_VERSION_PREFIXES):
+        validate_visual_spec_v1_1(data, fail_fast=fail_fast)
+    return data, spec_hash, spec_version
+
+
+def load_spec(json_path: str, *, fail_fast: bool = False) -> Tuple[Dict[str, Any], str, str]:
+    """Read a VisualSpec file and prepare it (see prepare_spec)."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return prepare_spec(data, fail_fast=fail_fast)
+
+
+# Reproducible builds: the earliest and latest times a ZIP member can carry (UTC).
+ZIP_EPOCH_MIN = 315532800  # 1980-01-01
+ZIP_EPOCH_MAX = 4354819199  # 2107-12-31 23:59:59
+
+
+def source_date_epoch() -> Optional[int]:
+    """SOURCE_DATE_EPOCH from the environment, or None. Raises ValueError when it is malformed."""
+    raw = os.environ.get("SOURCE_DATE_EPOCH")
+    if raw is None or raw == "":
+        return None
+    if not raw.strip().isdigit():
+        raise ValueError(f"SOURCE_DATE_EPOCH must be a non-negative integer (got {raw!r})")
+    return int(raw)
+
+
+def reproducible_epoch(data: Dict[str, Any]) -> int:
+    """
+    Build time for reproducible mode: SOURCE_DATE_EPOCH when set, else meta.date (or
+    meta.generated_at) at midnight UTC, else 1980-01-01. Clamped to the ZIP time range.
+    """
+    epoch = source_date_epoch()
+    if epoch is None:
+        epoch = ZIP_EPOCH_MIN
+        meta = data.get("meta") or {}
+        for k in ("date", "generated_at"):
+            v = meta.get(k) if isinstance(meta, dict) else None
+            if isinstance(v, str) and v.strip():
+                try:
+                    day = datetime.strptime(v.strip()[:10], "%Y-%m-%d")
+                except ValueError:
+                    break
+                epoch = int(day.replace(tzinfo=timezone.utc).timestamp())
+                break
+    return min(max(epoch, ZIP_EPOCH_MIN), ZIP_EPOCH_MAX)
+
+
+def _pin_meta_date(data: Dict[str, Any], epoch: int) -> Dict[str, Any]:
+    """Spec with meta.date set from `epoch` when it has none (renderers would print today)."""
+    meta = data.get("meta") if isinstance(data.get("meta"), dict) else {}
+    if any(isinstance(meta.get(k), str) and meta.get(k).strip() for k in ("date", "generated_at")):
+        return data
+    day = datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d")
+    return dict(data, meta=dict(meta, date=day))
+
+
+# Exports 1-4 in their fixed output order: (export key, log label)
+EXPORT_STEPS = (
+    ("html", "HTML"),
+    ("lecture_docx", "Lecture DOCX"),
+    ("quiz_docx", "Quiz DOCX"),
+    ("pdf", "PDF"),
+)
+
+
+def export_file_name(key: str, title_safe: str) -> str:
+    return {
+        "html": "course_interactive.html",
+        "lecture_docx": f"{title_safe}_讲稿.docx",
+        "quiz_docx": f"{title_safe}_习题集.docx",
+        "pdf": "course_notes.pdf",
+    }[key]
+
+
+def write_html(data: Dict[str, Any], out_path: str, *, writer: Optional[ArtifactWriter] = None) -> Dict[str, Any]:
+    """
+    Write the HTML page plus one full-resolution JSON sidecar per downsampled plot, next to it
+    (all recorded in `writer`).
+    Returns {"sidecars": [...], "plots": [...]} for the manifest when any plot was downsampled.
+    """
+    writer = writer if writer is not None else ArtifactWriter()
+    prefix = os.path.splitext(os.path.basename(out_path))[0]
+    sidecars: Dict[str, Any] = {}
+    plots: List[Dict[str, Any]] = []
+    html = build_html(data, sidecar_prefix=prefix, sidecars=sidecars, plots=plots)
+    outdir = os.path.dirname(out_path)
+    for name, full in sidecars.items():
+        payload = json.dumps(full, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        writer.write(os.path.join(outdir, name), payload)
+    writer.write(out_path, html.encode("utf-8"))
+    if not any(p["kept"] < p["points"] for p in plots):
+        return {}
+    return {"sidecars": sorted(sidecars), "plots": plots}
+
+
+# Renderer registry: export key -> (module, function(course_data, out_path)).
+# Modules are imported on first use, so --validate-only and HTML-only runs never load
+# reportlab or python-docx.
+RENDERERS: Dict[str, Tuple[str, str]] = {
+    "html": (__name__, "write_html"),
+    "lecture_docx": ("render_docx", "render_lecture_docx"),
+    "quiz_docx": ("render_docx", "render_quiz_docx"),
+    "pdf": ("render_pdf", "render_pdf"),
+}
+
+
+def get_renderer(key: str) -> Callable[[Dict[str, Any], str], Any]:
+    try:
+        module_name, func_name = RENDERERS[key]
+    except KeyError:
+        raise ValueError(f"unknown export: {key}") from None
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+DOCX_EXPORTS = ("lecture_docx", "quiz_docx")
+# Same as render_docx.DOCX_BACKENDS; not imported here so startup stays free of python-docx.
+DOCX_BACKENDS = ("python-docx", "stream")
+
+
+def render_export(
+    key: str,
+    data: Dict[str, Any],
+    name: str,
+    *,
+    outdir: Optional[str] = None,
+    keep: bool = False,
+    docx_backend: str = "python-docx",
+    date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]], Dict[str, bytes]]:
+    """
+    Render one export. Top-level so process-pool workers can pickle it.
+    Returns (the renderer's per-file info for the manifest (e.g. the HTML's sidecars) or {},
+    the {"size", "sha256"} entries and the bytes of the files it produced: `name` and its sidecars).
+    Without `outdir` everything stays in memory (build()). With `outdir` the files are written
+    there and bytes are only returned with `keep` (in-process renders, for the zip); workers
+    leave it off, so no bytes travel back, and a streamed DOCX is never held in memory.
+    `date_time` pins container timestamps (reproducible builds).
+    """
+    if outdir is None:
+        writer = ArtifactWriter(date_time=date_time, in_memory=True)
+        out_path = name
+    else:
+        writer = ArtifactWriter(keep=keep, date_time=date_time)
+        out_path = os.path.join(outdir, name)
+    kwargs: Dict[str, Any] = {"writer": writer}
+    if key in DOCX_EXPORTS:
+        kwargs["backend"] = docx_backend
+    info = get_renderer(key)(data, out_path, **kwargs) or {}
+    return info, writer.entries, writer.contents
+
+
+def _file_matches(outdir: str, name: str, entry: Dict[str, Any]) -> bool:
+    """Whether the file still has the recorded bytes: size first, then one hashing read (a same-size edit)."""
+    p = os.path.join(outdir, name)
+    try:
+        return entry.get("size") == os.path.getsize(p) and entry.get("sha256") == sha256_of_file(p)
+    except OSError:
+        return False
+
+
+def read_reusable_exports(outdir: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Export inputs recorded by the previous build in `outdir` whose files are still in place unchanged,
+    with the per-file info and the {"size", "sha256"} entries (the file and its sidecars) of
+    their manifest entries ({"file", "hash", "info", "entries"}).
+    Returns {} when there is no usable manifest or it was written by another BUILDER_VERSION.
+    """
+    try:
+        with open(os.path.join(outdir, "manifest.json"), "r", encoding="utf-8") as f:
+            prev = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(prev, dict) or prev.get("builder_version") != BUILDER_VERSION:
+        return {}
+
+    entries = {e.get("name"): e for e in prev.get("files") or [] if isinstance(e, dict)}
+    reusable: Dict[str, Dict[str, Any]] = {}
+    for key, entry in (prev.get("inputs") or {}).items():
+        if not isinstance(entry, dict):
+            continue
+        name, digest = entry.get("file"), entry.get("hash")
+        if not isinstance(name, str) or not isinstance(digest, str):
+            continue
+        prev_entry = entries.get(name) or {}
+        # companion files (the HTML's plot data sidecars) must still be in place as well
+        companions = [entries.get(c) or {"name": c} for c in prev_entry.get("sidecars") or []]
+        if _file_matches(outdir, name, prev_entry) and all(_file_matches(outdir, c["name"], c) for c in companions):
+            info = {k: v for k, v in prev_entry.items() if k not in ("name", "size", "sha256")}
+            known = {
+                e["name"]: {"size": e["size"], "sha256": e["sha256"]}
+                for e in [dict(prev_entry, name=name)] + companions
+                if isinstance(e.get("sha256"), str)
+            }
+            reusable[key] = {"file": name, "hash": digest, "info": info, "entries": known}
+    return reusable
+
+
+class BuildResult:
+    """
+    One build, in memory (see build()). `files` maps file name -> bytes for every rendered file
+    (HTML and its plot sidecars, DOCX, PDF; only those kept for the zip when build_data wrote
+    them into a `render_dir`), `manifest` is the manifest.json content, `outputs`
+    the file names in export order and `exports` one {"key", "file", "hash", "rendered", "info",
+    "entries"} per export. The ZIP bundle is assembled on demand: zip_bytes() or iter_zip().
+    """
+
+    def __init__(
+        self,
+        files: Dict[str, bytes],
+        manifest: Dict[str, Any],
+        outputs: List[str],
+        exports: List[Dict[str, Any]],
+        *,
+        zip_level: int = 6,
+        date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
+    ):
+        self.files = files
+        self.manifest = manifest
+        self.outputs = outputs
+        self.exports = exports
+        self.zip_level = zip_level
+        self.date_time = date_time
+
+    @property
+    def zip_name(self) -> str:
+        return self.manifest.get("zip") or "bundle.zip"
+
+    def manifest_bytes(self) -> bytes:
+        return dump_manifest(self.manifest)
+
+    def iter_zip(self, workers: Optional[int] = None) -> Iterator[bytes]:
+        """The bundle as a stream of chunks (same bytes as pack() writes for these files)."""
+        missing = [e["name"] for e in self.manifest["files"] if e["name"] not in self.files]
+        if missing:
+            raise ValueError(f"files not in memory (found through lookup): {', '.join(missing)}")
+        members = [("manifest.json", self.manifest_bytes())] + sorted(self.files.items())
+        return iter_zip(members, compresslevel=self.zip_level, workers=workers, date_time=self.date_time)
+
+    def zip_bytes(self, workers: Optional[int] = None) -> bytes:
+        return b"".join(self.iter_zip(workers))
+
+
+def build_data(
+    data: Dict[str, Any],
+    *,
+    spec_hash: str,
+    spec_version: str,
+    only: Optional[Sequence[str]] = None,
+    jobs: int = 1,
+    executor: Optional[Executor] = None,
+    docx_backend: str = "python-docx",
+    zip_level: int = 6,
+    reproducible: bool = False,
+    lookup: Optional[Callable[[str, str, str], Optional[Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]]]] = None,
+    outdir: Optional[str] = None,
+    cache_stats: Optional[Dict[str, int]] = None,
+    render_dir: Optional[str] = None,
+) -> BuildResult:
+    """
+    Render exports 1-4 of an already validated spec into memory and compute the manifest (5)
+    from the buffers; nothing touches the filesystem. The ZIP (6) is assembled from the result.
+    With `render_dir` (build_outputs) the exports are written there instead and `files` only
+    holds what in-process renders kept for the zip.
+    `lookup(key, file name, input hash)` may return (info, entries) for an export that is
+    available elsewhere (see build_outputs): it is then not rendered and not in `files`.
+    `outdir` and `cache_stats` are only recorded in the manifest, unless `reproducible`.
+    Other options as in build_outputs.
+    """
+    epoch = date_time = None
+    if reproducible:
+        epoch = reproducible_epoch(data)
+        date_time = time.gmtime(epoch)[:6]
+        data = _pin_meta_date(data, epoch)
+
+    exports = normalize_exports(data.get("exports"), only=only)
+
+    title_safe = sanitize_filename_component(get_meta_title(data))
+
+    # 1-4) HTML, lecture DOCX, quiz DOCX, PDF
+    steps: List[Dict[str, Any]] = []
+    for key, _label in EXPORT_STEPS:
+        if not exports[key]:
+            continue
+        variants = []
+        if key in DOCX_EXPORTS and docx_backend != "python-docx":
+            variants.append(f"docx:{docx_backend}")
+        if reproducible and key != "html":
+            variants.append(f"reproducible:{epoch}")
+        input_hash = compute_export_hash(data, key, variant=",".join(variants) or None)
+        name = export_file_name(key, title_safe)
+        found = lookup(key, name, input_hash) if lookup is not None else None
+        step = {"key": key, "file": name, "hash": input_hash, "rendered": found is None, "info": {}, "entries": {}}
+        if found is not None:
+            step["info"], step["entries"] = found
+        steps.append(step)
+
+    todo = [step for step in steps if step["rendered"]]
+    options: Dict[str, Any] = {"outdir": render_dir, "docx_backend": docx_backend, "date_time": date_time}
+    if len(todo) > 1 and (executor is not None or jobs > 1):
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = executor or ProcessPoolExecutor(max_workers=min(jobs, len(todo)))
+        try:
+            futures = [pool.submit(render_export, step["key"], data, step["file"], **options) for step in todo]
+            results = [fut.result() for fut in futures]
+        finally:
+            if executor is None:
+                pool.shutdown()
+    else:
+        # writing into render_dir, in-process renders keep their bytes so the zip need not read them back
+        keep = render_dir is not None and exports["zip"]
+        results = [render_export(step["key"], data, step["file"], keep=keep, **options) for step in todo]
+    files: Dict[str, bytes] = {}
+    for step, (info, written, contents) in zip(todo, results):
+        step["info"], step["entries"] = info, written
+        files.update(contents)
+
+    outputs: List[str] = []
+    inputs: Dict[str, Dict[str, str]] = {}
+    file_info: Dict[str, Dict[str, Any]] = {}
+    entries: Dict[str, Dict[str, Any]] = {}
+    for step in steps:
+        outputs.append(step["file"])
+        outputs.extend(step["info"].get("sidecars") or [])
+        inputs[step["key"]] = {"file": step["file"], "hash": step["hash"]}
+        file_info[step["file"]] = step["info"]
+        entries.update(step["entries"])
+
+    # 5) manifest.json (always)
+    generated_at = None
+    if reproducible:
+        generated_at = datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec="seconds")
+        outdir = cache_stats = None
+    manifest = manifest_data(
+        files=outputs,
+        entries=entries,
+        spec_version=spec_version,
+        builder_version=BUILDER_VERSION,
+        spec_hash=spec_hash,
+        generated_at=generated_at,
+        zip_name=exports["zip_name"] if exports["zip"] else None,
+        inputs=inputs,
+        file_info=file_info,
+        outdir=outdir,
+        cache_stats=cache_stats,
+    )
+    return BuildResult(files, manifest, outputs, steps, zip_level=zip_level, date_time=date_time)
+
+
+def build(
+    spec: Any,
+    *,
+    only: Optional[Sequence[str]] = None,
+    jobs: int = 1,
+    executor: Optional[Executor] = None,
+    docx_backend: str = "python-docx",
+    zip_level: int = 6,
+    reproducible: bool = False,
+) -> BuildResult:
+    """
+    Library entry point: validate a parsed VisualSpec and build it in memory, e.g. to stream the
+    bundle into an HTTP response (`result.iter_zip()`). Raises VisualSpecValidationError.
+    Options as in build_outputs.
+    """
+    data, spec_hash, spec_version = prepare_spec(spec)
+    return build_data(
+        data,
+        spec_hash=spec_hash,
+        spec_version=spec_version,
+        only=only,
+        jobs=jobs,
+        executor=executor,
+        docx_backend=docx_backend,
+        zip_level=zip_level,
+        reproducible=reproducible,
+    )
+
+
+def build_outputs(
+    data: Dict[str, Any],
+    outdir: str,
+    *,
+    spec_hash: str,
+    spec_version: str,
+    only: Optional[Sequence[str]] = None,
+    jobs: int = 1,
+    executor: Optional[Executor] = None,
+    incremental: bool = False,
+    docx_backend: str = "python-docx",
+    zip_level: int = 6,
+    reproducible: bool = False,
+    cache: Optional[ArtifactCache] = None,
+    log: Optional[Callable[[str], None]] = print,
+) -> Dict[str, Any]:
+    """
+    Run exports 1-6 for an already validated spec into `outdir`: build_data renders the exports
+    there, then the manifest and the ZIP are written (files are replaced, never truncated).
+    With `jobs > 1` (or a shared `executor`) exports 1-4 render concurrently in worker
+    processes; outputs are still collected in the fixed export order before manifest/zip.
+    With `incremental`, exports whose input hash matches the previous manifest are kept as-is.
+    `docx_backend` picks the DOCX writer ("python-docx", or "stream" for very large documents).
+    `zip_level` is the deflate level for the bundle's compressible members (0: store all).
+    With `reproducible`, identical specs give byte-identical outputs, manifest and ZIP: times come
+    from reproducible_epoch and host-specific fields (outdir, cache stats) are left out.
+    With a `cache`, exports found there are linked into `outdir` instead of rendered, and
+    rendered ones are added to it; hit/miss counts go into the manifest.
+    Returns {"outputs": [...], "manifest": path, "zip": path or None, "skipped": [...], "cached": [...]}.
+    """
+    emit = log or (lambda _msg: None)
+    os.makedirs(outdir, exist_ok=True)
+
+    reusable = read_reusable_exports(outdir) if incremental else {}
+    skipped: List[str] = []
+    cached: List[str] = []
+    cache_keys: Dict[str, str] = {}
+    # filled in by lookup(), which build_data runs before it computes the manifest
+    cache_stats = {"hits": 0, "misses": 0} if cache is not None else None
+
+    def lookup(key: str, name: str, input_hash: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]]:
+        prev = reusable.get(key)
+        if prev and prev["hash"] == input_hash and prev["file"] == name:
+            skipped.append(key)
+            return prev["info"], prev["entries"]
+        if cache is None:
+            return None
+        cache_keys[key] = ArtifactCache.key(key, input_hash, name)
+        hit = cache.fetch(cache_keys[key], outdir)
+        cache_stats["misses" if hit is None else "hits"] += 1
+        if hit is not None:
+            cached.append(key)
+        return hit
+
+    res = build_data(
+        data,
+        spec_hash=spec_hash,
+        spec_version=spec_version,
+        only=only,
+        jobs=jobs,
+        executor=executor,
+        docx_backend=docx_backend,
+        zip_level=zip_level,
+        reproducible=reproducible,
+        lookup=lookup,
+        outdir=os.path.abspath(outdir),
+        cache_stats=cache_stats,
+        render_dir=outdir,
+    )
+
+    labels = dict(EXPORT_STEPS)
+    for step in res.exports:
+        label, out_path = labels[step["key"]], os.path.join(outdir, step["file"])
+        if step["rendered"]:
+            if cache is not None:
+                cache.store(cache_keys[step["key"]], outdir, step["info"], step["entries"])
+            emit(f"[SUCCESS] {label} generated: {out_path}")
+        elif step["key"] in cached:
+            emit(f"[SUCCESS] {label} restored from cache: {out_path}")
+        else:
+            emit(f"[SKIP] {label} unchanged: {out_path}")
+
+    manifest_path = os.path.join(outdir, "manifest.json")
+    write_file(manifest_path, res.manifest_bytes())
+    emit(f"[SUCCESS] Manifest generated: {manifest_path}")
+
+    zip_out = None
+    if res.manifest["zip"]:
+        # reused, cached and worker-rendered files are read from outdir, the rest zipped from memory
+        zip_out = pack(
+            outdir,
+            res.zip_name,
+            files=res.outputs,
+            manifest_path=manifest_path,
+            contents=res.files,
+            compresslevel=zip_level,
+            date_time=res.date_time,
+        )["zip"]
+        emit(f"[SUCCESS] ZIP generated: {zip_out}")
+
+    return {
+        "outputs": res.outputs,
+        "manifest": manifest_path,
+        "zip": zip_out,
+        "skipped": skipped,
+        "cached": cached,
+    }
+
+
+# ----------------------------
+# Batch
+# ----------------------------
+BATCH_REPORT_NAME = "batch_report.json"
+
+
+def collect_batch_specs(source: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Expand a batch source into (spec_path, outdir_override) pairs:
+    - a directory: every *.json directly inside it
+    - a .jsonl manifest: one spec per line, either a path string or {"path": ..., "outdir": ...};
+      relative entries are resolved against the manifest folder
+    - anything else: a glob pattern (recursive "**" allowed)
+    """
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(".json"))
+        return [(os.path.join(source, n), None) for n in names if os.path.isfile(os.path.join(source, n))]
+
+    if source.lower().endswith(".jsonl") and os.path.isfile(source):
+        base = os.path.dirname(os.path.abspath(source))
+        specs: List[Tuple[str, Optional[str]]] = []
+        with open(source, "r", encoding="utf-8") as f:
+            for lineno, raw in enumerate(f, start=1):
+                line = raw.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                if isinstance(entry, str):
+                    entry = {"path": entry}
+                if not isinstance(entry, dict) or not isinstance(entry.get("path"), str):
+                    raise VisualSpecValidationError(f"{source}:{lineno}: expected a path string or {{\"path\": ...}}")
+                spec_path = entry["path"]
+                if not os.path.isabs(spec_path):
+                    spec_path = os.path.join(base, spec_path)
+                spec_outdir = entry.get("outdir") if isinstance(entry.get("outdir"), str) else None
+                if spec_outdir and not os.path.isabs(spec_outdir):
+                    spec_outdir = os.path.join(base, spec_outdir)
+                specs.append((spec_path, spec_outdir))
+        return specs
+
+    return [(p, None) for p in sorted(glob.glob(source, recursive=True)) if os.path.isfile(p)]
+
+
+def resolve_batch_outdir(source: str, outdir: str) -> str:
+    if os.path.isabs(outdir):
+        return outdir
+    # Same rule as single builds: relative outdir follows the source folder, globs follow CWD.
+    if os.path.isdir(source):
+        return os.path.abspath(os.path.join(source, outdir))
+    if source.lower().endswith(".jsonl") and os.path.isfile(source):
+        return resolve_outdir(source, outdir)
+    return os.path.abspath(outdir)
+
+
+def build_batch(
+    source: str,
+    outdir: str,
+    *,
+    only: Optional[Sequence[str]] = None,
+    validate_only: bool = False,
+    fail_fast: bool = False,
+    jobs: int = 1,
+    incremental: bool = False,
+    docx_backend: str = "python-docx",
+    zip_level: int = 6,
+    reproducible: bool = False,
+    cache: Optional[ArtifactCache] = None,
+    log: Optional[Callable[[str], None]] = print,
+) -> Dict[str, Any]:
+    """
+    Build every spec of a batch source in this process, sharing the cached schema validator
+    and the registered PDF font. Each spec gets its own folder under `outdir`; a summary report with
+    per-spec status and timing is written to `outdir/batch_report.json`.
+    With `jobs > 1` one process pool renders the exports of every spec.
+    """
+    emit = log or (lambda _msg: None)
+    root = resolve_batch_outdir(source, outdir)
+    os.makedirs(root, exist_ok=True)
+
+    specs = collect_batch_specs(source)
+
+    used_dirs = set()
+    entries: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    pool: Optional[Executor] = None
+    if jobs > 1 and not validate_only:
+        from concurrent.futures import ProcessPoolExecutor
+
+        pool = ProcessPoolExecutor(max_workers=jobs)
+
+    for spec_path, spec_outdir in specs:
+        if spec_outdir is None:
+            stem = sanitize_filename_component(os.path.splitext(os.path.basename(spec_path))[0])
+            name, n = stem, 1
+            while name.lower() in used_dirs:
+                n += 1
+                name = f"{stem}_{n}"
+            used_dirs.add(name.lower())
+            spec_outdir = os.path.join(root, name)
+
+        entry: Dict[str, Any] = {"spec": spec_path, "outdir": spec_outdir, "status": "ok"}
+        t0 = time.perf_counter()
+        try:
+            data, spec_hash, spec_version = load_spec(spec_path, fail_fast=fail_fast)
+            if validate_only:
+                entry["status"] = "valid"
+            else:
+                res = build_outputs(
+                    data,
+                    spec_outdir,
+                    spec_hash=spec_hash,
+                    spec_version=spec_version,
+                    only=only,
+                    executor=pool,
+                    incremental=incremental,
+                    docx_backend=docx_backend,
+                    zip_level=zip_level,
+                    reproducible=reproducible,
+                    cache=cache,
+                    log=None,
+                )
+                entry["files"] = res["outputs"]
+                if incremental:
+                    entry["skipped"] = res["skipped"]
+                if cache is not None:
+                    entry["cached"] = res["cached"]
+                entry["zip"] = res["zip"]
+        except VisualSpecValidationError as e:
+            entry["status"] = "invalid"
+            entry["error"] = str(e)
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = f"{type(e).__name__}: {e}"
+        entry["seconds"] = round(time.perf_counter() - t0, 4)
+        entries.append(entry)
+
+        tag = "[ERROR]" if entry["status"] in ("invalid", "error") else "[SUCCESS]"
+        detail = f" {entry['error']}" if "error" in entry else ""
+        emit(f"{tag} {spec_path} ({entry['status']}, {entry['seconds']:.2f}s){detail}")
+
+    if pool is not None:
+        pool.shutdown()
+
+    failed = sum(1 for e in entries if e["status"] in ("invalid", "error"))
+    report: Dict[str, Any] = {
+        "builder_version": BUILDER_VERSION,
+        "source": source,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "total": len(entries),
+        "ok": len(entries) - failed,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - started, 4),
+        "specs": entries,
+    }
+    report_path = os.path.join(root, BATCH_REPORT_NAME)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    report["report_path"] = report_path
+    return report
+
+
 # ----------------------------
 # Main
 # ----------------------------
@@ -929,8 +1780,19 @@ def main():
     except Exception:
         pass
 
-    parser = argparse.ArgumentParser(description="VisualSpec builder (HTML/DOCX/PDF/ZIP)")
-    parser.add_argument("json_path", help="Path to course_data.json (VisualSpec)")
+    if sys.argv[1:2] == ["serve"]:
+        from build_server import serve_main
+
+        serve_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="VisualSpec builder (HTML/DOCX/PDF/ZIP). Run `builder.py serve --help` for the build server."
+    )
+    parser.add_argument(
+        "json_path",
+        help="Path to course_data.json (VisualSpec); with --batch: a directory, glob or .jsonl list of specs",
+    )
     parser.add_argument(
         "--outdir",
         default="output",
@@ -942,99 +1804,127 @@ def main():
         help="Comma-separated exports override: html,lecture_docx,quiz_docx,pdf,zip",
     )
     parser.add_argument("--validate-only", action="store_true", help="Validate spec and exit")
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Report the first schema error found instead of collecting and sorting all of them",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Build many specs in one process; each spec gets <outdir>/<spec name>/ plus a batch_report.json",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Render HTML/DOCX/PDF exports in N worker processes (default: 1, serial)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip exports whose spec inputs and builder version match the previous manifest.json in outdir",
+    )
+    parser.add_argument(
+        "--docx-backend",
+        choices=DOCX_BACKENDS,
+        default="python-docx",
+        help="DOCX writer: python-docx (default) or stream (writes document.xml incrementally, no document tree)",
+    )
+    parser.add_argument(
+        "--zip-level",
+        type=int,
+        choices=range(10),
+        default=6,
+        metavar="0-9",
+        help="Deflate level for compressible ZIP members (default: 6; 0 stores everything)",
+    )
+    parser.add_argument(
+        "--reproducible",
+        action="store_true",
+        help="Byte-identical outputs for identical specs: times from SOURCE_DATE_EPOCH or meta.date, "
+        "no host paths in the manifest (also enabled by setting SOURCE_DATE_EPOCH)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Content-addressed artifact cache shared by builds and courses; hits are hardlinked into outdir",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES >> 20,
+        help=f"Evict least recently used cache entries beyond this size (default: {DEFAULT_MAX_BYTES >> 20})",
+    )
     args = parser.parse_args()
 
-    with open(args.json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    only = parse_only_list(args.only)
+    jobs = max(1, args.jobs)
+    try:
+        reproducible = args.reproducible or source_date_epoch() is not None
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    cache = ArtifactCache(args.cache_dir, max(0, args.cache_max_mb) << 20) if args.cache_dir else None
 
-    spec_hash = compute_spec_hash(data)
-    data = normalize_visual_spec(data)
+    if args.batch:
+        try:
+            report = build_batch(
+                args.json_path,
+                args.outdir,
+                only=only,
+                validate_only=args.validate_only,
+                fail_fast=args.fail_fast,
+                jobs=jobs,
+                incremental=args.incremental,
+                docx_backend=args.docx_backend,
+                zip_level=args.zip_level,
+                reproducible=reproducible,
+                cache=cache,
+            )
+        except VisualSpecValidationError as e:
+            print(f"[ERROR] Batch source invalid: {e}")
+            sys.exit(1)
+        print(
+            f"[SUCCESS] Batch report generated: {report['report_path']} "
+            f"({report['ok']}/{report['total']} ok, {report['seconds']:.2f}s)"
+        )
+        if report["failed"]:
+            sys.exit(1)
+        return
 
-    spec_version = str(data.get("spec_version") or "")
     try:
-        if spec_version.startswith("1.1") or spec_version.startswith("v1.1"):
-            validate_visual_spec_v1_1(data)
-        else:
-            print("[WARN] spec_version is not v1.1; schema validation skipped.")
+        data, spec_hash, spec_version = load_spec(args.json_path, fail_fast=args.fail_fast)
     except VisualSpecValidationError as e:
         print(f"[ERROR] VisualSpec validation failed: {e}")
         sys.exit(1)
 
+    if not spec_version.startswith(SUPPORTED_SPEC_VERSION_PREFIXES):
+        print("[WARN] spec_version is not v1.1; schema validation skipped.")
+
     if args.validate_only:
         print("[SUCCESS] VisualSpec validation passed.")
         return
 
     outdir = resolve_outdir(args.json_path, args.outdir)
-    os.makedirs(outdir, exist_ok=True)
-
-    only = parse_only_list(args.only)
-    exports = normalize_exports(data.get("exports"), only=only)
-
-    title_safe = sanitize_filename_component(get_meta_title(data))
-
-    outputs: List[str] = []
-
-    # 1) HTML
-    if exports["html"]:
-        out_html = os.path.join(outdir, "course_interactive.html")
-        if not safe_remove(out_html):
-            out_html = os.path.join(outdir, f"course_interactive_{now_stamp()}.html")
-        html = build_html(data)
-        with open(out_html, "w", encoding="utf-8") as f:
-            f.write(html)
-        outputs.append(os.path.basename(out_html))
-        print(f"[SUCCESS] HTML generated: {out_html}")
-
-    # 2) Lecture DOCX
-    if exports["lecture_docx"]:
-        out_docx = os.path.join(outdir, f"{title_safe}_讲稿.docx")
-        if not safe_remove(out_docx):
-            out_docx = os.path.join(outdir, f"{title_safe}_讲稿_{now_stamp()}.docx")
-        render_lecture_docx(data, out_docx)
-        outputs.append(os.path.basename(out_docx))
-        print(f"[SUCCESS] Lecture DOCX generated: {out_docx}")
-
-    # 3) Quiz DOCX
-    if exports["quiz_docx"]:
-        out_quiz = os.path.join(outdir, f"{title_safe}_习题集.docx")
-        if not safe_remove(out_quiz):
-            out_quiz = os.path.join(outdir, f"{title_safe}_习题集_{now_stamp()}.docx")
-        render_quiz_docx(data, out_quiz)
-        outputs.append(os.path.basename(out_quiz))
-        print(f"[SUCCESS] Quiz DOCX generated: {out_quiz}")
-
-    # 4) PDF
-    if exports["pdf"]:
-        out_pdf = os.path.join(outdir, "course_notes.pdf")
-        if not safe_remove(out_pdf):
-            out_pdf = os.path.join(outdir, f"course_notes_{now_stamp()}.pdf")
-        render_pdf(data, out_pdf)
-        outputs.append(os.path.basename(out_pdf))
-        print(f"[SUCCESS] PDF generated: {out_pdf}")
-
-    zip_name_final = None
-    if exports["zip"]:
-        zip_name_final = exports["zip_name"]
-        zip_path = os.path.join(outdir, zip_name_final)
-        if not safe_remove(zip_path):
-            root, _ext = os.path.splitext(zip_name_final)
-            zip_name_final = f"{root}_{now_stamp()}.zip"
-
-    # 5) manifest.json (always)
-    manifest_path = write_manifest(
-        outdir,
-        files=outputs,
-        spec_version=spec_version,
-        builder_version=BUILDER_VERSION,
-        spec_hash=spec_hash,
-        zip_name=zip_name_final,
-    )
-    print(f"[SUCCESS] Manifest generated: {manifest_path}")
-
-    # 6) ZIP (optional)
-    if zip_name_final:
-        res = pack(outdir, zip_name_final, files=outputs, manifest_path=manifest_path)
-        print(f"[SUCCESS] ZIP generated: {res['zip']}")
+    try:
+        build_outputs(
+            data,
+            outdir,
+            spec_hash=spec_hash,
+            spec_version=spec_version,
+            only=only,
+            jobs=jobs,
+            incremental=args.incremental,
+            docx_backend=args.docx_backend,
+            zip_level=args.zip_level,
+            reproducible=reproducible,
+            cache=cache,
+        )
+    except VisualSpecValidationError as e:
+        # specs other than v1.1 skip schema validation; renderers can still reject them
+        print(f"[ERROR] VisualSpec validation failed: {e}")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import os
+import re
+import zipfile
+from io import BytesIO
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape
+
+from md_blocks import MdSpan, parse_inline
+from pack_zip import pin_zip_timestamps
+
+DOCUMENT_PART = "word/document.xml"
+
+# Characters lxml (and therefore python-docx) refuses in text nodes.
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+_RUN_BREAKS = re.compile(r"([\t\r\n])")
+
+_FLUSH_BYTES = 64 * 1024
+_TWIPS_PER_EMU = 1 / 635
+_TABLE_LOOK = (
+    '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" w:noVBand="1" w:val="04A0"/>'
+)
+_CODE_RPR = '<w:rPr><w:rFonts w:ascii="Consolas" w:hAnsi="Consolas"/><w:sz w:val="20"/></w:rPr>'
+
+
+def _span_rpr(span: MdSpan) -> str:
+    """<w:rPr> for an inline span, in the element order python-docx writes."""
+    props = ('<w:rFonts w:ascii="Consolas" w:hAnsi="Consolas"/>' if span.code else "") + (
+        ("<w:b/>" if span.bold else "") + ("<w:i/>" if span.italic else "")
+    )
+    return f"<w:rPr>{props}</w:rPr>" if props else ""
+
+
+def _run_xml(text: str, rpr: str = "") -> str:
+    """One <w:r>, with tabs and line breaks mapped the way python-docx's Run.text setter does."""
+    if _INVALID_XML_CHARS.search(text):
+        raise ValueError("All strings must be XML compatible: no NULL bytes or control characters")
+    parts = [f"<w:r>{rpr}"]
+    for piece in _RUN_BREAKS.split(text):
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in ("\r", "\n"):
+            parts.append("<w:br/>")
+        elif piece:
+            space = ' xml:space="preserve"' if piece != piece.strip() else ""
+            parts.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    parts.append("</w:r>")
+    return "".join(parts)
+
+
+class StreamingDocxWriter:
+    """
+    DOCX emitter that streams WordprocessingML straight into the zip entry for
+    word/document.xml. Every other part (styles, header watermark, numbering, ...) is copied
+    from the template .docx, so paragraphs reference the same style ids python-docx would use.
+    Memory stays bounded by the flush buffer, whatever the number of paragraphs.
+    `out_path` may also be a binary file object (e.g. BytesIO) to write to. A path is written
+    through a temp file that replaces it on close (never in place: it may be a hardlink into
+    the artifact cache). With `date_time`, every member carries that time (reproducible output).
+    """
+
+    def __init__(
+        self,
+        out_path: Union[str, BinaryIO],
+        template: bytes,
+        style_ids: Dict[str, str],
+        date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
+    ):
+        self.out_path = out_path
+        self.style_ids = style_ids
+        self.date_time = date_time
+        self._tmp = f"{out_path}.{os.getpid()}.tmp" if isinstance(out_path, str) else None
+
+        with zipfile.ZipFile(BytesIO(template)) as src:
+            xml = src.read(DOCUMENT_PART).decode("utf-8")
+            body = xml.index("<w:body>") + len("<w:body>")
+            sect = xml.rindex("<w:sectPr")
+            if xml[body:sect].strip():
+                raise ValueError("DOCX template body must be empty apart from its section properties")
+            self._tail = xml[sect:]
+            # text block width (page width minus margins), used for table columns like python-docx
+            page_w = int(re.search(r'<w:pgSz [^>]*w:w="(\d+)"', self._tail).group(1))
+            left = int(re.search(r'<w:pgMar [^>]*w:left="(\d+)"', self._tail).group(1))
+            right = int(re.search(r'<w:pgMar [^>]*w:right="(\d+)"', self._tail).group(1))
+            self._block_width_emu = (page_w - left - right) * 635
+
+            self._zip = zipfile.ZipFile(self._tmp or out_path, "w", compression=zipfile.ZIP_DEFLATED)
+            try:
+                for info in src.infolist():
+                    if info.filename != DOCUMENT_PART:
+                        self._zip.writestr(info, src.read(info.filename))
+                self._part = self._zip.open(DOCUMENT_PART, "w", force_zip64=True)
+            except BaseException:
+                self.abort()
+                raise
+
+        self._buf: List[str] = [xml[:body]]
+        self._buffered = 0
+
+    def _emit(self, xml: str) -> None:
+        self._buf.append(xml)
+        self._buffered += len(xml)
+        if self._buffered >= _FLUSH_BYTES:
+            self._flush()
+
+    def _flush(self) -> None:
+        self._part.write("".join(self._buf).encode("utf-8"))
+        self._buf = []
+        self._buffered = 0
+
+    def _paragraph(self, text: str, style_id: Optional[str] = None, rpr: str = "") -> None:
+        ppr = f'<w:pPr><w:pStyle w:val="{escape(style_id)}"/></w:pPr>' if style_id else ""
+        if not text and not ppr:
+            self._emit("<w:p/>")
+            return
+        self._emit(f"<w:p>{ppr}{_run_xml(text, rpr) if text else ''}</w:p>")
+
+    def heading(self, text: str, level: int) -> None:
+        self._paragraph(text, self.style_ids["Title" if level == 0 else f"Heading {level}"])
+
+    def paragraph(self, text: str = "", style: Optional[str] = None) -> None:
+        self._paragraph(text, self.style_ids[style] if style else None)
+
+    def rich(self, spans: Sequence[MdSpan], style: Optional[str] = None) -> None:
+        style_id = self.style_ids[style] if style else None
+        ppr = f'<w:pPr><w:pStyle w:val="{escape(style_id)}"/></w:pPr>' if style_id else ""
+        runs = "".join(_run_xml(span.text, _span_rpr(span)) for span in spans)
+        self._emit(f"<w:p>{ppr}{runs}</w:p>" if ppr or runs else "<w:p/>")
+
+    def table(self, rows: Sequence[Sequence[str]], align: Sequence[str]) -> None:
+        col_w = str(round(self._block_width_emu // len(align) * _TWIPS_PER_EMU))
+        grid = "".join(f'<w:gridCol w:w="{col_w}"/>' for _ in align)
+        style_id = escape(self.style_ids["Table Grid"])
+        self._emit(
+            f'<w:tbl><w:tblPr><w:tblStyle w:val="{style_id}"/><w:tblW w:type="auto" w:w="0"/>{_TABLE_LOOK}'
+            f"</w:tblPr><w:tblGrid>{grid}</w:tblGrid>"
+        )
+        for r, row in enumerate(rows):
+            cells = []
+            for col, cell_text in enumerate(row):
+                spans = parse_inline(cell_text)
+                runs = "".join(_run_xml(s.text, _span_rpr(s._replace(bold=s.bold or r == 0))) for s in spans)
+                ppr = f'<w:pPr><w:jc w:val="{align[col]}"/></w:pPr>' if align[col] else ""
+                body = f"<w:p>{ppr}{runs}</w:p>" if ppr or runs else "<w:p/>"
+                cells.append(f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{col_w}"/></w:tcPr>{body}</w:tc>')
+            self._emit(f"<w:tr>{''.join(cells)}</w:tr>")
+        self._emit("</w:tbl>")
+
+    def code(self, text: str) -> None:
+        self._paragraph(text, rpr=_CODE_RPR)
+
+    def page_break(self) -> None:
+        self._emit('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    def close(self) -> None:
+        self._emit(self._tail)
+        self._flush()
+        self._part.close()
+        self._zip.close()
+        if self._tmp is None:
+            if self.date_time is not None:
+                pin_zip_timestamps(self.out_path, self.date_time)
+            return
+        try:
+            if self.date_time is not None:
+                with open(self._tmp, "r+b") as f:
+                    pin_zip_timestamps(f, self.date_time)
+            os.replace(self._tmp, self.out_path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """Drop a partially written document (called when rendering raises)."""
+        try:
+            self._part.close()
+        except Exception:
+            pass
+        try:
+            self._zip.close()
+        except Exception:
+            pass
+        if self._tmp is None:
+            return
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import ast
+import math
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class ExpressionError(ValueError):
+    """An invalid interactive expression or param; the message starts with the spec path."""
+
+
+# name -> (JS callee, allowed argument counts)
+FUNCTIONS: Dict[str, Tuple[str, Tuple[int, ...]]] = {
+    "sin": ("Math.sin", (1,)),
+    "cos": ("Math.cos", (1,)),
+    "tan": ("Math.tan", (1,)),
+    "asin": ("Math.asin", (1,)),
+    "acos": ("Math.acos", (1,)),
+    "atan": ("Math.atan", (1,)),
+    "atan2": ("Math.atan2", (2,)),
+    "sinh": ("Math.sinh", (1,)),
+    "cosh": ("Math.cosh", (1,)),
+    "tanh": ("Math.tanh", (1,)),
+    "exp": ("Math.exp", (1,)),
+    "log": ("Math.log", (1,)),
+    "ln": ("Math.log", (1,)),
+    "log10": ("Math.log10", (1,)),
+    "log2": ("Math.log2", (1,)),
+    "sqrt": ("Math.sqrt", (1,)),
+    "cbrt": ("Math.cbrt", (1,)),
+    "abs": ("Math.abs", (1,)),
+    "sign": ("Math.sign", (1,)),
+    "floor": ("Math.floor", (1,)),
+    "ceil": ("Math.ceil", (1,)),
+    "round": ("Math.round", (1,)),
+    "hypot": ("Math.hypot", (2,)),
+    "pow": ("Math.pow", (2,)),
+    "min": ("Math.min", (2, 3, 4)),
+    "max": ("Math.max", (2, 3, 4)),
+}
+CONSTANTS: Dict[str, str] = {"pi": "Math.PI", "e": "Math.E"}
+
+# Expression used for specs that only give the quadratic a/b/c params.
+QUADRATIC_EXPRESSION = "a*x^2 + b*x + c"
+QUADRATIC_LABELS = {"a": "二次项系数 a", "b": "一次项系数 b", "c": "常数项 c"}
+# Fallbacks the quadratic block has always used for missing or non-numeric slider fields.
+QUADRATIC_DEFAULTS = {
+    "a": {"min": -5.0, "max": 5.0, "step": 0.01, "default": 1.0},
+    "b": {"min": -10.0, "max": 10.0, "step": 0.01, "default": 0.0},
+    "c": {"min": -10.0, "max": 10.0, "step": 0.01, "default": 0.0},
+}
+
+MAX_EXPRESSION_LENGTH = 500
+_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*$")
+
+_BINOPS = {
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+    ast.Div: "/",
+    ast.Mod: "%",
+}
+
+
+class Slider(NamedTuple):
+    """Precomputed slider metadata; `index` is the param's slot in the evaluator's `p` array."""
+
+    name: str
+    index: int
+    label: str
+    min: float
+    max: float
+    step: float
+    default: float
+    decimals: int
+
+
+class CompiledCurve(NamedTuple):
+    expression: str
+    variable: str
+    js: str  # JS arrow function `(x, p) => ...`
+    sliders: Tuple[Slider, ...]
+    quadratic: bool  # legacy a/b/c block: vertex / axis / intercept features apply
+
+
+def _num(node: ast.AST) -> str:
+    value = node.value  # type: ignore[attr-defined]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ExpressionError(f"interactive.expression: unsupported constant {value!r}")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ExpressionError("interactive.expression: number out of range")
+    return repr(value) if not value.is_integer() else str(int(value))
+
+
+def _to_js(node: ast.AST, names: Dict[str, str]) -> str:
+    """JS source for one whitelisted AST node; every operation is parenthesized explicitly."""
+    if isinstance(node, ast.Expression):
+        return _to_js(node.body, names)
+    if isinstance(node, ast.Constant):
+        return _num(node)
+    if isinstance(node, ast.Name):
+        if node.id in names:
+            return names[node.id]
+        if node.id in FUNCTIONS:
+            raise ExpressionError(f"interactive.expression: function '{node.id}' must be called")
+        raise ExpressionError(f"interactive.expression: unknown name '{node.id}'")
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        sign = "-" if isinstance(node.op, ast.USub) else "+"
+        return f"({sign}{_to_js(node.operand, names)})"
+    if isinstance(node, ast.BinOp):
+        left, right = _to_js(node.left, names), _to_js(node.right, names)
+        if isinstance(node.op, ast.Pow):
+            return f"Math.pow({left}, {right})"
+        op = _BINOPS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"interactive.expression: unsupported operator {type(node.op).__name__}")
+        return f"({left} {op} {right})"
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            name = node.func.id if isinstance(node.func, ast.Name) else "?"
+            raise ExpressionError(f"interactive.expression: unknown function '{name}'")
+        callee, arity = FUNCTIONS[node.func.id]
+        if len(node.args) not in arity:
+            raise ExpressionError(
+                f"interactive.expression: {node.func.id}() takes {' or '.join(map(str, arity))} argument(s)"
+            )
+        return f"{callee}({', '.join(_to_js(a, names) for a in node.args)})"
+    raise ExpressionError(f"interactive.expression: unsupported syntax ({type(node).__name__})")
+
+
+def compile_expression(expression: str, params: Sequence[str], *, variable: str = "x") -> str:
+    """
+    Compile a math expression over `variable` and `params` into a JS arrow function `(x, p) => ...`
+    that reads param i from p[i]. Only numbers, + - * / % ^ (or **), the names in FUNCTIONS and
+    CONSTANTS, the variable and the params are accepted, so the output never contains input text
+    other than numbers. The evaluator allocates nothing per call.
+    """
+    if not isinstance(expression, str) or not expression.strip():
+        raise ExpressionError("interactive.expression: expected a non-empty string")
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(f"interactive.expression: longer than {MAX_EXPRESSION_LENGTH} characters")
+    if "#" in expression:
+        raise ExpressionError("interactive.expression: comments are not allowed")
+    try:
+        # `^` is the power operator in math notation; Python would parse it as a (lower
+        # precedence) XOR, so it is rewritten before parsing.
+        tree = ast.parse(expression.strip().replace("^", "**"), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"interactive.expression: syntax error at column {e.offset or 0}") from None
+
+    names = dict(CONSTANTS)
+    names[variable] = "x"
+    for i, name in enumerate(params):
+        names[name] = f"p[{i}]"
+    try:
+        body = _to_js(tree, names)
+    except RecursionError:
+        raise ExpressionError("interactive.expression: nested too deeply") from None
+    return f"(x, p) => {body}"
+
+
+def _decimals(step: float) -> int:
+    """Digits shown next to a slider: enough for its step, at least 2 (as the quadratic block did)."""
+    if step <= 0:
+        return 2
+    return max(2, min(6, math.ceil(-math.log10(step) - 1e-9)))
+
+
+def _slider(name: str, index: int, spec: Any, label: str, fallback: Optional[Dict[str, float]] = None) -> Slider:
+    """Slider for one param spec; with `fallback`, missing or non-numeric fields take its values."""
+    path = f"interactive.params.{name}"
+    if not isinstance(spec, dict):
+        if fallback is None:
+            raise ExpressionError(f"{path}: expected an object")
+        spec = {}
+    values: Dict[str, float] = {}
+    for key in ("min", "max", "step", "default"):
+        v = spec.get(key)
+        if fallback is not None:
+            try:
+                v = float(v)
+            except (TypeError, ValueError):
+                v = fallback[key]
+        if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v):
+            raise ExpressionError(f"{path}.{key}: expected a number")
+        values[key] = float(v)
+    if fallback is not None and (values["min"] >= values["max"] or values["step"] <= 0):
+        values.update(min=fallback["min"], max=fallback["max"], step=fallback["step"])
+    if values["min"] >= values["max"]:
+        raise ExpressionError(f"{path}: min must be less than max")
+    if values["step"] <= 0:
+        raise ExpressionError(f"{path}.step: must be greater than 0")
+    text = spec.get("label")
+    return Slider(
+        name=name,
+        index=index,
+        label=text.strip() if isinstance(text, str) and text.strip() else label,
+        min=values["min"],
+        max=values["max"],
+        step=values["step"],
+        default=min(max(values["default"], values["min"]), values["max"]),
+        decimals=_decimals(values["step"]),
+    )
+
+
+def compile_interactive(interactive: Any) -> Optional[CompiledCurve]:
+    """
+    Compile an `interactive` block: `expression` over `variable` (default "x") with `params` in
+    their spec order, or the legacy quadratic when only the a/b/c params are given.
+    Returns None when there is no interactive curve. Raises ExpressionError.
+    """
+    if not isinstance(interactive, dict):
+        return None
+    params = interactive.get("params")
+    if not isinstance(params, dict):
+        params = {}
+    expression = interactive.get("expression")
+    quadratic = expression is None
+    if quadratic:
+        if not all(k in params for k in ("a", "b", "c")):
+            return None
+        expression = QUADRATIC_EXPRESSION
+        names: List[str] = ["a", "b", "c"]
+    else:
+        names = list(params)
+
+    variable = "x" if quadratic else interactive.get("variable", "x")
+    if not isinstance(variable, str) or not _NAME.match(variable):
+        raise ExpressionError("interactive.variable: expected an identifier")
+    for name in names:
+        if not _NAME.match(name):
+            raise ExpressionError(f"interactive.params.{name}: param names must be identifiers")
+        if name == variable or name in FUNCTIONS or name in CONSTANTS:
+            raise ExpressionError(f"interactive.params.{name}: name is reserved")
+
+    if isinstance(expression, str):
+        expression = " ".join(expression.split())
+    js = compile_expression(expression, names, variable=variable)
+    if quadratic:
+        sliders = tuple(
+            _slider(n, i, params[n], QUADRATIC_LABELS[n], QUADRATIC_DEFAULTS[n]) for i, n in enumerate(names)
+        )
+    else:
+        sliders = tuple(_slider(n, i, params[n], n) for i, n in enumerate(names))
+    return CompiledCurve(expression=expression, variable=variable, js=js, sliders=sliders, quadratic=quadratic)
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class MdBlock(NamedTuple):
+    """
+    One block of section markdown:
+    - "heading": `#`..`######` (`level` 1-6, `text`)
+    - "para": a plain line (`text` as written)
+    - "bullet": a `- ` / `* ` / `+ ` item (`text` without the marker)
+    - "ordered": a `1.` / `1)` item (`number`, `text` without the marker)
+    - "blank": an empty line
+    - "code": a ``` fenced block (`lines` verbatim; an unclosed fence runs to the end)
+    - "table": a pipe table (`rows`, header row first; `align` per column: "", "left", "center", "right")
+    Inline markup stays in `text`; see parse_inline.
+    """
+
+    kind: str
+    text: str = ""
+    lines: Tuple[str, ...] = ()
+    level: int = 0
+    number: int = 0
+    rows: Tuple[Tuple[str, ...], ...] = ()
+    align: Tuple[str, ...] = ()
+
+
+class MdSpan(NamedTuple):
+    text: str
+    bold: bool = False
+    italic: bool = False
+    code: bool = False
+
+
+_HEADING = re.compile(r"(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_ORDERED = re.compile(r"(\d{1,9})[.)][ \t]+(.*)$")
+_TABLE_DELIM = re.compile(r"\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?$")
+
+
+def _split_row(line: str) -> Tuple[str, ...]:
+    s = line.strip()
+    if s.startswith("|"):
+        s = s[1:]
+    if s.endswith("|") and not s.endswith("\\|"):
+        s = s[:-1]
+    cells = re.split(r"(?<!\\)\|", s)
+    return tuple(c.strip().replace("\\|", "|") for c in cells)
+
+
+def _align(cell: str) -> str:
+    left, right = cell.startswith(":"), cell.endswith(":")
+    if left and right:
+        return "center"
+    return "right" if right else ("left" if left else "")
+
+
+@lru_cache(maxsize=512)
+def _parse(text: str) -> Tuple[MdBlock, ...]:
+    blocks: List[MdBlock] = []
+    code: Optional[list] = None
+    lines = text.split("\n")
+    i, n = 0, len(lines)
+    while i < n:
+        line = lines[i]
+        i += 1
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if code is None:
+                code = []
+            else:
+                blocks.append(MdBlock("code", lines=tuple(code)))
+                code = None
+            continue
+        if code is not None:
+            code.append(line)
+            continue
+        if stripped == "":
+            blocks.append(MdBlock("blank"))
+            continue
+        if stripped[:2] in ("- ", "* ", "+ "):
+            blocks.append(MdBlock("bullet", stripped[2:].strip()))
+            continue
+        if stripped.startswith("#"):
+            m = _HEADING.match(stripped)
+            if m:
+                blocks.append(MdBlock("heading", (m.group(2) or "").strip(), level=len(m.group(1))))
+                continue
+        if stripped[0].isdigit():
+            m = _ORDERED.match(stripped)
+            if m:
+                blocks.append(MdBlock("ordered", m.group(2).strip(), number=int(m.group(1))))
+                continue
+        # Pipe table: a header row followed by a delimiter row such as |---|:--:|
+        if "|" in stripped and i < n and "-" in lines[i] and _TABLE_DELIM.match(lines[i].strip()):
+            header = _split_row(stripped)
+            delim = _split_row(lines[i])
+            if len(delim) == len(header):
+                rows = [header]
+                i += 1
+                while i < n and "|" in lines[i] and lines[i].strip():
+                    cells = _split_row(lines[i])
+                    rows.append((cells + ("",) * len(header))[: len(header)])
+                    i += 1
+                blocks.append(MdBlock("table", rows=tuple(rows), align=tuple(_align(c) for c in delim)))
+                continue
+        blocks.append(MdBlock("para", line))
+    if code is not None:
+        blocks.append(MdBlock("code", lines=tuple(code)))
+    return tuple(blocks)
+
+
+def parse_md_blocks(md: Optional[str]) -> Tuple[MdBlock, ...]:
+    """
+    Parse `content_md` into blocks once; results are cached by content, so the HTML, DOCX and
+    PDF renderers of one build (and repeated sections across a batch) share a single parse.
+    The returned tuple is shared: treat it as read-only.
+    """
+    if md is None:
+        return ()
+    return _parse(md.replace("\r\n", "\n"))
+
+
+# ----------------------------
+# Inline: **bold** / __bold__, *italic* / _italic_, `code`, backslash escapes
+# ----------------------------
+_ESCAPABLE = frozenset("\\`*_{}[]()#+-.!|")
+_MARKUP_CHAR = re.compile(r"[\\`*_]")
+
+
+def _can_open(text: str, i: int, width: int, ch: str) -> bool:
+    nxt = text[i + width] if i + width < len(text) else " "
+    if nxt.isspace():
+        return False
+    # `_` never opens inside a word (x_1, snake_case)
+    return ch != "_" or i == 0 or not text[i - 1].isalnum()
+
+
+def _can_close(text: str, j: int, run: int, ch: str) -> bool:
+    if text[j - 1].isspace():
+        return False
+    end = j + run
+    return ch != "_" or end >= len(text) or not text[end].isalnum()
+
+
+def _find_closer(text: str, start: int, delim: str) -> int:
+    """
+    Index of the closing `delim` after `start`, or -1. Runs of the delimiter character are
+    taken whole: a `**` run never closes `*`; a `***` run closes either (bold+italic). A run at
+    `start` itself would enclose nothing (e.g. the rest of the opening `**`), so it never closes.
+    """
+    ch, width = delim[0], len(delim)
+    j = text.find(ch, start)
+    while j != -1:
+        run = 1
+        while j + run < len(text) and text[j + run] == ch:
+            run += 1
+        if j > start and (run == width or run == 3) and text[j - 1] != "\\" and _can_close(text, j, run, ch):
+            return j + run - width
+        j = text.find(ch, j + run)
+    return -1
+
+
+def _inline(text: str, bold: bool, italic: bool, out: List[MdSpan]) -> None:
+    buf: List[str] = []
+    # Delimiters known to have no closer after the current position; a failed search is never
+    # repeated for the same delimiter, which keeps unbalanced input (e.g. many lone `*`) linear.
+    exhausted = set()
+
+    def flush() -> None:
+        if buf:
+            out.append(MdSpan("".join(buf), bold, italic))
+            buf.clear()
+
+    i, n = 0, len(text)
+    while i < n:
+        # copy plain text up to the next markup character in one slice
+        m = _MARKUP_CHAR.search(text, i)
+        if m is None:
+            buf.append(text[i:])
+            break
+        if m.start() > i:
+            buf.append(text[i : m.start()])
+            i = m.start()
+        ch = text[i]
+        if ch == "\\" and i + 1 < n and text[i + 1] in _ESCAPABLE:
+            buf.append(text[i + 1])
+            i += 2
+            continue
+        if ch == "`":
+            run = 1
+            while i + run < n and text[i + run] == "`":
+                run += 1
+            ticks = "`" * run
+            j = -1 if ticks in exhausted else text.find(ticks, i + run)
+            while j != -1 and j + run < n and text[j + run] == "`":
+                j = text.find(ticks, j + run + 1)
+            if j == -1:
+                exhausted.add(ticks)
+                buf.append(ticks)
+                i += run
+                continue
+            flush()
+            content = text[i + run : j]
+            if content.startswith(" ") and content.endswith(" ") and content.strip():
+                content = content[1:-1]
+            out.append(MdSpan(content, bold, italic, code=True))
+            i = j + run
+            continue
+        if ch in "*_":
+            double = text[i : i + 2] == ch * 2
+            for delim in ((ch * 2, ch) if double else (ch,)):
+                width = len(delim)
+                if delim in exhausted or not _can_open(text, i, width, ch):
+                    continue
+                j = _find_closer(text, i + width, delim)
+                if j == -1:
+                    exhausted.add(delim)
+                    continue
+                flush()
+                _inline(text[i + width : j], bold or width == 2, italic or width == 1, out)
+                i = j + width
+                break
+            else:
+                run = 2 if double else 1
+                buf.append(text[i : i + run])
+                i += run
+            continue
+        buf.append(ch)
+        i += 1
+    flush()
+
+
+@lru_cache(maxsize=4096)
+def parse_inline(text: str) -> Tuple[MdSpan, ...]:
+    """
+    Split one block's text into styled spans in a single left-to-right pass.
+    Unclosed delimiters stay literal. Cached by text; the tuple is shared (read-only).
+    """
+    out: List[MdSpan] = []
+    _inline(text, False, False, out)
+    return tuple(out)
+
+
+def plain_text(text: str) -> str:
+    """`text` with inline markup removed (for PDF TOC entries, DOCX headings, etc.)."""
+    return "".join(s.text for s in parse_inline(text))
@@ -1,9 +1,15 @@
 import hashlib
 import json
 import os
+import struct
+import time
 import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, BinaryIO, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
 
 def sha256_of_file(path: str) -> str:
     h = hashlib.sha256()
@@ -12,6 +18,101 @@ def sha256_of_file(path: str) -> str:
             h.update(chunk)
     return h.hexdigest()
 
+
+def write_file(path: str, payload: bytes) -> None:
+    """Replace `path` with `payload` (never truncate it in place: it may be a hardlink into the artifact cache)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+
+
+class ArtifactWriter:
+    """
+    Writes an export's files and records their manifest entries ({"size", "sha256"}) from
+    the bytes as they go to disk, so write_manifest and pack do not read them back.
+    With `keep`, the bytes are also kept (by file name) for pack(). With `in_memory`, nothing
+    is written: the bytes are only kept, and paths just name the files. A `date_time` asks
+    renderers for reproducible output: containers they write carry that time instead of now.
+    """
+
+    def __init__(
+        self,
+        keep: bool = False,
+        date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
+        in_memory: bool = False,
+    ):
+        self.keep = keep or in_memory
+        self.date_time = date_time
+        self.in_memory = in_memory
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.contents: Dict[str, bytes] = {}
+
+    def write(self, path: str, payload: bytes) -> None:
+        if not self.in_memory:
+            write_file(path, payload)
+        name = os.path.basename(path)
+        self.entries[name] = {"size": len(payload), "sha256": hashlib.sha256(payload).hexdigest()}
+        if self.keep:
+            self.contents[name] = payload
+
+    def record_file(self, path: str) -> None:
+        """Entry for a file some other writer produced (e.g. a streamed DOCX); one read pass."""
+        self.entries[os.path.basename(path)] = {"size": os.path.getsize(path), "sha256": sha256_of_file(path)}
+
+
+def pin_zip_timestamps(fp: BinaryIO, date_time: Tuple[int, int, int, int, int, int]) -> None:
+    """
+    Set the time of every member of the ZIP in the seekable binary `fp` (local headers and
+    central directory) to `date_time` and its attributes to a Unix 0644 file, in place and
+    without recompressing. Used to make DOCX packages written by zipfile reproducible.
+    """
+    y, mo, d, h, mi, sec = date_time
+    stamp = struct.pack("<HH", h << 11 | mi << 5 | sec // 2, (y - 1980) << 9 | mo << 5 | d)
+    fp.seek(0, os.SEEK_END)
+    end = fp.tell()
+    fp.seek(max(0, end - 22 - 0xFFFF))
+    tail = fp.read()
+    at = tail.rfind(b"PK\x05\x06")
+    if at < 0:
+        raise zipfile.BadZipFile("end of central directory not found")
+    count, cd_size, cd_offset = struct.unpack("<HII", tail[at + 10 : at + 20])
+    if cd_offset == ZIP64_LIMIT or count == 0xFFFF:
+        loc = tail.rfind(b"PK\x06\x07", 0, at)
+        (eocd64,) = struct.unpack("<Q", tail[loc + 8 : loc + 16])
+        fp.seek(eocd64 + 24)
+        _, count, cd_size, cd_offset = struct.unpack("<QQQQ", fp.read(32))
+
+    fp.seek(cd_offset)
+    cd = bytearray(fp.read(cd_size))
+    pos = 0
+    for _ in range(count):
+        if cd[pos : pos + 4] != b"PK\x01\x02":
+            raise zipfile.BadZipFile("bad central directory entry")
+        usize, csize = struct.unpack_from("<II", cd, pos + 20)
+        name_len, extra_len, comment_len = struct.unpack_from("<HHH", cd, pos + 28)
+        (offset,) = struct.unpack_from("<I", cd, pos + 42)
+        if offset == ZIP64_LIMIT:
+            # zip64 extra: the overflowing fields in order usize, csize, offset
+            extra = cd[pos + 46 + name_len : pos + 46 + name_len + extra_len]
+            i = 0
+            while i + 4 <= len(extra):
+                tag, size = struct.unpack_from("<HH", extra, i)
+                if tag == 1:
+                    skip = 8 * ((usize == ZIP64_LIMIT) + (csize == ZIP64_LIMIT))
+                    (offset,) = struct.unpack_from("<Q", extra, i + 4 + skip)
+                    break
+                i += 4 + size
+        cd[pos + 5] = 3  # version made by: Unix
+        cd[pos + 12 : pos + 16] = stamp
+        struct.pack_into("<I", cd, pos + 38, 0o100644 << 16)  # regular file, rw-r--r--
+        fp.seek(offset + 10)
+        fp.write(stamp)
+        pos += 46 + name_len + extra_len + comment_len
+    fp.seek(cd_offset)
+    fp.write(cd)
+
+
 def _determine_files(outdir: str, zip_name: str, files: Optional[Sequence[str]]) -> List[str]:
     if files is None:
         candidates: List[str] = []
@@ -29,63 +130,442 @@ def _determine_files(outdir: str, zip_name: str, files: Optional[Sequence[str]])
     return sorted(set(files_to_pack))
 
 
-def write_manifest(
-    outdir: str,
+def manifest_data(
     *,
-    files: Optional[Sequence[str]],
+    files: Sequence[str],
+    entries: Dict[str, Dict[str, Any]],
     spec_version: str,
     builder_version: str,
     spec_hash: str,
     generated_at: Optional[str] = None,
     zip_name: Optional[str] = None,
-) -> str:
-    os.makedirs(outdir, exist_ok=True)
-
-    files_list = _determine_files(outdir, zip_name or "bundle.zip", files)
+    inputs: Optional[Dict[str, Dict[str, str]]] = None,
+    file_info: Optional[Dict[str, Dict[str, Any]]] = None,
+    outdir: Optional[str] = None,
+    cache_stats: Optional[Dict[str, int]] = None,
+) -> Dict[str, Any]:
+    """
+    manifest.json content for `files` (listed by name), from their {"size", "sha256"} `entries`;
+    nothing is read from disk. `outdir` is recorded when given; `cache_stats` ({"hits", "misses"}
+    of the artifact cache) as "cache".
+    """
     manifest: Dict[str, Any] = {
         "spec_version": spec_version,
         "builder_version": builder_version,
         "spec_hash": spec_hash,
         "generated_at": generated_at or datetime.now().isoformat(timespec="seconds"),
-        "outdir": os.path.abspath(outdir),
+        "outdir": outdir,
         "zip": zip_name,
         "files": [],
     }
+    if outdir is None:
+        del manifest["outdir"]
+    if cache_stats is not None:
+        manifest["cache"] = cache_stats
+    if inputs:
+        # export key -> {"file": name, "hash": input hash}; read back by incremental builds
+        manifest["inputs"] = inputs
+
+    for name in sorted(set(files) - {"manifest.json"}):
+        entry: Dict[str, Any] = {"name": name, "size": entries[name]["size"], "sha256": entries[name]["sha256"]}
+        # renderer-reported extras, e.g. "sidecars" and "plots" for the HTML page
+        entry.update((file_info or {}).get(name) or {})
+        manifest["files"].append(entry)
+    return manifest
+
+
+def dump_manifest(manifest: Dict[str, Any]) -> bytes:
+    return json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
 
+
+def write_manifest(
+    outdir: str,
+    *,
+    files: Optional[Sequence[str]],
+    spec_version: str,
+    builder_version: str,
+    spec_hash: str,
+    generated_at: Optional[str] = None,
+    zip_name: Optional[str] = None,
+    inputs: Optional[Dict[str, Dict[str, str]]] = None,
+    file_info: Optional[Dict[str, Dict[str, Any]]] = None,
+    entries: Optional[Dict[str, Dict[str, Any]]] = None,
+    host_paths: bool = True,
+    cache_stats: Optional[Dict[str, int]] = None,
+) -> str:
+    """
+    Write manifest.json for `files` (see manifest_data). `entries` gives known {"size", "sha256"}
+    per file name (see ArtifactWriter); only files without one are hashed from disk. Without
+    `host_paths` the absolute outdir is left out, so identical builds on different hosts match.
+    """
+    os.makedirs(outdir, exist_ok=True)
+
+    files_list = _determine_files(outdir, zip_name or "bundle.zip", files)
+    known = dict(entries or {})
     for name in files_list:
-        p = os.path.join(outdir, name)
-        manifest["files"].append(
-            {
-                "name": name,
-                "size": os.path.getsize(p),
-                "sha256": sha256_of_file(p),
-            }
-        )
+        if name not in known:
+            p = os.path.join(outdir, name)
+            known[name] = {"size": os.path.getsize(p), "sha256": sha256_of_file(p)}
+    manifest = manifest_data(
+        files=files_list,
+        entries=known,
+        spec_version=spec_version,
+        builder_version=builder_version,
+        spec_hash=spec_hash,
+        generated_at=generated_at,
+        zip_name=zip_name,
+        inputs=inputs,
+        file_info=file_info,
+        outdir=os.path.abspath(outdir) if host_paths else None,
+        cache_stats=cache_stats,
+    )
 
     manifest_path = os.path.join(outdir, "manifest.json")
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    with open(manifest_path, "wb") as f:
+        f.write(dump_manifest(manifest))
 
     return manifest_path
 
 
+# Members already stored as deflate/JPEG/... streams: deflating them again only costs time.
+STORED_SUFFIXES = frozenset({".zip", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".woff", ".woff2", ".mp4"})
+# Text formats always shrink a lot, so they are deflated without probing.
+DEFLATE_SUFFIXES = frozenset({".html", ".htm", ".json", ".js", ".css", ".svg", ".txt", ".md", ".csv", ".xml"})
+# Anything else (.docx, .pdf: zip/PDF containers that may or may not hold compressed parts) is
+# probed: deflated only if a level-1 pass over a sample saves at least PROBE_MIN_SAVING.
+PROBE_BYTES = 64 * 1024
+PROBE_MIN_SAVING = 0.10
+# Deflated members are split into blocks compressed on worker threads (zlib releases the GIL).
+BLOCK_SIZE = 1 << 20
+WINDOW_BYTES = 32 * 1024
+ZIP64_LIMIT = (1 << 32) - 1
+
+
+def choose_compression(name: str, sample: bytes) -> int:
+    """zipfile.ZIP_STORED or ZIP_DEFLATED for a member, from its suffix or a quick probe of `sample`."""
+    suffix = os.path.splitext(name)[1].lower()
+    if suffix in DEFLATE_SUFFIXES:
+        return zipfile.ZIP_DEFLATED
+    if suffix in STORED_SUFFIXES or not sample:
+        return zipfile.ZIP_STORED
+    saving = 1 - len(zlib.compress(sample, 1)) / len(sample)
+    return zipfile.ZIP_DEFLATED if saving >= PROBE_MIN_SAVING else zipfile.ZIP_STORED
+
+
+def _probe_sample(path: str, payload: Optional[bytes]) -> bytes:
+    """Head and middle of a member (PROBE_BYTES each), so a small uncompressed header does not decide alone."""
+    if payload is not None:
+        size = len(payload)
+        mid = payload[size // 2 : size // 2 + PROBE_BYTES] if size > 2 * PROBE_BYTES else b""
+        return bytes(payload[:PROBE_BYTES]) + bytes(mid)
+    with open(path, "rb") as f:
+        head = f.read(PROBE_BYTES)
+        size = os.fstat(f.fileno()).st_size
+        if size <= 2 * PROBE_BYTES:
+            return head
+        f.seek(size // 2)
+        return head + f.read(PROBE_BYTES)
+
+
+def _deflate_block(block: bytes, zdict: bytes, level: int, last: bool) -> bytes:
+    """
+    Raw deflate of one block. Blocks end on a sync flush, so their outputs concatenate into a
+    single valid stream; `zdict` (the previous block's last 32 KiB) keeps the ratio of one pass.
+    """
+    if zdict:
+        c = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict)
+    else:
+        c = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return c.compress(block) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _blocks(path: str, payload: Optional[bytes]) -> Iterator[bytes]:
+    if payload is not None:
+        view = memoryview(payload)
+        for start in range(0, len(view), BLOCK_SIZE):
+            yield view[start : start + BLOCK_SIZE]
+        return
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            yield block
+
+
+class _Member:
+    def __init__(self, zinfo: zipfile.ZipInfo, expected_size: int):
+        self.zinfo = zinfo
+        self.size = 0
+        self.crc = 0
+        self.compress_size = 0
+        # decided up front (like zipfile): the local header cannot grow once data follows it
+        self.zip64 = expected_size * 1.05 + 1024 >= ZIP64_LIMIT
+
+
+class _ZipWriter:
+    """
+    Minimal ZIP writer for members whose data arrives already compressed (deflate blocks from
+    worker threads). Local headers are patched with CRC and sizes once a member is complete;
+    zip64 records are used where sizes or offsets need them. Without `seekable`, a member's data
+    is held back until it is complete and written after its final header (same bytes, no seeks).
+    """
+
+    def __init__(self, fp, seekable: bool = True):
+        self.fp = fp
+        self.seekable = seekable
+        self.members: List[_Member] = []
+        self._held: List[bytes] = []
+
+    @staticmethod
+    def _name(zinfo: zipfile.ZipInfo) -> Tuple[bytes, int]:
+        try:
+            return zinfo.filename.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return zinfo.filename.encode("utf-8"), 0x800
+
+    @staticmethod
+    def _dos_time(zinfo: zipfile.ZipInfo) -> Tuple[int, int]:
+        y, mo, d, h, mi, sec = zinfo.date_time
+        return h << 11 | mi << 5 | sec // 2, (y - 1980) << 9 | mo << 5 | d
+
+    def _local_header(self, m: _Member) -> bytes:
+        name, flags = self._name(m.zinfo)
+        t, d = self._dos_time(m.zinfo)
+        if m.zip64:
+            extra = struct.pack("<HHQQ", 1, 16, m.size, m.compress_size)
+            sizes = (ZIP64_LIMIT, ZIP64_LIMIT)
+        else:
+            extra, sizes = b"", (m.compress_size, m.size)
+        version = 45 if m.zip64 else 20
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, version, flags, m.zinfo.compress_type, t, d, m.crc, *sizes, len(name), len(extra)
+        ) + name + extra
+
+    def begin(self, m: _Member) -> None:
+        self.members.append(m)
+        if self.seekable:
+            m.zinfo.header_offset = self.fp.tell()
+            self.fp.write(self._local_header(m))
+
+    def write(self, data: bytes) -> None:
+        if self.seekable:
+            self.fp.write(data)
+        else:
+            self._held.append(data)
+
+    def end(self, m: _Member) -> None:
+        if not m.zip64 and (m.size > ZIP64_LIMIT or m.compress_size > ZIP64_LIMIT):
+            raise zipfile.LargeZipFile(f"{m.zinfo.filename}: grew beyond the zip64 estimate")
+        if not self.seekable:
+            m.zinfo.header_offset = self.fp.tell()
+            self.fp.write(self._local_header(m))
+            for data in self._held:
+                self.fp.write(data)
+            self._held = []
+            return
+        here = self.fp.tell()
+        self.fp.seek(m.zinfo.header_offset)
+        self.fp.write(self._local_header(m))
+        self.fp.seek(here)
+
+    def close(self) -> None:
+        cd_offset = self.fp.tell()
+        for m in self.members:
+            name, flags = self._name(m.zinfo)
+            t, d = self._dos_time(m.zinfo)
+            fields, extra64 = [m.size, m.compress_size, m.zinfo.header_offset], []
+            for i in range(3):
+                if fields[i] >= ZIP64_LIMIT or (i < 2 and m.zip64):
+                    extra64.append(fields[i])
+                    fields[i] = ZIP64_LIMIT
+            extra = struct.pack(f"<HH{len(extra64)}Q", 1, 8 * len(extra64), *extra64) if extra64 else b""
+            version = 45 if extra64 else 20
+            self.fp.write(
+                struct.pack(
+                    "<IHHHHHHIIIHHHHHII",
+                    0x02014B50,
+                    m.zinfo.create_system << 8 | version,
+                    version,
+                    flags,
+                    m.zinfo.compress_type,
+                    t,
+                    d,
+                    m.crc,
+                    fields[1],
+                    fields[0],
+                    len(name),
+                    len(extra),
+                    0,
+                    0,
+                    0,
+                    m.zinfo.external_attr,
+                    fields[2],
+                )
+                + name
+                + extra
+            )
+        cd_end = self.fp.tell()
+        count, cd_size = len(self.members), cd_end - cd_offset
+        if count >= 0xFFFF or cd_offset >= ZIP64_LIMIT or cd_size >= ZIP64_LIMIT:
+            self.fp.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset))
+            self.fp.write(struct.pack("<IIQI", 0x07064B50, 0, cd_end, 1))
+            count, cd_size, cd_offset = min(count, 0xFFFF), min(cd_size, ZIP64_LIMIT), min(cd_offset, ZIP64_LIMIT)
+        self.fp.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0))
+
+
+class _ChunkSink:
+    """Write-only stand-in for a file: collects the chunks iter_zip() hands out."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.offset = 0
+
+    def write(self, data: bytes) -> None:
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+
+    def tell(self) -> int:
+        return self.offset
+
+    def drain(self) -> List[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+
+# A zip source: (arcname, path on disk or None, bytes in memory or None).
+_Source = Tuple[str, Optional[str], Optional[bytes]]
+
+
+def _zip_info(arcname: str, path: Optional[str], payload: Optional[bytes], date_time) -> zipfile.ZipInfo:
+    if date_time is None and path is not None:
+        return zipfile.ZipInfo.from_file(path, arcname=arcname)
+    zinfo = zipfile.ZipInfo(arcname, date_time=date_time or time.localtime()[:6])
+    zinfo.create_system = 3
+    zinfo.external_attr = 0o100644 << 16
+    zinfo.file_size = len(payload) if payload is not None else os.path.getsize(path)
+    return zinfo
+
+
+def _write_members(
+    out: _ZipWriter,
+    sources: Sequence[_Source],
+    *,
+    level: int,
+    workers: int,
+    date_time: Optional[Tuple[int, int, int, int, int, int]],
+) -> Iterator[None]:
+    """Write `sources` as members of `out`; yields after every block, so streams can hand out what is done."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def items():
+            # member boundaries and data blocks in archive order; deflate is submitted as
+            # this generator runs ahead of the writer
+            for arcname, path, payload in sources:
+                zinfo = _zip_info(arcname, path, payload, date_time)
+                zinfo.compress_type = (
+                    choose_compression(arcname, _probe_sample(path, payload)) if level else zipfile.ZIP_STORED
+                )
+                member = _Member(zinfo, len(payload) if payload is not None else zinfo.file_size)
+                yield member, None, None
+                deflate = zinfo.compress_type == zipfile.ZIP_DEFLATED
+                blocks = _blocks(path, payload)
+                block = next(blocks, None)
+                if block is None and deflate:
+                    block = b""  # an empty deflated member still needs its final block
+                zdict = b""
+                while block is not None:
+                    following = next(blocks, None)
+                    last = following is None
+                    yield member, block, pool.submit(_deflate_block, block, zdict, level, last) if deflate else None
+                    if deflate:
+                        zdict = bytes(block[-WINDOW_BYTES:])
+                    block = following
+                yield member, None, True
+
+        pending: Deque[Tuple[_Member, Optional[bytes], Any]] = deque()
+        source = items()
+        window = 2 * workers + 2
+        for item in source:
+            pending.append(item)
+            if len(pending) < window:
+                continue
+            _write_item(out, pending.popleft())
+            yield
+        while pending:
+            _write_item(out, pending.popleft())
+            yield
+        out.close()
+
+
+def _zip_settings(compresslevel: int, workers: Optional[int]) -> Tuple[int, int]:
+    return max(0, min(9, int(compresslevel))), max(1, workers or min(8, os.cpu_count() or 1))
+
+
 def pack(
     outdir: str,
     zip_name: str = "bundle.zip",
     *,
     files: Optional[Sequence[str]] = None,
     manifest_path: Optional[str] = None,
+    contents: Optional[Dict[str, bytes]] = None,
+    compresslevel: int = 6,
+    workers: Optional[int] = None,
+    date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
 ) -> Dict[str, str]:
+    """
+    Zip the manifest and `files`; `contents` supplies bytes already in memory by file name.
+    Each member is stored or deflated by type (see choose_compression) at `compresslevel`
+    (0 stores everything); deflate runs in blocks on `workers` threads (default: CPU count, max 8).
+    With `date_time`, every member gets that time and mode 0644 instead of the file's stat,
+    so the archive only depends on the members' bytes (the order is fixed: manifest, then by name).
+    """
     os.makedirs(outdir, exist_ok=True)
 
     files_to_pack = _determine_files(outdir, zip_name, files)
     manifest_path = manifest_path or os.path.join(outdir, "manifest.json")
+    contents = contents or {}
+    level, workers = _zip_settings(compresslevel, workers)
+
+    sources: List[_Source] = [("manifest.json", manifest_path, None)] if os.path.isfile(manifest_path) else []
+    sources += [(name, os.path.join(outdir, name), contents.get(name)) for name in files_to_pack]
 
     zip_path = os.path.join(outdir, zip_name)
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        if os.path.isfile(manifest_path):
-            z.write(manifest_path, arcname="manifest.json")
-        for name in files_to_pack:
-            z.write(os.path.join(outdir, name), arcname=name)
+    with open(zip_path, "wb") as fp:
+        for _ in _write_members(_ZipWriter(fp), sources, level=level, workers=workers, date_time=date_time):
+            pass
 
     return {"manifest": manifest_path, "zip": zip_path}
+
+
+def iter_zip(
+    members: Sequence[Tuple[str, bytes]],
+    *,
+    compresslevel: int = 6,
+    workers: Optional[int] = None,
+    date_time: Optional[Tuple[int, int, int, int, int, int]] = None,
+) -> Iterator[bytes]:
+    """
+    ZIP of in-memory `members` ((arcname, bytes), in archive order) as a stream of chunks, e.g.
+    for an HTTP response; nothing is seeked or written to disk. Compression as in pack(); without
+    `date_time` members carry the current time. Same bytes as pack() for the same members.
+    """
+    level, workers = _zip_settings(compresslevel, workers)
+    sink = _ChunkSink()
+    out = _ZipWriter(sink, seekable=False)
+    sources = [(arcname, None, payload) for arcname, payload in members]
+    for _ in _write_members(out, sources, level=level, workers=workers, date_time=date_time):
+        yield from sink.drain()
+    yield from sink.drain()
+
+
+def _write_item(out: _ZipWriter, item: Tuple[_Member, Optional[bytes], Any]) -> None:
+    member, block, job = item
+    if block is None:
+        if job is None:
+            out.begin(member)
+        else:
+            out.end(member)
+        return
+    data = job.result() if job is not None else block
+    member.crc = zlib.crc32(block, member.crc)
+    member.size += len(block)
+    member.compress_size += len(data)
+    out.write(data)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import base64
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Plot canvases are at most as wide as the page column (.wrap max-width, CSS px); two points
+# per pixel column keeps lines sharp on devicePixelRatio 2 screens.
+DEFAULT_WIDTH_PX = 1100
+DEFAULT_POINTS_PER_PX = 2
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the visual shape
+    of the (x-ordered) series. The first and last points are always kept. O(n).
+    """
+    n = min(len(xs), len(ys))
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    every = (n - 2) / (threshold - 2)
+    picked = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # average of the next bucket is the third triangle vertex
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        count = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / count
+        avg_y = sum(ys[avg_start:avg_end]) / count
+
+        ax, ay = xs[a], ys[a]
+        dx, dy = ax - avg_x, avg_y - ay
+        best, best_area = int(i * every) + 1, -1.0
+        for j in range(best, int((i + 1) * every) + 1):
+            area = abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy)
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return picked
+
+
+def plot_threshold(config: Any) -> Optional[int]:
+    """
+    Points kept per series for a plot visual's `downsample` setting, or None when disabled.
+    `config` is false, or {"width_px": 1100, "points_per_px": 2, "sidecar": true} (all optional).
+    """
+    if config is False:
+        return None
+    cfg = config if isinstance(config, dict) else {}
+    if cfg.get("enabled") is False:
+        return None
+    try:
+        width = float(cfg.get("width_px", DEFAULT_WIDTH_PX))
+        per_px = float(cfg.get("points_per_px", DEFAULT_POINTS_PER_PX))
+    except (TypeError, ValueError):
+        width, per_px = DEFAULT_WIDTH_PX, DEFAULT_POINTS_PER_PX
+    return max(3, int(width * per_px))
+
+
+def downsample_plot(data: Dict[str, Any], threshold: Optional[int]) -> Tuple[Dict[str, Any], int, int]:
+    """
+    Copy of plot `data` with every series reduced to at most `threshold` points (LTTB).
+    Returns (data, points in, points out); `data` itself is returned unchanged when nothing
+    needed reducing. Series with non-numeric values, and `data` that is not an object, are
+    kept as they are.
+    """
+    if not isinstance(data, dict):
+        return data, 0, 0
+    series = data.get("series")
+    if not isinstance(series, list):
+        return data, 0, 0
+    total = kept = 0
+    out: List[Any] = []
+    changed = False
+    for s in series:
+        xs, ys = (s.get("x"), s.get("y")) if isinstance(s, dict) else (None, None)
+        if not isinstance(xs, list) or not isinstance(ys, list):
+            out.append(s)
+            continue
+        n = min(len(xs), len(ys))
+        total += n
+        idx = None
+        if threshold is not None and n > threshold:
+            try:
+                idx = lttb_indices(xs, ys, threshold)
+            except TypeError:
+                idx = None
+        if idx is None:
+            kept += n
+            out.append(s)
+            continue
+        kept += len(idx)
+        out.append(dict(s, x=[xs[i] for i in idx], y=[ys[i] for i in idx]))
+        changed = True
+    if not changed:
+        return data, total, kept
+    return dict(data, series=out), total, kept
+
+
+def encode_float32(values: Sequence[float]) -> Dict[str, str]:
+    """A number column as little-endian Float32 in base64: {"dtype": "f32le", "b64": ...}."""
+    col = array("f", values)
+    if sys.byteorder != "little":
+        col.byteswap()
+    return {"dtype": "f32le", "b64": base64.b64encode(col.tobytes()).decode("ascii")}
+
+
+def encode_plot_float32(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of plot `data` with each series' x/y packed by encode_float32, so the page decodes them
+    straight into Float32Array without parsing one JSON number per point. Float32 keeps about
+    7 significant digits, plenty for a canvas. Series with non-numeric values stay as arrays;
+    `data` that is not an object is returned as it is.
+    """
+    if not isinstance(data, dict):
+        return data
+    series = data.get("series")
+    if not isinstance(series, list):
+        return data
+    out: List[Any] = []
+    for s in series:
+        xs, ys = (s.get("x"), s.get("y")) if isinstance(s, dict) else (None, None)
+        if isinstance(xs, list) and isinstance(ys, list):
+            n = min(len(xs), len(ys))
+            try:
+                s = dict(s, x=encode_float32(xs[:n]), y=encode_float32(ys[:n]))
+            except (TypeError, OverflowError):
+                pass
+        out.append(s)
+    return dict(data, series=out)
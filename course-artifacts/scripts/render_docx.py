@@ -1,11 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from contextlib import contextmanager
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
 
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
 from docx.shared import Pt, RGBColor
 
+from md_blocks import MdSpan, parse_inline, parse_md_blocks, plain_text
+from pack_zip import ArtifactWriter, pin_zip_timestamps
 from visual_spec import get_content_md, get_meta_date, get_meta_title, get_meta_watermark
 
 
@@ -20,61 +26,215 @@ def add_header_watermark(doc: Document, watermark: str) -> None:
     run.font.bold = True
 
 
-def _add_md_block(doc: Document, md: str) -> None:
-    if not md:
-        return
-    text = md.replace("\r\n", "\n")
-    in_code = False
-    for raw in text.split("\n"):
-        line = raw.rstrip("\n")
-        stripped = line.strip()
+# East Asian font for CJK text; Word otherwise picks one from the theme/locale of the reader.
+EAST_ASIA_FONT = "SimSun"
+_EAST_ASIA_STYLES = ("Normal", "Title", "Heading 1", "Heading 2", "Heading 3", "Heading 4", "List Bullet")
+# Styles referenced by the renderers; their ids are resolved once per template, because
+# python-docx resolves a style *name* by scanning every style on each add_paragraph().
+_TEMPLATE_STYLES = ("Title", "Heading 1", "Heading 2", "Heading 3", "Heading 4", "List Bullet", "Table Grid")
+# Markdown "#" is one level below the section title (Heading 1); deeper levels share Heading 4.
+MAX_HEADING_LEVEL = 4
+_ALIGN = {"left": WD_ALIGN_PARAGRAPH.LEFT, "center": WD_ALIGN_PARAGRAPH.CENTER, "right": WD_ALIGN_PARAGRAPH.RIGHT}
+
 
-        if stripped.startswith("```"):
-            in_code = not in_code
-            continue
+def _set_east_asia_font(doc: Document, font_name: str) -> None:
+    for name in _EAST_ASIA_STYLES:
+        rfonts = doc.styles[name].element.get_or_add_rPr().get_or_add_rFonts()
+        rfonts.set(qn("w:eastAsia"), font_name)
+        rfonts.attrib.pop(qn("w:eastAsiaTheme"), None)
 
-        if in_code:
-            p = doc.add_paragraph(line)
-            for run in p.runs:
-                run.font.name = "Consolas"
-                run.font.size = Pt(10)
-            continue
 
-        if stripped.startswith("- "):
-            doc.add_paragraph(stripped[2:], style="List Bullet")
-            continue
+@lru_cache(maxsize=32)
+def _template(watermark: str) -> Tuple[bytes, Dict[str, str]]:
+    """Pre-styled base .docx (watermark header, East Asian font) and its style ids, built once per process."""
+    doc = Document()
+    add_header_watermark(doc, watermark)
+    _set_east_asia_font(doc, EAST_ASIA_FONT)
+    style_ids = {name: doc.styles[name].style_id for name in _TEMPLATE_STYLES}
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue(), style_ids
+
 
-        if stripped == "":
-            doc.add_paragraph("")
-            continue
+def new_document(watermark: str) -> Tuple[Document, Dict[str, str]]:
+    """In-memory clone of the cached template for `watermark`, plus style name -> style id."""
+    data, style_ids = _template(watermark)
+    return Document(BytesIO(data)), style_ids
 
-        doc.add_paragraph(line)
 
+def _add_styled(doc: Document, text: str, style_id: Optional[str] = None):
+    p = doc.add_paragraph(text)
+    if style_id:
+        p._p.style = style_id
+    return p
+
+
+def _add_runs(p, spans: Sequence[MdSpan]) -> None:
+    for span in spans:
+        run = p.add_run(span.text)
+        if span.code:
+            run.font.name = "Consolas"
+        if span.bold:
+            run.bold = True
+        if span.italic:
+            run.italic = True
+
+
+# ----------------------------
+# Emitters: the renderers below only talk to this interface
+# ----------------------------
+DOCX_BACKENDS = ("python-docx", "stream")
+
+
+class DocxEmitter(Protocol):
+    def heading(self, text: str, level: int) -> None: ...
+
+    def paragraph(self, text: str = "", style: Optional[str] = None) -> None: ...
+
+    def rich(self, spans: Sequence[MdSpan], style: Optional[str] = None) -> None: ...
+
+    def code(self, text: str) -> None: ...
+
+    def table(self, rows: Sequence[Sequence[str]], align: Sequence[str]) -> None: ...
+
+    def page_break(self) -> None: ...
+
+    def close(self) -> None: ...
+
+    def abort(self) -> None: ...
+
+
+class DocumentEmitter:
+    """python-docx backend: builds the whole document tree in memory and saves it on close()."""
+
+    def __init__(self, out_path: str, watermark: str, writer: ArtifactWriter):
+        self.out_path = out_path
+        self.writer = writer
+        self.doc, self.style_ids = new_document(watermark)
+
+    def heading(self, text: str, level: int) -> None:
+        _add_styled(self.doc, text, self.style_ids["Title" if level == 0 else f"Heading {level}"])
+
+    def paragraph(self, text: str = "", style: Optional[str] = None) -> None:
+        _add_styled(self.doc, text, self.style_ids[style] if style else None)
+
+    def rich(self, spans: Sequence[MdSpan], style: Optional[str] = None) -> None:
+        _add_runs(_add_styled(self.doc, "", self.style_ids[style] if style else None), spans)
+
+    def code(self, text: str) -> None:
+        p = self.doc.add_paragraph(text)
+        for run in p.runs:
+            run.font.name = "Consolas"
+            run.font.size = Pt(10)
+
+    def table(self, rows: Sequence[Sequence[str]], align: Sequence[str]) -> None:
+        table = self.doc.add_table(rows=len(rows), cols=len(align))
+        table._tbl.tblPr.style = self.style_ids["Table Grid"]
+        for r, row in enumerate(rows):
+            for col, cell_text in enumerate(row):
+                p = table.cell(r, col).paragraphs[0]
+                if align[col]:
+                    p.alignment = _ALIGN[align[col]]
+                spans = parse_inline(cell_text)
+                _add_runs(p, [s._replace(bold=True) for s in spans] if r == 0 else spans)
+
+    def page_break(self) -> None:
+        self.doc.add_page_break()
+
+    def close(self) -> None:
+        buf = BytesIO()
+        self.doc.save(buf)
+        if self.writer.date_time is not None:
+            pin_zip_timestamps(buf, self.writer.date_time)
+        self.writer.write(self.out_path, buf.getvalue())
+
+    def abort(self) -> None:
+        pass
+
+
+@contextmanager
+def open_docx(
+    out_path: str, watermark: str, *, backend: str = "python-docx", writer: Optional[ArtifactWriter] = None
+) -> Iterator[DocxEmitter]:
+    """
+    Emitter writing `out_path` from the cached template. "stream" writes word/document.xml
+    into the zip incrementally (no document tree in memory); same layout either way.
+    The finished file is recorded in `writer` (an in-memory writer gets the bytes, nothing is written).
+    """
+    writer = writer if writer is not None else ArtifactWriter()
+    out: DocxEmitter
+    target: Optional[BytesIO] = None  # stream backend, in-memory writer
+    if backend == "python-docx":
+        out = DocumentEmitter(out_path, watermark, writer)
+    elif backend == "stream":
+        from docx_stream import StreamingDocxWriter
+
+        template, style_ids = _template(watermark)
+        if writer.in_memory:
+            target = BytesIO()
+        out = StreamingDocxWriter(out_path if target is None else target, template, style_ids, writer.date_time)
+    else:
+        raise ValueError(f"Unknown DOCX backend: {backend!r} (expected one of: {', '.join(DOCX_BACKENDS)})")
+    try:
+        yield out
+    except BaseException:
+        out.abort()
+        raise
+    out.close()
+    if target is not None:
+        writer.write(out_path, target.getvalue())
+    elif backend == "stream":
+        writer.record_file(out_path)
+
+
+def _add_md_block(out: DocxEmitter, md: str) -> None:
+    if not md:
+        return
+    for block in parse_md_blocks(md):
+        if block.kind == "code":
+            for line in block.lines:
+                out.code(line)
+        elif block.kind == "heading":
+            out.heading(plain_text(block.text), min(block.level + 1, MAX_HEADING_LEVEL))
+        elif block.kind == "bullet":
+            out.rich(parse_inline(block.text), style="List Bullet")
+        elif block.kind == "ordered":
+            # literal numbers: Word's auto-numbering would continue across separate lists
+            out.rich((MdSpan(f"{block.number}. "),) + parse_inline(block.text))
+        elif block.kind == "table":
+            out.table(block.rows, block.align)
+        elif block.kind == "blank":
+            out.paragraph("")
+        else:
+            out.rich(parse_inline(block.text))
 
-def render_lecture_docx(course_data: Dict[str, Any], out_docx_path: str) -> None:
+
+def render_lecture_docx(
+    course_data: Dict[str, Any],
+    out_docx_path: str,
+    *,
+    backend: str = "python-docx",
+    writer: Optional[ArtifactWriter] = None,
+) -> None:
     title = get_meta_title(course_data)
     date = get_meta_date(course_data)
     watermark = get_meta_watermark(course_data)
 
     sections: List[Dict[str, Any]] = course_data.get("lecture_notes") or course_data.get("sections") or []
 
-    doc = Document()
-    add_header_watermark(doc, watermark)
-
-    doc.add_heading(f"{title} 讲稿", level=0)
-    doc.add_paragraph(f"Date: {date}")
-    doc.add_paragraph(f"Watermark: {watermark}")
-
-    doc.add_heading("目录", level=1)
-    for i, sec in enumerate(sections, start=1):
-        doc.add_paragraph(f"{i}. {sec.get('title', '')}")
+    with open_docx(out_docx_path, watermark, backend=backend, writer=writer) as out:
+        out.heading(f"{title} 讲稿", 0)
+        out.paragraph(f"Date: {date}")
+        out.paragraph(f"Watermark: {watermark}")
 
-    for sec in sections:
-        doc.add_page_break()
-        doc.add_heading(sec.get("title", ""), level=1)
-        _add_md_block(doc, get_content_md(sec))
+        out.heading("目录", 1)
+        for i, sec in enumerate(sections, start=1):
+            out.paragraph(f"{i}. {sec.get('title', '')}")
 
-    doc.save(out_docx_path)
+        for sec in sections:
+            out.page_break()
+            out.heading(sec.get("title", ""), 1)
+            _add_md_block(out, get_content_md(sec))
 
 
 def _normalize_true_false_answer(v: Any) -> str:
@@ -88,20 +248,20 @@ def _normalize_true_false_answer(v: Any) -> str:
     return s
 
 
-def _add_quiz_section(doc: Document, title: str, questions: List[Dict[str, Any]], *, kind: str) -> None:
-    doc.add_heading(title, level=1)
+def _add_quiz_section(out: DocxEmitter, title: str, questions: List[Dict[str, Any]], *, kind: str) -> None:
+    out.heading(title, 1)
 
     letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
     for i, q in enumerate(questions, start=1):
         stem = (q.get("stem") or "").strip()
-        doc.add_paragraph(f"{i}. {stem}")
+        out.paragraph(f"{i}. {stem}")
 
         if kind == "single_choice":
             options = q.get("options") or []
             if isinstance(options, list):
                 for j, opt in enumerate(options):
                     label = letters[j] if j < len(letters) else str(j + 1)
-                    doc.add_paragraph(f"{label}. {str(opt).strip()}")
+                    out.paragraph(f"{label}. {str(opt).strip()}")
 
         if kind == "true_false":
             answer = _normalize_true_false_answer(q.get("answer"))
@@ -109,11 +269,17 @@ def _add_quiz_section(doc: Document, title: str, questions: List[Dict[str, Any]]
             answer = str(q.get("answer") or "").strip()
 
         explanation = str(q.get("explanation") or "").strip()
-        doc.add_paragraph(f"答案：{answer}")
-        doc.add_paragraph(f"解析：{explanation}")
+        out.paragraph(f"答案：{answer}")
+        out.paragraph(f"解析：{explanation}")
 
 
-def render_quiz_docx(course_data: Dict[str, Any], out_docx_path: str) -> None:
+def render_quiz_docx(
+    course_data: Dict[str, Any],
+    out_docx_path: str,
+    *,
+    backend: str = "python-docx",
+    writer: Optional[ArtifactWriter] = None,
+) -> None:
     title = get_meta_title(course_data)
     date = get_meta_date(course_data)
     watermark = get_meta_watermark(course_data)
@@ -123,18 +289,14 @@ def render_quiz_docx(course_data: Dict[str, Any], out_docx_path: str) -> None:
     fill_blank = qb.get("fill_blank") or []
     true_false = qb.get("true_false") or []
 
-    doc = Document()
-    add_header_watermark(doc, watermark)
-
-    doc.add_heading(f"{title} 习题集", level=0)
-    doc.add_paragraph(f"Date: {date}")
-    doc.add_paragraph(f"Watermark: {watermark}")
-
-    if isinstance(single_choice, list):
-        _add_quiz_section(doc, "一、单选题（10题）", single_choice, kind="single_choice")
-    if isinstance(fill_blank, list):
-        _add_quiz_section(doc, "二、填空题（10题）", fill_blank, kind="fill_blank")
-    if isinstance(true_false, list):
-        _add_quiz_section(doc, "三、判断题（10题）", true_false, kind="true_false")
-
-    doc.save(out_docx_path)
+    with open_docx(out_docx_path, watermark, backend=backend, writer=writer) as out:
+        out.heading(f"{title} 习题集", 0)
+        out.paragraph(f"Date: {date}")
+        out.paragraph(f"Watermark: {watermark}")
+
+        if isinstance(single_choice, list):
+            _add_quiz_section(out, "一、单选题（10题）", single_choice, kind="single_choice")
+        if isinstance(fill_blank, list):
+            _add_quiz_section(out, "二、填空题（10题）", fill_blank, kind="fill_blank")
+        if isinstance(true_false, list):
+            _add_quiz_section(out, "三、判断题（10题）", true_false, kind="true_false")
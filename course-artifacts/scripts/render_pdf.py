@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import os
-from typing import Any, Dict, List
+from bisect import bisect_right
+from functools import lru_cache
+from io import BytesIO
+from itertools import accumulate
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
@@ -10,6 +15,8 @@ from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+from md_blocks import MdBlock, MdSpan, parse_inline, parse_md_blocks, plain_text
+from pack_zip import ArtifactWriter
 from visual_spec import get_content_md, get_meta_date, get_meta_title, get_meta_watermark
 
 
@@ -17,72 +24,188 @@ def _script_dir() -> str:
     return os.path.dirname(os.path.abspath(__file__))
 
 
+def _font_dir() -> str:
+    return os.path.abspath(os.path.join(_script_dir(), "..", "assets", "fonts"))
+
+
+CJK_TTF_CANDIDATES = ("NotoSansSC-Regular.ttf", "SourceHanSansSC-Regular.ttf")
+
+
+class FontMetrics:
+    """
+    Glyph advance widths in 1/1000 em. Measures text exactly like reportlab does for TTF and
+    CID fonts (0.001 * size * sum of advances), without going through pdfmetrics per call.
+    """
+
+    __slots__ = ("widths", "default_width")
+
+    def __init__(self, widths: Dict[str, float], default_width: float):
+        self.widths = widths
+        self.default_width = default_width
+
+    def string_width(self, text: str, font_size: float) -> float:
+        g = self.widths.get
+        dw = self.default_width
+        return 0.001 * font_size * sum(g(ch, dw) for ch in text)
+
+
+# Process-level font registry: font name -> metrics, filled when a font is registered
+# and shared by every render in the process.
+_FONT_METRICS: Dict[str, FontMetrics] = {}
+
+
+def _ttf_candidates() -> List[str]:
+    return [os.path.join(_font_dir(), name) for name in CJK_TTF_CANDIDATES]
+
+
+def _face_metrics(font: TTFont) -> FontMetrics:
+    return FontMetrics({chr(cp): w for cp, w in font.face.charWidths.items()}, font.face.defaultWidth)
+
+
+@lru_cache(maxsize=None)
 def _register_cjk_font() -> str:
     """
     Prefer a bundled TTF if provided; otherwise fall back to a built-in CID font.
+    Registered once per process (batch builds render many PDFs); its width table goes into
+    the font registry.
     """
-    candidates = [
-        os.path.abspath(os.path.join(_script_dir(), "..", "assets", "fonts", "NotoSansSC-Regular.ttf")),
-        os.path.abspath(os.path.join(_script_dir(), "..", "assets", "fonts", "SourceHanSansSC-Regular.ttf")),
-    ]
-    for path in candidates:
+    for path in _ttf_candidates():
         if not os.path.exists(path):
             continue
         try:
-            pdfmetrics.registerFont(TTFont("HoloCJK", path))
-            return "HoloCJK"
+            font = TTFont("HoloCJK", path)
+            pdfmetrics.registerFont(font)
         except Exception:
             continue
+        _FONT_METRICS["HoloCJK"] = _face_metrics(font)
+        return "HoloCJK"
 
     try:
-        pdfmetrics.registerFont(UnicodeCIDFont("STSong-Light"))
+        font = UnicodeCIDFont("STSong-Light")
+        pdfmetrics.registerFont(font)
+        _FONT_METRICS["STSong-Light"] = FontMetrics(dict(font.unicodeWidths), 1000)
         return "STSong-Light"
     except Exception:
         return "Helvetica"
 
 
 def _string_width(text: str, font_name: str, font_size: int) -> float:
+    metrics = _FONT_METRICS.get(font_name)
+    if metrics is not None:
+        return metrics.string_width(text, font_size)
     try:
         return pdfmetrics.stringWidth(text, font_name, font_size)
     except Exception:
         return 0.0
 
 
-def _wrap_line(text: str, font_name: str, font_size: int, max_width: float) -> List[str]:
+# Kinsoku (禁则) rules: characters that must not start a line / must not end a line.
+_NO_LINE_START = frozenset(
+    "!%),.:;?]}¢°·’”‰′″℃∶、。〃々〉》」』】〕〗〞︶︺︾﹀﹄﹚﹜﹞！＂％＇），．：；？］｝～｠｣､"
+    "ゝゞァィゥェォッャュョヮヵヶぁぃぅぇぉっゃゅょゎゕゖㇰㇱㇲㇳㇴㇵㇶㇷㇸㇹㇺㇻㇼㇽㇾㇿ…‥—"
+)
+_NO_LINE_END = frozenset("([{£¥‘“〈《「『【〔〖〝﹙﹛﹝＄（．［｛￡￥｟｢")
+
+# Per-(font, size) glyph width tables in points, filled lazily one character at a time.
+_WIDTH_TABLES: Dict[Tuple[str, int], Dict[str, float]] = {}
+
+
+def _char_widths(font_name: str, font_size: int) -> Dict[str, float]:
+    key = (font_name, font_size)
+    table = _WIDTH_TABLES.get(key)
+    if table is None:
+        table = _WIDTH_TABLES[key] = {}
+    return table
+
+
+def _prefix_widths(text: str, font_name: str, font_size: int) -> List[float]:
+    table = _char_widths(font_name, font_size)
+    widths = []
+    for ch in text:
+        w = table.get(ch)
+        if w is None:
+            w = table[ch] = _string_width(ch, font_name, font_size)
+        widths.append(w)
+    return [0.0, *accumulate(widths)]
+
+
+def _wrap_line(
+    text: str, font_name: str, font_size: int, max_width: float, *, kinsoku: bool = True
+) -> List[str]:
+    """
+    Greedy character wrapping (CJK lines have no spaces to break at).
+    Break points come from prefix sums of cached glyph widths (bisect per line), and each one
+    is confirmed with an exact stringWidth so float rounding never moves a break.
+    With `kinsoku`, a line never starts with closing punctuation or ends with an opening
+    bracket: the offending character is pushed to the next line.
+    """
     if text.strip() == "":
         return [""]
     if _string_width(text, font_name, font_size) <= max_width:
         return [text]
 
-    # For CJK lines without spaces, fallback to character wrapping.
+    def fits(start: int, end: int) -> bool:
+        return _string_width(text[start:end], font_name, font_size) <= max_width
+
+    prefix = _prefix_widths(text, font_name, font_size)
+    n = len(text)
     lines: List[str] = []
-    buf = ""
-    for ch in text:
-        cand = buf + ch
-        if _string_width(cand, font_name, font_size) <= max_width:
-            buf = cand
-        else:
-            if buf:
-                lines.append(buf)
-                buf = ch
-            else:
-                lines.append(ch)
-                buf = ""
-    if buf:
-        lines.append(buf)
+    start = 0
+    while start < n:
+        # Largest end with width(text[start:end]) <= max_width; at least one character per line.
+        end = bisect_right(prefix, prefix[start] + max_width, start + 1, n + 1) - 1
+        while end < n and fits(start, end + 1):
+            end += 1
+        while end > start and not fits(start, end):
+            end -= 1
+        end = max(end, start + 1)
+
+        if kinsoku and end < n:
+            brk = end
+            while brk - start > 1 and (text[brk] in _NO_LINE_START or text[brk - 1] in _NO_LINE_END):
+                brk -= 1
+            if brk - start >= 1 and text[brk] not in _NO_LINE_START and text[brk - 1] not in _NO_LINE_END:
+                end = brk
+
+        lines.append(text[start:end])
+        start = end
     return lines
 
 
+def _watermark_form_name(text: str, font_name: str) -> str:
+    digest = hashlib.sha1(f"{font_name}\0{text}".encode("utf-8")).hexdigest()[:12]
+    return f"HoloWatermark{digest}"
+
+
 def draw_watermark(c: canvas.Canvas, text: str, *, font_name: str):
+    """
+    Tile the watermark once per document as a form XObject and reference it with doForm,
+    so each page adds one operator instead of re-encoding ~66 rotated strings.
+    """
+    w, h = A4
+    name = _watermark_form_name(text, font_name)
+    if not c.hasForm(name):
+        c.beginForm(name, 0, 0, w, h)
+        c.translate(w / 2, h / 2)
+        c.rotate(30)
+        c.setFillGray(0.85)
+        c.setFont(font_name, 28)
+        for y in range(-600, 650, 120):
+            for x in range(-600, 650, 220):
+                c.drawString(x, y, text)
+        c.endForm()
+    c.saveState()
+    c.doForm(name)
+    c.restoreState()
+
+
+def draw_running_header(c: canvas.Canvas, left: str, right: str, *, font_name: str):
     w, h = A4
     c.saveState()
-    c.translate(w / 2, h / 2)
-    c.rotate(30)
-    c.setFillGray(0.85)
-    c.setFont(font_name, 28)
-    for y in range(-600, 650, 120):
-        for x in range(-600, 650, 220):
-            c.drawString(x, y, text)
+    c.setFillGray(0.55)
+    c.setFont(font_name, 8)
+    c.drawString(20 * mm, h - 12 * mm, left)
+    c.drawRightString(w - 20 * mm, h - 12 * mm, right)
     c.restoreState()
 
 
@@ -96,16 +219,249 @@ def draw_paragraph(
     font_name: str,
     font_size: int = 11,
     leading: int = 15,
+    bottom: float = 25 * mm,
+    new_page: Optional[Callable[[], float]] = None,
 ) -> float:
+    """
+    Draw wrapped text line by line from `y` downwards and return the next baseline.
+    When a line would fall below `bottom`, `new_page()` is called (it must show the page,
+    redraw page furniture and return the new top baseline); without it text runs off the page.
+    Lines are wrapped and drawn one source line at a time, so layout memory stays flat.
+    """
     c.setFont(font_name, font_size)
     for raw in (text or "").replace("\r\n", "\n").split("\n"):
         for line in _wrap_line(raw, font_name, font_size, max_width):
+            if new_page is not None and y < bottom:
+                y = new_page()
+                c.setFont(font_name, font_size)
             c.drawString(x, y, line)
             y -= leading
     return y
 
 
-def render_pdf(course_data: Dict[str, Any], out_pdf_path: str):
+def _slice_spans(spans: Sequence[MdSpan], start: int, end: int) -> List[MdSpan]:
+    out: List[MdSpan] = []
+    pos = 0
+    for span in spans:
+        nxt = pos + len(span.text)
+        if nxt > start and pos < end:
+            out.append(span._replace(text=span.text[max(start - pos, 0) : end - pos]))
+        pos = nxt
+        if pos >= end:
+            break
+    return out
+
+
+def _draw_bold_string(c: canvas.Canvas, x: float, y: float, text: str, *, font_size: float) -> None:
+    """Fake bold: fill + stroke in the current fill colour (one glyph run, so text extraction stays clean)."""
+    c.saveState()
+    c.setStrokeColor(c._fillColorObj)
+    c.setLineWidth(0.035 * font_size)
+    t = c.beginText(x, y)
+    t.setTextRenderMode(2)
+    t.textOut(text)
+    c.drawText(t)
+    c.restoreState()
+
+
+def _draw_spans(c: canvas.Canvas, x: float, y: float, spans: Sequence[MdSpan], *, font_name: str, font_size: int):
+    """
+    Draw one line of inline spans from `x`. With a single CJK face there is no real bold or
+    italic: bold is filled and stroked, italic is slanted, code gets a shaded box.
+    """
+    for span in spans:
+        if not span.text:
+            continue
+        width = _string_width(span.text, font_name, font_size)
+        if span.bold or span.italic or span.code:
+            c.saveState()
+            c.translate(x, y)
+            if span.code:
+                c.setFillGray(0.92)
+                c.rect(-1, -0.25 * font_size, width + 2, 1.15 * font_size, stroke=0, fill=1)
+                c.setFillGray(0.3)
+            if span.italic:
+                c.skew(0, 12)
+            if span.bold:
+                _draw_bold_string(c, 0, 0, span.text, font_size=font_size)
+            else:
+                c.drawString(0, 0, span.text)
+            c.restoreState()
+        else:
+            c.drawString(x, y, span.text)
+        x += width
+
+
+def draw_rich_paragraph(
+    c: canvas.Canvas,
+    x: float,
+    y: float,
+    spans: Sequence[MdSpan],
+    *,
+    max_width: float,
+    font_name: str,
+    font_size: int = 11,
+    leading: int = 15,
+    bottom: float = 25 * mm,
+    new_page: Optional[Callable[[], float]] = None,
+) -> float:
+    """draw_paragraph for one line of inline spans: wrapped on the plain text, drawn span by span."""
+    text = "".join(span.text for span in spans)
+    c.setFont(font_name, font_size)
+    pos = 0
+    for line in _wrap_line(text, font_name, font_size, max_width):
+        if new_page is not None and y < bottom:
+            y = new_page()
+            c.setFont(font_name, font_size)
+        _draw_spans(c, x, y, _slice_spans(spans, pos, pos + len(line)), font_name=font_name, font_size=font_size)
+        pos += len(line)
+        y -= leading
+    return y
+
+
+def draw_md_table(
+    c: canvas.Canvas,
+    x: float,
+    y: float,
+    rows: Sequence[Sequence[str]],
+    align: Sequence[str],
+    *,
+    max_width: float,
+    font_name: str,
+    font_size: int = 10,
+    leading: int = 13,
+    bottom: float = 25 * mm,
+    new_page: Optional[Callable[[], float]] = None,
+) -> float:
+    """Grid table with equal column widths; cells wrap, the header row is bold and shaded."""
+    col_w = max_width / len(align)
+    pad = 1.5 * mm
+    top = y + font_size
+    for r, row in enumerate(rows):
+        cells = [_wrap_line(plain_text(t), font_name, font_size, col_w - 2 * pad) for t in row]
+        height = 2 * pad + max(len(lines) for lines in cells) * leading
+        if new_page is not None and top - height < bottom - leading:
+            top = new_page() + font_size
+        c.saveState()
+        c.setStrokeGray(0.6)
+        c.setLineWidth(0.5)
+        c.setFillGray(0.95)
+        c.rect(x, top - height, max_width, height, stroke=1, fill=1 if r == 0 else 0)
+        for col in range(1, len(align)):
+            c.line(x + col * col_w, top, x + col * col_w, top - height)
+        c.restoreState()
+        c.setFont(font_name, font_size)
+        for col, lines in enumerate(cells):
+            left, baseline = x + col * col_w, top - pad - 0.8 * font_size
+            for line in lines:
+                lw = _string_width(line, font_name, font_size)
+                if align[col] == "center":
+                    lx = left + (col_w - lw) / 2
+                elif align[col] == "right":
+                    lx = left + col_w - pad - lw
+                else:
+                    lx = left + pad
+                if r == 0:
+                    _draw_bold_string(c, lx, baseline, line, font_size=font_size)
+                else:
+                    c.drawString(lx, baseline, line)
+                baseline -= leading
+        top -= height
+    return top - leading
+
+
+HEADING_SIZES = {1: 14, 2: 13}
+
+
+def draw_md_blocks(
+    c: canvas.Canvas,
+    x: float,
+    y: float,
+    blocks: Sequence[MdBlock],
+    *,
+    max_width: float,
+    font_name: str,
+    font_size: int = 11,
+    leading: int = 15,
+    bottom: float = 25 * mm,
+    new_page: Optional[Callable[[], float]] = None,
+) -> float:
+    """
+    Draw parsed section markdown (md_blocks) with the same block layout as HTML/DOCX:
+    headings are larger and bold, list items get a marker and a hanging indent, tables are
+    drawn as grids, fenced code is indented in a smaller size with the fences not drawn.
+    Returns the next baseline, like draw_paragraph.
+    """
+    indent = 5 * mm
+    for block in blocks:
+        kind = block.kind
+        if kind == "code":
+            if block.lines:
+                y = draw_paragraph(
+                    c,
+                    x + indent,
+                    y,
+                    "\n".join(block.lines),
+                    max_width=max_width - indent,
+                    font_name=font_name,
+                    font_size=font_size - 1,
+                    leading=leading - 2,
+                    bottom=bottom,
+                    new_page=new_page,
+                )
+            continue
+
+        if kind == "table":
+            y = draw_md_table(
+                c,
+                x,
+                y,
+                block.rows,
+                block.align,
+                max_width=max_width,
+                font_name=font_name,
+                bottom=bottom,
+                new_page=new_page,
+            )
+            continue
+
+        spans = parse_inline(block.text)
+        left, width, size, line_h = x, max_width, font_size, leading
+        if kind == "heading":
+            size = HEADING_SIZES.get(block.level, font_size + 1)
+            line_h = size + 6
+            spans = tuple(span._replace(bold=True) for span in spans)
+            y -= 2
+        elif kind in ("bullet", "ordered"):
+            if new_page is not None and y < bottom:
+                y = new_page()
+            if kind == "bullet":
+                c.circle(x + indent / 2, y + font_size * 0.3, 0.6 * mm, stroke=0, fill=1)
+            else:
+                c.setFont(font_name, font_size)
+                c.drawRightString(x + indent - 1, y, f"{block.number}.")
+            left, width = x + indent, max_width - indent
+        y = draw_rich_paragraph(
+            c,
+            left,
+            y,
+            spans,
+            max_width=width,
+            font_name=font_name,
+            font_size=size,
+            leading=line_h,
+            bottom=bottom,
+            new_page=new_page,
+        )
+    return y
+
+
+def render_pdf(
+    course_data: Dict[str, Any], out_pdf_path: str, *, writer: Optional[ArtifactWriter] = None
+) -> Dict[str, Any]:
+    """
+    Render the handout PDF (recorded in `writer`). Returns per-file info for the manifest (none: {}).
+    """
     title = get_meta_title(course_data)
     date = get_meta_date(course_data)
     watermark = get_meta_watermark(course_data)
@@ -114,7 +470,10 @@ def render_pdf(course_data: Dict[str, Any], out_pdf_path: str):
 
     font_name = _register_cjk_font()
 
-    c = canvas.Canvas(out_pdf_path, pagesize=A4)
+    writer = writer if writer is not None else ArtifactWriter()
+    buf = BytesIO()
+    # invariant: fixed creation date and document ID, for reproducible builds
+    c = canvas.Canvas(buf, pagesize=A4, invariant=1 if writer.date_time is not None else None)
     w, h = A4
 
     # Cover + TOC
@@ -141,22 +500,39 @@ def render_pdf(course_data: Dict[str, Any], out_pdf_path: str):
         if y < 25 * mm:
             c.showPage()
             draw_watermark(c, watermark, font_name=font_name)
+            # showPage resets the graphics state
+            c.setFillGray(0.15)
+            c.setFont(font_name, 11)
             y = h - 25 * mm
 
     c.showPage()
 
     # Body pages
     for sec in sections:
+        sec_title = sec.get("title", "")
+
+        def continue_section() -> float:
+            c.showPage()
+            draw_watermark(c, watermark, font_name=font_name)
+            draw_running_header(c, title, f"{sec_title}（续）", font_name=font_name)
+            c.setFillGray(0.15)
+            return h - 25 * mm
+
         draw_watermark(c, watermark, font_name=font_name)
+        draw_running_header(c, title, sec_title, font_name=font_name)
         c.setFillGray(0.1)
         c.setFont(font_name, 16)
-        c.drawString(20 * mm, h - 25 * mm, sec.get("title", ""))
+        c.drawString(20 * mm, h - 25 * mm, sec_title)
 
         c.setFillGray(0.15)
-        body = get_content_md(sec)
+        blocks = parse_md_blocks(get_content_md(sec))
         y = h - 38 * mm
-        y = draw_paragraph(c, 20 * mm, y, body, max_width=w - 40 * mm, font_name=font_name)
+        y = draw_md_blocks(
+            c, 20 * mm, y, blocks, max_width=w - 40 * mm, font_name=font_name, new_page=continue_section
+        )
 
         c.showPage()
 
     c.save()
+    writer.write(out_pdf_path, buf.getvalue())
+    return {}
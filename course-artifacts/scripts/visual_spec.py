@@ -3,11 +3,15 @@ from __future__ import annotations
 import hashlib
 import json
 import os
+import threading
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
 
+from interactive_expr import ExpressionError, compile_interactive
 
-BUILDER_VERSION = "1.1.0"
+
+BUILDER_VERSION = "1.2.0"
 SUPPORTED_SPEC_VERSION_PREFIXES = ("1.1", "v1.1")
 
 
@@ -29,6 +33,48 @@ def load_schema_v1_1() -> Dict[str, Any]:
         return json.load(f)
 
 
+def _draft202012_validator_cls() -> Any:
+    try:
+        from jsonschema import Draft202012Validator
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError(
+            "Missing dependency: jsonschema. Install minimal requirements (see requirements.min.txt)."
+        ) from e
+    return Draft202012Validator
+
+
+# Process-wide validators: schema path -> {"stamp", "sha256", "validator"}
+_VALIDATOR_CACHE: Dict[str, Dict[str, Any]] = {}
+_VALIDATOR_LOCK = threading.Lock()
+
+
+def get_validator_v1_1() -> Any:
+    """
+    Draft 2020-12 validator for the v1.1 schema, shared by the whole process. The schema file is
+    only re-read when its mtime/size changes, and the validator only rebuilt when the re-read
+    content hash differs.
+    """
+    path = schema_path_v1_1()
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    with _VALIDATOR_LOCK:
+        cached = _VALIDATOR_CACHE.get(path)
+        if cached and cached["stamp"] == stamp:
+            return cached["validator"]
+
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if cached and cached["sha256"] == digest:
+            cached["stamp"] = stamp
+            return cached["validator"]
+
+        validator = _draft202012_validator_cls()(json.loads(raw.decode("utf-8")))
+        _VALIDATOR_CACHE[path] = {"stamp": stamp, "sha256": digest, "validator": validator}
+        return validator
+
+
 def json_canonical_dumps(data: Any) -> str:
     return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
 
@@ -41,6 +87,47 @@ def compute_spec_hash(data: Dict[str, Any]) -> str:
     return sha256_text(json_canonical_dumps(data))
 
 
+# Top-level spec fields each renderer reads; an export only needs rebuilding when these change.
+EXPORT_INPUT_FIELDS: Dict[str, Sequence[str]] = {
+    "html": ("meta", "sections", "visuals", "interactive"),
+    "lecture_docx": ("meta", "lecture_notes", "sections"),
+    "quiz_docx": ("meta", "quiz_bank"),
+    "pdf": ("meta", "lecture_notes", "sections"),
+}
+
+
+@lru_cache(maxsize=1)
+def builder_sources_hash() -> str:
+    """
+    Hash of the builder's own sources (scripts/*.py). Part of every export input hash, so a
+    renderer change invalidates incremental reuse and artifact-cache entries even when
+    BUILDER_VERSION was not bumped.
+    """
+    h = hashlib.sha256()
+    for name in sorted(os.listdir(_script_dir())):
+        if name.endswith(".py"):
+            with open(os.path.join(_script_dir(), name), "rb") as f:
+                h.update(name.encode("utf-8") + b"\0" + hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def compute_export_hash(data: Dict[str, Any], export_key: str, *, variant: Optional[str] = None) -> str:
+    """
+    Hash of the normalized spec slice an export depends on, plus BUILDER_VERSION and the
+    builder's sources (builder_sources_hash).
+    The resolved date is included because renderers fall back to today when meta.date is missing.
+    `variant` names a non-default renderer option (e.g. the DOCX backend) that changes the bytes.
+    """
+    inputs: Dict[str, Any] = {k: data.get(k) for k in EXPORT_INPUT_FIELDS[export_key]}
+    inputs["$export"] = export_key
+    inputs["$date"] = get_meta_date(data)
+    inputs["$builder_version"] = BUILDER_VERSION
+    inputs["$builder_sources"] = builder_sources_hash()
+    if variant:
+        inputs["$variant"] = variant
+    return sha256_text(json_canonical_dumps(inputs))
+
+
 def _path_to_str(path: Iterable[Union[str, int]]) -> str:
     parts: List[str] = []
     for p in path:
@@ -109,25 +196,38 @@ def normalize_visual_spec(data: Dict[str, Any]) -> Dict[str, Any]:
     return data
 
 
-def validate_visual_spec_v1_1(data: Dict[str, Any], *, schema: Optional[Dict[str, Any]] = None) -> None:
-    try:
-        from jsonschema import Draft202012Validator
-    except Exception as e:  # pragma: no cover
-        raise RuntimeError(
-            "Missing dependency: jsonschema. Install minimal requirements (see requirements.min.txt)."
-        ) from e
-
-    schema_obj = schema or load_schema_v1_1()
-    validator = Draft202012Validator(schema_obj)
-    errors = sorted(validator.iter_errors(data), key=lambda e: list(e.path))
-    if errors:
-        raise VisualSpecValidationError(_format_jsonschema_error(errors[0]))
+def validate_visual_spec_v1_1(
+    data: Dict[str, Any],
+    *,
+    schema: Optional[Dict[str, Any]] = None,
+    fail_fast: bool = False,
+) -> None:
+    """
+    Validate against the v1.1 schema (cached validator unless an explicit `schema` is given).
+    By default all schema errors are collected and the one with the smallest path is reported;
+    `fail_fast` stops at the first error jsonschema yields, which may be a different one.
+    """
+    validator = _draft202012_validator_cls()(schema) if schema is not None else get_validator_v1_1()
+    if fail_fast:
+        first = next(iter(validator.iter_errors(data)), None)
+        if first is not None:
+            raise VisualSpecValidationError(_format_jsonschema_error(first))
+    else:
+        errors = sorted(validator.iter_errors(data), key=lambda e: list(e.path))
+        if errors:
+            raise VisualSpecValidationError(_format_jsonschema_error(errors[0]))
 
     # Extra checks with clearer messages
     sections = data.get("sections") or []
     if isinstance(sections, list) and len(sections) < 4:
         raise VisualSpecValidationError(f"sections: expected >= 4 items, got {len(sections)}")
 
+    # The interactive expression must compile (whitelisted syntax, known names, usable sliders)
+    try:
+        compile_interactive(data.get("interactive"))
+    except ExpressionError as e:
+        raise VisualSpecValidationError(str(e)) from None
+
     qb = data.get("quiz_bank") or {}
     if isinstance(qb, dict):
         for k in ("single_choice", "fill_blank", "true_false"):
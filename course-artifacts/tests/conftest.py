@@ -0,0 +1,16 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+DEMO_SPEC = os.path.join(ROOT, "data", "demo_course_data.json")
+
+
+@pytest.fixture
+def demo_spec():
+    with open(DEMO_SPEC, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,71 @@
+import copy
+import hashlib
+
+import builder
+from artifact_cache import ArtifactCache
+
+
+def _store(cache, outdir, name, payload):
+    (outdir / name).write_bytes(payload)
+    entries = {name: {"size": len(payload), "sha256": hashlib.sha256(payload).hexdigest()}}
+    key = ArtifactCache.key("html", "input-hash", name)
+    cache.store(key, str(outdir), {"note": 1}, entries)
+    return key, entries
+
+
+def test_hit_places_the_cached_bytes(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    key, entries = _store(cache, tmp_path / "a", "page.html", b"<html>cached</html>")
+
+    assert cache.fetch(key, str(tmp_path / "b")) == ({"note": 1}, entries)
+    assert (tmp_path / "b" / "page.html").read_bytes() == b"<html>cached</html>"
+
+
+def test_same_size_edit_in_place_is_a_miss(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    key, _entries = _store(cache, tmp_path / "a", "page.html", b"<html>cached</html>")
+
+    # edit the (possibly hardlinked) output in place, keeping its size
+    with open(tmp_path / "a" / "page.html", "r+b") as f:
+        f.write(b"<HTML>")
+
+    assert cache.fetch(key, str(tmp_path / "b")) is None
+    assert not (tmp_path / "b" / "page.html").exists()
+
+
+def _build(spec, outdir, cache):
+    data, spec_hash, spec_version = builder.prepare_spec(copy.deepcopy(spec))
+    res = builder.build_outputs(
+        data,
+        str(outdir),
+        spec_hash=spec_hash,
+        spec_version=spec_version,
+        only=["lecture_docx", "quiz_docx"],
+        docx_backend="stream",
+        reproducible=True,
+        cache=cache,
+        log=None,
+    )
+    return {name: (outdir / name).read_bytes() for name in res["outputs"]}
+
+
+def test_rebuild_does_not_touch_other_outdirs_sharing_objects(demo_spec, tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"))
+    first = _build(demo_spec, tmp_path / "out1", cache)
+    assert _build(demo_spec, tmp_path / "out2", cache) == first  # hit: hardlinked objects
+
+    edited = copy.deepcopy(demo_spec)
+    edited["lecture_notes"][0]["title"] += "（修订）"
+    edited["quiz_bank"]["single_choice"][0]["stem"] += "（修订）"
+    rebuilt = _build(edited, tmp_path / "out1", cache)  # same file names, new bytes
+    assert rebuilt.keys() == first.keys()
+    assert all(rebuilt[name] != first[name] for name in first)
+    assert not list((tmp_path / "out1").glob("*.tmp"))
+
+    assert {name: (tmp_path / "out2" / name).read_bytes() for name in first} == first
+    for obj in (tmp_path / "cache" / "objects").glob("*/*"):
+        assert hashlib.sha256(obj.read_bytes()).hexdigest() == obj.name
@@ -0,0 +1,73 @@
+import copy
+
+import pytest
+
+import builder
+
+ALL_EXPORTS = ["html", "lecture_docx", "quiz_docx", "pdf", "zip"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+@pytest.mark.parametrize("docx_backend", ["python-docx", "stream"])
+def test_outdir_build_matches_in_memory_build(demo_spec, tmp_path, jobs, docx_backend):
+    data, spec_hash, spec_version = builder.prepare_spec(copy.deepcopy(demo_spec))
+    res = builder.build_outputs(
+        data,
+        str(tmp_path),
+        spec_hash=spec_hash,
+        spec_version=spec_version,
+        only=ALL_EXPORTS,
+        jobs=jobs,
+        docx_backend=docx_backend,
+        reproducible=True,
+        log=None,
+    )
+    mem = builder.build(copy.deepcopy(demo_spec), only=ALL_EXPORTS, docx_backend=docx_backend, reproducible=True)
+    with open(res["zip"], "rb") as f:
+        assert f.read() == mem.zip_bytes()
+    with open(res["manifest"], "rb") as f:
+        assert f.read() == mem.manifest_bytes()
+    for name in res["outputs"]:
+        assert (tmp_path / name).read_bytes() == mem.files[name]
+
+
+@pytest.mark.parametrize("docx_backend", ["python-docx", "stream"])
+def test_render_export_into_outdir_returns_no_bytes(demo_spec, tmp_path, docx_backend):
+    data, _hash, _version = builder.prepare_spec(copy.deepcopy(demo_spec))
+    _info, entries, contents = builder.render_export(
+        "quiz_docx", data, "quiz.docx", outdir=str(tmp_path), docx_backend=docx_backend
+    )
+    assert contents == {}
+    assert entries["quiz.docx"]["size"] == (tmp_path / "quiz.docx").stat().st_size
+
+    _info, _entries, kept = builder.render_export(
+        "quiz_docx", data, "kept.docx", outdir=str(tmp_path), keep=True, docx_backend=docx_backend
+    )
+    # a streamed DOCX goes straight to disk and is never held in memory
+    assert list(kept) == ([] if docx_backend == "stream" else ["kept.docx"])
+
+
+def test_incremental_rerenders_an_output_edited_in_place(demo_spec, tmp_path):
+    data, spec_hash, spec_version = builder.prepare_spec(copy.deepcopy(demo_spec))
+
+    def run():
+        return builder.build_outputs(
+            data,
+            str(tmp_path),
+            spec_hash=spec_hash,
+            spec_version=spec_version,
+            only=["lecture_docx", "quiz_docx"],
+            incremental=True,
+            reproducible=True,
+            log=None,
+        )
+
+    lecture, _quiz = run()["outputs"]
+    original = (tmp_path / lecture).read_bytes()
+    with open(tmp_path / lecture, "r+b") as f:  # same size, different bytes
+        f.seek(len(original) // 2)
+        f.write(bytes([original[len(original) // 2] ^ 0xFF]))
+
+    res = run()
+    assert res["skipped"] == ["quiz_docx"]
+    assert (tmp_path / lecture).read_bytes() == original
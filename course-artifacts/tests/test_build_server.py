@@ -0,0 +1,95 @@
+import copy
+import http.client
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from build_server import BuildService, make_server
+
+
+@pytest.fixture
+def serve(tmp_path):
+    """Start a BuildService behind an HTTP server on a free localhost port; returns a request function."""
+    started = []
+
+    def start(**kwargs):
+        service = BuildService(str(tmp_path / "out"), **kwargs)
+        service.warm_up()
+        server = make_server("127.0.0.1", 0, service)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append((server, service))
+        port = server.server_address[1]
+
+        def request(method, path, body=None, headers=None):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+            payload = json.loads(resp.read().decode("utf-8"))
+            conn.close()
+            return resp.status, payload
+
+        return service, request
+
+    yield start
+    for server, service in started:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def _slow_spec(spec):
+    slow = copy.deepcopy(spec)
+    for note in slow["lecture_notes"]:
+        note["content_md"] = "\n\n".join(f"段落 {i} " * 20 for i in range(300))
+    return slow
+
+
+def test_healthz_and_build(serve, demo_spec, tmp_path):
+    service, request = serve(workers=1, queue_size=1)
+    assert request("GET", "/healthz")[0] == 200
+
+    status, manifest = request("POST", "/build?only=html,zip", json.dumps(demo_spec).encode("utf-8"))
+    assert status == 200
+    assert [f["name"] for f in manifest["files"]] == ["course_interactive.html"]
+    assert os.path.isfile(manifest["zip_path"])
+    assert request("GET", "/metrics")[1]["completed"] == 1
+
+
+def test_bad_requests(serve):
+    service, request = serve(workers=1, queue_size=0)
+    assert request("POST", "/build", b"{not json")[0] == 400
+    assert request("POST", "/build", b"{}", headers={"Content-Length": "abc"})[0] == 400
+    assert request("POST", "/build", b'{"spec_version": "1.1"}')[0] == 400  # fails validation
+    for body in (b"[]", b'"x"', b"null"):  # valid JSON, but not an object
+        status, payload = request("POST", "/build", body)
+        assert status == 400 and "expected an object" in payload["error"]
+    assert service.metrics()["requests"] == 1  # only the spec that reached validation
+
+
+def test_timed_out_build_keeps_its_slot(serve, demo_spec):
+    service, request = serve(workers=1, queue_size=0, timeout=0.05)
+    body = json.dumps(_slow_spec(demo_spec)).encode("utf-8")
+    assert request("POST", "/build?only=lecture_docx", body)[0] == 504
+    # the timed-out build is still running in the only worker: the next request is rejected
+    assert request("POST", "/build?only=lecture_docx", body)[0] == 503
+    assert service.metrics()["rejected"] == 1
+
+    deadline = time.time() + 60
+    while service.metrics()["in_flight"] and time.time() < deadline:
+        time.sleep(0.05)
+    assert service.metrics()["in_flight"] == 0
+
+
+def test_build_dirs_survive_restart_and_are_pruned(tmp_path, demo_spec):
+    out = tmp_path / "out"
+    for seq in (1, 2, 3):
+        (out / f"build-{seq:06d}").mkdir(parents=True)
+    service = BuildService(str(out), workers=1, queue_size=0, keep_builds=2)
+    try:
+        service.build(demo_spec, only=["html"])
+    finally:
+        service.close()
+    assert sorted(os.listdir(out)) == ["build-000003", "build-000004"]
@@ -0,0 +1,72 @@
+import pytest
+
+from interactive_expr import ExpressionError, compile_expression, compile_interactive
+
+PARAMS = ["a", "b", "c", "k"]
+
+
+@pytest.mark.parametrize(
+    "expression, js",
+    [
+        ("a*x^2 + b*x + c", "(x, p) => (((p[0] * Math.pow(x, 2)) + (p[1] * x)) + p[2])"),
+        ("sin(k*x) + pi", "(x, p) => (Math.sin((p[3] * x)) + Math.PI)"),
+        ("-x**2", "(x, p) => (-Math.pow(x, 2))"),
+        ("max(x, 0.5, c)", "(x, p) => Math.max(x, 0.5, p[2])"),
+    ],
+)
+def test_compiles_to_js(expression, js):
+    assert compile_expression(expression, PARAMS) == js
+
+
+@pytest.mark.parametrize(
+    "expression, message",
+    [
+        ("__import__('os').system('x')", "unknown function '?'"),
+        ("__import__('os')", "unknown function '__import__'"),
+        ("x.real", "unsupported syntax (Attribute)"),
+        ("sin.__class__", "unsupported syntax (Attribute)"),
+        ("lambda: x", "unsupported syntax (Lambda)"),
+        ("(lambda: 1)()", "unknown function '?'"),
+        ("y * x", "unknown name 'y'"),
+        ("__builtins__", "unknown name '__builtins__'"),
+        ("eval('1')", "unknown function 'eval'"),
+        ("sin", "function 'sin' must be called"),
+        ("x if a else b", "unsupported syntax (IfExp)"),
+        ("[x][0]", "unsupported syntax (Subscript)"),
+        ("'alert(1)'", "unsupported constant"),
+        ("True", "unsupported constant"),
+        ("x @ a", "unsupported operator MatMult"),
+        ("min(x)", "min() takes 2 or 3 or 4 argument(s)"),
+        ("x; 1", "syntax error"),
+        ("x # c", "comments are not allowed"),
+        ("1e400", "number out of range"),
+        ("x" + "+x" * 300, "longer than"),
+        ("", "expected a non-empty string"),
+    ],
+)
+def test_rejects_anything_outside_the_whitelist(expression, message):
+    with pytest.raises(ExpressionError, match="^interactive.expression: ") as err:
+        compile_expression(expression, PARAMS)
+    assert message in str(err.value)
+
+
+def test_unknown_params_are_unknown_names():
+    with pytest.raises(ExpressionError, match="unknown name 'k'"):
+        compile_expression("k * x", ["a"])
+
+
+def test_quadratic_params_without_expression():
+    curve = compile_interactive({"params": {"a": {"default": 2}, "b": {}, "c": {}}})
+    assert curve.quadratic
+    assert curve.js == compile_expression("a*x^2 + b*x + c", ["a", "b", "c"])
+    assert [s.default for s in curve.sliders] == [2.0, 0.0, 0.0]
+
+
+@pytest.mark.parametrize(
+    "name, message",
+    [("sin", "name is reserved"), ("pi", "name is reserved"), ("t", "name is reserved"), ("a.b", "identifiers")],
+)
+def test_param_names_must_be_unreserved_identifiers(name, message):
+    spec = {"expression": "t", "variable": "t", "params": {name: {"min": 0, "max": 1, "step": 0.1, "default": 0}}}
+    with pytest.raises(ExpressionError, match=rf"^interactive\.params\.{name}: .*{message}"):
+        compile_interactive(spec)
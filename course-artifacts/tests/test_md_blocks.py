@@ -0,0 +1,92 @@
+import pytest
+
+from builder import md_to_basic_html
+from md_blocks import MdBlock, MdSpan, parse_inline, parse_md_blocks, plain_text
+
+
+# Output of the line-based md_to_basic_html this parser replaced, for input it already handled.
+@pytest.mark.parametrize(
+    "md, html",
+    [
+        (
+            "第一段\n\n- 要点一\n- 要点二 <b>&\n正文",
+            "<p>第一段</p>\n<div class='p-spacer'></div>\n"
+            "<ul>\n<li>要点一</li>\n<li>要点二 &lt;b&gt;&amp;</li>\n</ul>\n<p>正文</p>",
+        ),
+        (
+            "```\nx = a*b\n- not a bullet\n```\n后文",
+            "<pre class='code'><code>x = a*b\n- not a bullet</code></pre>\n<p>后文</p>",
+        ),
+        ("- a\n```py\ncode\n", "<ul>\n<li>a</li>\n</ul>\n<pre class='code'><code>code\n</code></pre>"),
+        ("  - 缩进要点\n\r\n结尾", "<ul>\n<li>缩进要点</li>\n</ul>\n<div class='p-spacer'></div>\n<p>结尾</p>"),
+        ("", "<div class='p-spacer'></div>"),
+        ("a & b 'q' \"d\"", "<p>a &amp; b &#39;q&#39; &quot;d&quot;</p>"),
+    ],
+)
+def test_html_matches_the_line_based_renderer(md, html):
+    assert md_to_basic_html(md) == html
+
+
+def test_blocks():
+    md = "# 标题 #\n### \n2) 第二\n3. 第三\n* 星号\n| a | b |\n|:--|--:|\n| 1 | x\\|y |\n| 2 |\n\n```\n# 不是标题\n"
+    assert parse_md_blocks(md) == (
+        MdBlock("heading", "标题", level=1),
+        MdBlock("heading", "", level=3),
+        MdBlock("ordered", "第二", number=2),
+        MdBlock("ordered", "第三", number=3),
+        MdBlock("bullet", "星号"),
+        MdBlock("table", rows=(("a", "b"), ("1", "x|y"), ("2", "")), align=("left", "right")),
+        MdBlock("blank"),
+        MdBlock("code", lines=("# 不是标题", "")),
+    )
+
+
+@pytest.mark.parametrize(
+    "md",
+    [
+        "#标题",  # no space after the marks
+        "####### seven",
+        "1.no space",
+        "| a | b |\n| -- |",  # delimiter row with the wrong column count
+        "a | b",
+    ],
+)
+def test_not_blocks_stay_paragraphs(md):
+    assert [b.kind for b in parse_md_blocks(md)] == ["para"] * len(md.split("\n"))
+
+
+def test_parse_is_cached_and_normalizes_newlines():
+    assert parse_md_blocks("a\r\nb") is parse_md_blocks("a\nb")
+    assert parse_md_blocks(None) == ()
+
+
+@pytest.mark.parametrize(
+    "text, spans",
+    [
+        ("plain", (MdSpan("plain"),)),
+        ("**b** and *i*", (MdSpan("b", bold=True), MdSpan(" and "), MdSpan("i", italic=True))),
+        ("__b__ _i_", (MdSpan("b", bold=True), MdSpan(" "), MdSpan("i", italic=True))),
+        ("***bi***", (MdSpan("bi", bold=True, italic=True),)),
+        ("**a *b* c**", (MdSpan("a ", bold=True), MdSpan("b", True, True), MdSpan(" c", bold=True))),
+        ("`a*b*c`", (MdSpan("a*b*c", code=True),)),
+        ("`` a`b ``", (MdSpan("a`b", code=True),)),
+        ("\\*not\\* x", (MdSpan("*not* x"),)),
+        ("snake_case_name", (MdSpan("snake_case_name"),)),
+        ("2 * 3 * 4", (MdSpan("2 * 3 * 4"),)),
+        ("**unclosed", (MdSpan("**unclosed"),)),
+        ("`unclosed", (MdSpan("`unclosed"),)),
+        ("a ** b", (MdSpan("a ** b"),)),
+        ("****", (MdSpan("****"),)),
+    ],
+)
+def test_inline(text, spans):
+    assert parse_inline(text) == spans
+
+
+def test_unbalanced_inline_is_linear_and_literal():
+    text = "*" * 5000 + "a" + "_x" * 5000
+    assert plain_text(text) == text
+
+
+def test_inline_html_is_escaped():
+    assert md_to_basic_html("**<b>** `&`") == "<p><strong>&lt;b&gt;</strong> <code>&amp;</code></p>"
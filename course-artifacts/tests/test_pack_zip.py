@@ -0,0 +1,112 @@
+import io
+import random
+import zipfile
+
+import pytest
+
+import pack_zip
+from pack_zip import _ChunkSink, _write_members, _ZipWriter, iter_zip, pack
+
+DATE_TIME = (2024, 5, 6, 7, 8, 10)
+FAR = 5 << 30  # members start beyond 4 GiB, so offsets need zip64 records
+
+
+def _members():
+    rng = random.Random(0)
+    text = "".join(f"<p>第 {i} 段 {rng.random():.6f}</p>\n" for i in range(3000)).encode("utf-8")
+    return [
+        ("empty.json", b""),
+        ("empty.docx", b""),
+        ("notes.html", text),  # many BLOCK_SIZE blocks, deflated by suffix
+        ("noise.pdf", rng.randbytes(50_000)),  # probed: incompressible, stored
+        ("text.pdf", text[:50_000]),  # probed: compressible, deflated
+        ("讲稿.docx", text[:9_000]),  # UTF-8 name
+    ]
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # many blocks per member without megabytes of test data
+    monkeypatch.setattr(pack_zip, "BLOCK_SIZE", 4096)
+
+
+def _check(archive, members, level):
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == [name for name, _ in members]
+        for name, payload in members:
+            info = zf.getinfo(name)
+            assert zf.read(name) == payload
+            assert info.date_time == DATE_TIME
+            assert info.external_attr == 0o100644 << 16
+            stored = level == 0 or name == "noise.pdf" or (payload == b"" and name.endswith(".docx"))
+            assert info.compress_type == (zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+
+
+@pytest.mark.parametrize("level", [0, 1, 9])
+@pytest.mark.parametrize("workers", [1, 4])
+def test_iter_zip_round_trips(level, workers):
+    members = _members()
+    data = b"".join(iter_zip(members, compresslevel=level, workers=workers, date_time=DATE_TIME))
+    _check(io.BytesIO(data), members, level)
+
+
+@pytest.mark.parametrize("level", [0, 1, 9])
+def test_pack_matches_iter_zip(tmp_path, level):
+    members = _members()
+    (tmp_path / "manifest.json").write_bytes(b'{"files": []}')
+    for name, payload in members:
+        (tmp_path / name).write_bytes(payload)
+    contents = dict(members[2:4])  # some members from memory, the rest read from disk
+    zip_path = pack(
+        str(tmp_path),
+        files=[name for name, _ in members],
+        contents=contents,
+        compresslevel=level,
+        date_time=DATE_TIME,
+    )["zip"]
+
+    streamed = [("manifest.json", b'{"files": []}')] + sorted(members)
+    with open(zip_path, "rb") as f:
+        assert f.read() == b"".join(iter_zip(streamed, compresslevel=level, date_time=DATE_TIME))
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert {name: zf.read(name) for name in zf.namelist()} == dict(streamed)
+
+
+def _sparse_zip(path, seekable, members, level):
+    """Write the members after FAR bytes of hole, as if earlier members had taken 5 GiB."""
+    sources = [(name, None, payload) for name, payload in members]
+    with open(path, "wb") as fp:
+        fp.seek(FAR)
+        if seekable:
+            for _ in _write_members(_ZipWriter(fp), sources, level=level, workers=2, date_time=DATE_TIME):
+                pass
+            return
+        sink = _ChunkSink()
+        sink.offset = FAR
+        out = _ZipWriter(sink, seekable=False)
+        for _ in _write_members(out, sources, level=level, workers=2, date_time=DATE_TIME):
+            fp.writelines(sink.drain())
+        fp.writelines(sink.drain())
+
+
+@pytest.mark.parametrize("level", [0, 1, 9])
+def test_offsets_beyond_4gib_use_zip64(tmp_path, level):
+    members = _members()
+    seekable, streamed = tmp_path / "seekable.zip", tmp_path / "streamed.zip"
+    try:
+        _sparse_zip(seekable, True, members, level)
+        _sparse_zip(streamed, False, members, level)
+    except OSError as e:  # pragma: no cover - file system without large/sparse files
+        pytest.skip(f"cannot write a {FAR >> 30} GiB sparse file: {e}")
+
+    with open(seekable, "rb") as a, open(streamed, "rb") as b:
+        a.seek(FAR)
+        b.seek(FAR)
+        tail = a.read()
+        assert tail == b.read()
+    assert b"PK\x06\x06" in tail  # zip64 end of central directory
+    with zipfile.ZipFile(seekable) as zf:
+        assert all(info.header_offset >= FAR for info in zf.infolist())
+    _check(seekable, members, level)